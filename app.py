@@ -1,149 +1,324 @@
 import os
+import http.client
+import json
 import time
+import urllib.error
+import urllib.request
+import pandas as pd
 import psycopg2
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+
+import metrics
+import outbox
+import spool
+import tenants
+from forecast import HISTORY_DAYS, balance_percent, forecast_frame
 
 # --- AYARLAR ---
-HESAP_NO = "00470913"
+# Tek sayaçlı çalışma; birden çok daire için multi_account.py (sayaçları tenants tablosundan okur)
+HESAP_NO = os.environ.get("HESAP_NO", "00470913")
 URL = "https://online.kibtek.com/?lang=tr&t=prepaid"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+
+# BAKİYE MOTORU: "http" (tarayıcısız), "selenium" veya "auto" (http, olmazsa selenium)
+# NOT: KIBTEK_API_URL ve istek gövdesi ({"accountNo", "type": "prepaid"}) tahmindir, gerçek bir
+# cevapla doğrulanmadı. Doğrulanana kadar varsayılan motor selenium; http/auto isteğe bağlı.
+FETCH_ENGINE = os.environ.get("FETCH_ENGINE", "selenium")
+KIBTEK_API_URL = os.environ.get("KIBTEK_API_URL", "https://online.kibtek.com/api/prepaid/balance")
+BALANCE_KEYS = {"balance", "bakiye", "creditbalance", "remainingcredit", "credit"}
 
 # GÜVENLİK
 DATABASE_URL = os.environ.get("DATABASE_URL")
-SENDER_EMAIL = os.environ.get("SENDER_EMAIL")
-SENDER_PASSWORD = os.environ.get("SENDER_PASSWORD")
-RECEIVER_EMAIL = os.environ.get("RECEIVER_EMAIL")
+DB_CONNECT_TIMEOUT = int(os.environ.get("DB_CONNECT_TIMEOUT", "10"))
 
-def send_alert_email(bakiye, percent):
-    if not all([SENDER_EMAIL, SENDER_PASSWORD, RECEIVER_EMAIL]):
-        print("Mail ayarları eksik olduğu için uyarı gönderilemedi.")
-        return
+# UYARI: bakiye %10 altına düşerse ya da tahmini bitişe (iyimser değil, kötümser sınıra göre)
+# ALERT_DAYS günden az kaldıysa mail kuyruğa girer (outbox.py); her eşik aşımı için bir kez
+ALERT_DAYS = float(os.environ.get("ALERT_DAYS", "3"))
+
+def forecast_lines(forecast):
+    # forecast: forecast.forecast_frame satırı (dict) ya da None
+    if forecast is None or forecast['days_left'] != forecast['days_left']:  # NaN: tüketim yok
+        return ""
+    return (
+        f"Tahmini Kalan Süre: {forecast['days_left']:.1f} gün "
+        f"({forecast['days_low']:.1f} - {forecast['days_high']:.1f})\n"
+        f"Tahmini Bitiş: {forecast['depletion_date']:%d.%m.%Y %H:%M}\n"
+    )
 
+def alert_message(bakiye, percent, hesap_no=HESAP_NO, forecast=None, kind="percent", daire=None):
+    # Dönüş: (konu, metin). daire: sayacın kayıtlı olduğu dairenin adı (tenants), bilinmiyorsa None
     subject = f"⚠️ KIBTEK Düşük Bakiye Uyarısı (%{percent:.1f})"
+    reason = "kritik seviyeye (%10 veya altı) ulaştı" if kind == "percent" else f"{ALERT_DAYS:g} gün içinde bitebilir"
     body = (
         f"Merhaba,\n\n"
-        f"KIBTEK Darire 6 sayacınızdaki bakiye kritik seviyeye (%10 veya altı) ulaştı.\n\n"
+        f"KIBTEK {daire + ' ' if daire else ''}sayacınızdaki bakiye {reason}.\n\n"
+        f"Hesap No: {hesap_no}\n"
         f"Güncel Bakiye: {bakiye} TL\n"
-        f"Doluluk Oranı: %{percent:.1f}\n\n"
+        f"Doluluk Oranı: %{percent:.1f}\n"
+        f"{forecast_lines(forecast)}\n"
         f"Lütfen kesinti yaşamamak için en kısa sürede yükleme yapınız.\n"
         f"Enerji Yönetim Paneli Botu"
     )
-    
-    msg = MIMEMultipart()
-    msg['From'] = SENDER_EMAIL
-    msg['To'] = RECEIVER_EMAIL
-    msg['Subject'] = subject
-    msg.attach(MIMEText(body, 'plain', 'utf-8'))
-    
+    return subject, body
+
+def parse_balance(full_text):
+    balance_str = ''.join(filter(lambda x: x.isdigit() or x == '.', str(full_text)))
+    balance_str = balance_str.strip('.')
+    if not balance_str:
+        return None
     try:
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(SENDER_EMAIL, SENDER_PASSWORD)
-        server.sendmail(SENDER_EMAIL, RECEIVER_EMAIL, msg.as_string())
-        server.quit()
-        print("📧 Düşük bakiye uyarı e-postası başarıyla gönderildi!")
-    except Exception as e:
-        print(f"E-posta gönderme hatası: {e}")
+        return int(float(balance_str))
+    except ValueError:
+        return None
+
+def _find_balance(payload):
+    # JSON cevabının içinde bakiye alanını ara (iç içe sözlük/liste olabilir)
+    if isinstance(payload, dict):
+        for key, value in payload.items():
+            if key.lower() in BALANCE_KEYS and not isinstance(value, (dict, list)):
+                return parse_balance(value)
+        for value in payload.values():
+            found = _find_balance(value)
+            if found is not None:
+                return found
+    elif isinstance(payload, list):
+        for value in payload:
+            found = _find_balance(value)
+            if found is not None:
+                return found
+    return None
+
+def get_balance_http(hesap_no=HESAP_NO, api_url=None, timeout=15):
+    # Tarayıcısız motor: formun arkasındaki JSON uç noktasına doğrudan istek atar
+    api_url = api_url or KIBTEK_API_URL
+    data = json.dumps({"accountNo": hesap_no, "type": "prepaid"}).encode("utf-8")
+    req = urllib.request.Request(api_url, data=data, method="POST", headers={
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+        "User-Agent": USER_AGENT,
+        "Referer": URL,
+    })
+    try:
+        with metrics.phase("http_request"):
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                payload = json.loads(resp.read().decode("utf-8"))
+    except (urllib.error.URLError, http.client.HTTPException, OSError, ValueError) as e:
+        print(f"HTTP motoru hatası: {e}")
+        return None
+
+    balance = _find_balance(payload)
+    if balance is None:
+        metrics.failure("balance_not_found", "http_request")
+        print("HTTP cevabında bakiye bulunamadı!")
+    return balance
+
+def create_driver():
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+    from webdriver_manager.chrome import ChromeDriverManager
 
-def get_balance():
     chrome_options = Options()
     chrome_options.add_argument("--headless=new") 
     chrome_options.add_argument("--window-size=1920,1080")
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36")
-    
-    try:
+    chrome_options.add_argument(f"--user-agent={USER_AGENT}")
+
+    with metrics.phase("driver_install"):
         service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-    except Exception as e:
-        print(f"Driver başlatma hatası: {e}")
-        return None
-    
-    try:
-        print("1. Siteye gidiliyor...")
+    with metrics.phase("driver_start"):
+        return webdriver.Chrome(service=service, options=chrome_options)
+
+def read_balance_with_driver(driver, hesap_no=HESAP_NO, timeout=20):
+    # Açık bir driver ile formu doldurur; hata olursa exception fırlatır
+    # (havuzdaki driver'ın bozuk olup olmadığını çağıran taraf bilsin diye)
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    print("1. Siteye gidiliyor...")
+    with metrics.phase("page_load"):
         driver.get(URL)
-        wait = WebDriverWait(driver, 20)
+    wait = WebDriverWait(driver, timeout)
 
-        input_selector = "#__next > div > main > div > div:nth-child(5) > form > div > div > input"
+    input_selector = "#__next > div > main > div > div:nth-child(5) > form > div > div > input"
+    with metrics.phase("input_wait"):
         input_box = wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, input_selector)))
+    with metrics.phase("form_fill"):
         input_box.clear()
-        input_box.send_keys(HESAP_NO)
+        input_box.send_keys(hesap_no)
         time.sleep(1)
 
-        btn_selector = "#__next > div > main > div > div:nth-child(5) > form > div > button"
+    btn_selector = "#__next > div > main > div > div:nth-child(5) > form > div > button"
+    with metrics.phase("button_wait"):
         devam_btn = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, btn_selector)))
         devam_btn.click()
-        
-        print("4. Sonuç sayfası bekleniyor...")
-        balance_selector = "#__next > div > main > div > div:nth-child(5) > form > div:nth-child(5) > div:nth-child(1) > p"
-        
+    
+    print("4. Sonuç sayfası bekleniyor...")
+    balance_selector = "#__next > div > main > div > div:nth-child(5) > form > div:nth-child(5) > div:nth-child(1) > p"
+    
+    with metrics.phase("result_wait"):
         balance_element = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, balance_selector)))
-        full_text = balance_element.text
+    balance = parse_balance(balance_element.text)
     
-        balance_str = ''.join(filter(lambda x: x.isdigit() or x == '.', full_text))
-        balance_str = balance_str.strip('.')
-        
-        if balance_str:
-            balance = int(float(balance_str)) 
-            return balance
-        else:
-            print("Sayısal veri ayrıştırılamadı!")
-            return None
+    if balance is None:
+        metrics.failure("parse_error", "result_wait")
+        print("Sayısal veri ayrıştırılamadı!")
+    return balance
 
+def get_balance_selenium(hesap_no=HESAP_NO):
+    try:
+        driver = create_driver()
+    except Exception as e:
+        print(f"Driver başlatma hatası: {e}")
+        return None
+    
+    try:
+        return read_balance_with_driver(driver, hesap_no)
     except Exception as e:
         print(f"HATA OLUŞTU: {e}")
         return None
     finally:
-        driver.quit()
+        with metrics.phase("driver_quit"):
+            driver.quit()
 
-def main():
+FETCH_ENGINES = {
+    "http": get_balance_http,
+    "selenium": get_balance_selenium,
+}
+
+def get_balance(hesap_no=HESAP_NO, engine=None):
+    # Seçilen motorla dener, başarısız olursa sıradaki motora düşer.
+    # Dönüş: (bakiye, kullanılan_motor)
+    engine = (engine or FETCH_ENGINE).lower()
+    if engine == "auto":
+        order = ["http", "selenium"]
+    elif engine in FETCH_ENGINES:
+        order = [engine]
+    else:
+        print(f"Bilinmeyen motor '{engine}', auto kullanılıyor.")
+        order = ["http", "selenium"]
+
+    for name in order:
+        balance = FETCH_ENGINES[name](hesap_no)
+        if balance is not None:
+            return balance, name
+        print(f"'{name}' motoru bakiye okuyamadı.")
+        metrics.retry("engine_fallback")
+    return None, None
+
+def load_forecasts(conn, accounts):
+    # Son HISTORY_DAYS günün okumaları tek sorguda; tüm sayaçlar tek vektörel geçişte tahmin edilir
+    with conn.cursor() as c:
+        c.execute(
+            "SELECT date_time, account_no, balance FROM readings "
+            "WHERE account_no = ANY(%s) AND date_time >= now() - make_interval(days => %s) "
+            "ORDER BY account_no, date_time",
+            (list(accounts), HISTORY_DAYS + 1))
+        rows = c.fetchall()
+    df = pd.DataFrame(rows, columns=['date_time', 'account_no', 'balance'])
+    df['balance'] = df['balance'].astype(float)
+    return {row['account_no']: row for row in forecast_frame(df).to_dict('records')}
+
+def check_alerts(conn, balances):
+    # balances: {hesap_no: bakiye}. Tahmin hesaplanamazsa sadece yüzde eşiğine bakılır.
+    # Uyarılar sadece kuyruğa yazılır; gönderim arka plandaki OutboxWorker'dadır.
+    try:
+        with metrics.phase("forecast"):
+            forecasts = load_forecasts(conn, balances.keys())
+    except Exception as e:
+        conn.rollback()
+        print(f"Tükenme tahmini hesaplanamadı: {e}")
+        forecasts = {}
+    try:
+        with conn.cursor() as c:
+            names = tenants.meter_names(c, balances.keys())
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"Daire adları okunamadı (python schema.py çalıştırıldı mı?): {e}")
+        names = {}
+
+    queued = 0
+    try:
+        with metrics.phase("alert"), conn.cursor() as c:
+            for hesap_no, bakiye in balances.items():
+                percent = balance_percent(bakiye)
+                forecast = forecasts.get(hesap_no)
+                days_low = forecast['days_low'] if forecast else None
+                soon = days_low is not None and days_low == days_low and days_low <= ALERT_DAYS
+                for kind, active in (("percent", percent <= 10.0), ("days_left", soon)):
+                    subject, body = alert_message(bakiye, percent, hesap_no, forecast, kind, names.get(hesap_no)) if active else (None, None)
+                    if outbox.enqueue(c, hesap_no, kind, active, subject, body):
+                        print(f"{hesap_no}: Bakiye %{percent:.1f}, uyarı eşiği aşıldı! Uyarı maili kuyruğa eklendi.")
+                        queued += 1
+        conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"Uyarılar kuyruğa eklenemedi (python schema.py çalıştırıldı mı?): {e}")
+        return 0
+    if queued:
+        outbox.wake()
+    return queued
+
+def run_pipeline(run):
+    # Dönüş: çalışma durumu ("ok", "fetch_failed", "db_failed", "config_error")
     print("Program Başlıyor...")
     
     if not DATABASE_URL:
         print("HATA: DATABASE_URL bulunamadı!")
-        return
+        return "config_error"
 
-    bakiye = get_balance()
+    bakiye, engine = get_balance()
+    run.set(account=HESAP_NO, engine=engine, balance=bakiye)
+    if engine:
+        print(f"Bakiye motoru: {engine}")
     
-    if bakiye is not None:
-        try:
-            conn = psycopg2.connect(DATABASE_URL)
-            c = conn.cursor()
-            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            
-            c.execute("INSERT INTO readings (date_time, account_no, balance) VALUES (%s, %s, %s)", 
-                      (now, HESAP_NO, bakiye))
-            conn.commit()
-            c.close()
-            conn.close()
-            print(f"\n✅ İŞLEM BAŞARILI!\nKayıt Zamanı: {now}\nKaydedilen Tutar: {bakiye} TL")
-            
-            # --- YÜZDE HESAPLAMA VE MAİL KONTROLÜ ---
-            if bakiye >= 4000:
-                percent = 100.0
-            elif bakiye <= 500:
-                percent = (bakiye / 500) * 5.0
-            else:
-                percent = 5 + ((bakiye - 500) / 3500) * 95
-                
-            if percent <= 10.0:
-                print("Bakiye %10 veya altına düştü! Uyarı maili tetikleniyor...")
-                send_alert_email(bakiye, percent)
-                
-        except Exception as e:
-            print(f"Veritabanı kayıt hatası: {e}")
-    else:
+    if bakiye is None:
         print("\n❌ İŞLEM BAŞARISIZ.")
+        return "fetch_failed"
+
+    # Okuma önce yerel kuyruğa yazılır (spool.py): veritabanına ulaşılamazsa kaybolmaz,
+    # sonraki çalışmada kuyrukta bekleyenlerle birlikte aktarılır
+    now = datetime.now().replace(microsecond=0)
+    with metrics.phase("spool"):
+        readings = spool.ReadingSpool()
+        readings.append([(now, HESAP_NO, bakiye)])
+
+    try:
+        with metrics.phase("db_connect"):
+            conn = psycopg2.connect(DATABASE_URL, connect_timeout=DB_CONNECT_TIMEOUT)
+        
+        with metrics.phase("db_insert"):
+            flushed, inserted = readings.flush(conn)
+        run.set(flushed=flushed, inserted=inserted)
+        if flushed > 1:
+            print(f"Kuyrukta bekleyen {flushed - 1} eski okuma da aktarıldı.")
+        print(f"\n✅ İŞLEM BAŞARILI!\nKayıt Zamanı: {now:%Y-%m-%d %H:%M:%S}\nKaydedilen Tutar: {bakiye} TL\nMotor: {engine}")
+        
+        # --- YÜZDE / TÜKENME TAHMİNİ VE MAİL KONTROLÜ ---
+        check_alerts(conn, {HESAP_NO: bakiye})
+        conn.close()
+            
+    except Exception as e:
+        print(f"Veritabanı kayıt hatası: {e}")
+        print(f"Okuma yerel kuyrukta bekliyor ({readings.pending()} okuma): {readings.path}")
+        return "db_failed"
+    finally:
+        readings.close()
+    return "ok"
+
+def main():
+    run = metrics.start_run("app")
+    status = "failed"
+    worker = outbox.start_worker(DATABASE_URL)
+    try:
+        status = run_pipeline(run)
+    finally:
+        record = metrics.emit(run, status)
+        outbox.finish_worker(worker)
+        metrics.save_if_enabled(DATABASE_URL, record, DB_CONNECT_TIMEOUT)
+    return status
 
 if __name__ == "__main__":
     main()
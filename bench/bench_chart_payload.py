@@ -0,0 +1,64 @@
+import sys
+import time
+
+from streamlit.testing.v1 import AppTest
+
+from bench.bench_readings_loader import synthetic_readings
+from downsample import RANGES, balance_chart
+from energy import ReadingsCache
+
+# Bakiye grafiği için tarayıcıya giden veri boyutunu ve sunucu tarafı çizim süresini
+# (st.area_chart + Arrow/protobuf serileştirme, AppTest ile) eski davranışla
+# (tüm seri) ve downsample.py katmanlarıyla karşılaştırır. Tarayıcıdaki çizim süresi
+# ölçülmez; o da nokta sayısıyla orantılıdır.
+# Kullanım: python -m bench.bench_chart_payload [100000 1000000]
+SIZES = [100_000, 1_000_000]
+CHART_DATA = None  # AppTest betiği bu seriyi çizer
+
+def chart_script():
+    import streamlit as st
+
+    import bench.bench_chart_payload as bench
+
+    st.area_chart(bench.CHART_DATA, height=200)
+
+def render(series):
+    # python -m ile çalışınca bu dosya __main__ olur; betik modülü ayrıca içe aktarır
+    import bench.bench_chart_payload as holder
+
+    holder.CHART_DATA = series
+    at = AppTest.from_function(chart_script, default_timeout=600)
+    started = time.perf_counter()
+    at.run()
+    elapsed = (time.perf_counter() - started) * 1000.0
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    payload = sum(el.proto.ByteSize() for el in at.get("vega_lite_chart"))
+    return elapsed, payload
+
+def run(n):
+    cache = ReadingsCache()
+    cache.append(synthetic_readings(n))
+    frame = cache.frame
+
+    cases = [("eski (tüm seri)", lambda: frame.set_index('date_time')['balance'])]
+    for key in RANGES:
+        cases.append((f"LTTB {key}", lambda key=key: balance_chart(cache.tiers, key)))
+
+    print(f"\n{n:,} okuma")
+    print(f"{'grafik':<18} | {'nokta':>9} | {'hazırlık (ms)':>13} | {'çizim (ms)':>10} | {'veri (KB)':>10}")
+    for label, build in cases:
+        started = time.perf_counter()
+        series = build()
+        prep_ms = (time.perf_counter() - started) * 1000.0
+        render_ms, payload = render(series)
+        print(f"{label:<18} | {len(series):>9,} | {prep_ms:>13.1f} | {render_ms:>10.1f} | {payload / 1024:>10.1f}")
+
+def main():
+    sizes = [int(x) for x in sys.argv[1:]] or SIZES
+    render(synthetic_readings(10)['balance'].astype(float))  # ısınma: ilk çalıştırmadaki içe aktarmalar
+    for n in sizes:
+        run(n)
+
+if __name__ == "__main__":
+    main()
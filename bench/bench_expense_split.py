@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+
+import psycopg2
+import psycopg2.extensions
+
+from bench import scratch
+from expenses import record_expense, record_expenses_bulk
+
+# Eski "Kaydet ve Böl" akışı (kişi başına alt sorgulu INSERT) ile expenses.py'yi
+# sorgu sayısı ve süre açısından karşılaştırır. Veriler geçici bir şemaya yazılır.
+# Kullanım: TEST_DATABASE_URL=postgresql://localhost/test python -m bench.bench_expense_split
+SCRATCH_SCHEMA = "expense_bench"
+GROUP_SIZES = [4, 8, 16]
+BULK_EXPENSES = 2000
+TENANT_ID = 1
+
+class CountingCursor(psycopg2.extensions.cursor):
+    def execute(self, query, vars=None):
+        self.connection.round_trips += 1
+        return super().execute(query, vars)
+
+class CountingConnection(psycopg2.extensions.connection):
+    round_trips = 0
+
+    def cursor(self, *args, **kwargs):
+        kwargs.setdefault('cursor_factory', CountingCursor)
+        return super().cursor(*args, **kwargs)
+
+    def commit(self):
+        self.round_trips += 1
+        return super().commit()
+
+def setup(conn, residents):
+    scratch.create(conn, SCRATCH_SCHEMA, migrate=False)
+    with conn.cursor() as cur:
+        cur.execute("CREATE TABLE users (id SERIAL PRIMARY KEY, tenant_id INT, username TEXT, password TEXT, role TEXT, UNIQUE (tenant_id, username))")
+        cur.execute("CREATE TABLE expenses (id SERIAL PRIMARY KEY, tenant_id INT, item_name TEXT, price NUMERIC, buyer TEXT, date_time TIMESTAMP)")
+        cur.execute("""
+            CREATE TABLE payments (id SERIAL PRIMARY KEY, expense_id INT REFERENCES expenses(id),
+                payer_id INT REFERENCES users(id), receiver_id INT REFERENCES users(id), amount NUMERIC, status TEXT)
+        """)
+        cur.executemany("INSERT INTO users (tenant_id, username, password, role) VALUES (%s, %s, '', 'user')",
+                        [(TENANT_ID, n) for n in residents])
+    conn.commit()
+
+# --- ESKİ YÖNTEM (dashboard.py'deki döngü) ---
+def legacy_record(conn, item, price, buyer, residents):
+    cur = conn.cursor()
+    cur.execute("INSERT INTO expenses (item_name, price, buyer, date_time) VALUES (%s, %s, %s, NOW()) RETURNING id", (item, price, buyer))
+    exp_id = cur.fetchone()[0]
+    share = price / len(residents)
+    for name in residents:
+        if name != buyer:
+            cur.execute("INSERT INTO payments (expense_id, payer_id, receiver_id, amount, status) VALUES (%s, (SELECT id FROM users WHERE username=%s), (SELECT id FROM users WHERE username=%s), %s, 'pending_payment')", (exp_id, name, buyer, share))
+    conn.commit()
+
+def measure(conn, fn, repeat):
+    conn.round_trips = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - started) * 1000.0 / repeat
+    return conn.round_trips / repeat, elapsed
+
+def main():
+    database_url = os.environ.get("TEST_DATABASE_URL")
+    if not database_url:
+        print("HATA: TEST_DATABASE_URL bulunamadı!")
+        sys.exit(2)
+
+    conn = psycopg2.connect(database_url, connection_factory=CountingConnection)
+    try:
+        print("Tek harcama (ortalama, 50 tekrar)")
+        print(f"{'kişi':>5} | {'eski sorgu':>10} | {'yeni sorgu':>10} | {'eski ms':>8} | {'yeni ms':>8}")
+        for n in GROUP_SIZES:
+            residents = [f"kisi{i}" for i in range(n)]
+            setup(conn, residents)
+            old_q, old_ms = measure(conn, lambda: legacy_record(conn, "Market", 100.0, residents[0], residents), 50)
+            new_q, new_ms = measure(conn, lambda: record_expense(conn, TENANT_ID, "Market", 100.0, residents[0], residents), 50)
+            print(f"{n:>5} | {old_q:>10.0f} | {new_q:>10.0f} | {old_ms:>8.2f} | {new_ms:>8.2f}")
+
+        residents = [f"kisi{i}" for i in range(4)]
+        setup(conn, residents)
+        rows = [{'item_name': f"ürün {i}", 'price': 10.0 + i % 500, 'buyer': residents[i % 4],
+                 'date_time': f"2024-01-{1 + i % 28:02d} 12:00:00", 'participants': residents} for i in range(BULK_EXPENSES)]
+        conn.round_trips = 0
+        started = time.perf_counter()
+        record_expenses_bulk(conn, TENANT_ID, rows)
+        bulk_ms = (time.perf_counter() - started) * 1000.0
+        print(f"\nCSV toplu yükleme: {BULK_EXPENSES} harcama, {conn.round_trips} sorgu, {bulk_ms:.0f} ms")
+    finally:
+        conn.close()
+        scratch.drop(database_url, SCRATCH_SCHEMA)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import argparse
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+from forecast import RESERVE_BALANCE, ForecastCache, forecast_frame
+
+# Tükenme tahmini motorunu çok sayaçlı sentetik veriyle ölçer: tek geçişte tüm sayaçlar (soğuk),
+# önbellek isabeti, sayaçların bir kısmına yeni okuma gelmesi (kısmi güncelleme) ve eski yöntem
+# (sayaç başına pandas ile son 7 günün ortalaması) karşılaştırılır. Veritabanı gerekmez.
+# Kullanım: python -m bench.bench_forecast --meters 10000 --days 365 --per-day 1
+START = pd.Timestamp("2025-01-01")
+
+def synthetic_readings(n_meters, n_days, per_day, seed=7):
+    # Sayaç başına farklı tüketim, haftanın günü etkisi ve gürültü; bakiye 600'ün altına
+    # inmeden 4000'e yüklenir
+    rng = np.random.default_rng(seed)
+    n = n_days * per_day
+    base = rng.uniform(10, 60, n_meters)[:, None]
+    weekday = np.array([1.0, 1.0, 1.0, 1.0, 1.1, 1.3, 1.2])
+    steps = (START + pd.to_timedelta(np.arange(n) * (86400 // per_day), unit="s"))
+    used = base * weekday[steps.dayofweek.to_numpy()][None, :] / per_day
+    used *= rng.lognormal(0.0, 0.3, (n_meters, n))
+    balance = 4000.0 - np.cumsum(used, axis=1) % 3400.0
+    accounts = np.array([f"{i:08d}" for i in range(n_meters)])
+    return pd.DataFrame({
+        "date_time": np.tile(steps.to_numpy(), n_meters),
+        "account_no": np.repeat(accounts, n),
+        "balance": balance.round(2).ravel(),
+    })
+
+def old_days_left(group):
+    # Eski panel hesabı: son 7 gündeki düşüşlerin günlük ortalaması
+    last = group["date_time"].iloc[-1]
+    recent = group[group["date_time"] >= last - pd.Timedelta(days=7)]
+    diff = recent["balance"].diff()
+    span = (recent["date_time"].iloc[-1] - recent["date_time"].iloc[0]).total_seconds() / 86400.0
+    avg_daily = -diff[diff < 0].sum() / max(1.0, span)
+    usable = max(0.0, group["balance"].iloc[-1] - RESERVE_BALANCE)
+    return usable / avg_daily if avg_daily > 0 else 0.0
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - started) * 1000.0)
+    return statistics.median(times), result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--meters", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--per-day", type=int, default=1)
+    parser.add_argument("--changed", type=float, default=0.01, help="yeni okuması gelen sayaç oranı")
+    parser.add_argument("--baseline-meters", type=int, default=500, help="eski yöntemin ölçüleceği sayaç sayısı")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    df = synthetic_readings(args.meters, args.days, args.per_day)
+    print(f"{args.meters:,} sayaç x {args.days} gün x {args.per_day}/gün = {len(df):,} okuma "
+          f"({time.perf_counter() - started:.1f} sn üretim)")
+
+    cold_ms, result = timed(lambda: forecast_frame(df), args.repeat)
+
+    cache = ForecastCache()
+    cache.get(df)
+    hit_ms, _ = timed(lambda: cache.get(df), args.repeat)
+
+    # Kısmi güncelleme: sayaçların bir kısmına bir sonraki adımda okuma gelir
+    changed = df["account_no"].unique()[:max(1, int(args.meters * args.changed))]
+    tail = df[df["account_no"].isin(changed)].groupby("account_no").tail(1).copy()
+    tail["date_time"] += pd.Timedelta(seconds=86400 // args.per_day)
+    tail["balance"] -= 5.0
+    grown = pd.concat([df, tail], ignore_index=True)
+    partial_ms = []
+    for _ in range(args.repeat):
+        for acc in changed:
+            cache.invalidate(acc)
+        cache.get(df)
+        ms, _ = timed(lambda: cache.get(grown), 1)
+        partial_ms.append(ms)
+
+    sample = df[df["account_no"].isin(df["account_no"].unique()[:args.baseline_meters])]
+    old_ms, _ = timed(lambda: sample.groupby("account_no", sort=False).apply(old_days_left), 1)
+    old_full_ms = old_ms * args.meters / args.baseline_meters
+
+    print(f"{'yöntem':<38} | {'süre (ms)':>10}")
+    print(f"{'vektörel, tüm sayaçlar (soğuk)':<38} | {cold_ms:>10.1f}")
+    print(f"{'önbellek isabeti':<38} | {hit_ms:>10.1f}")
+    print(f"{f'kısmi güncelleme ({len(changed)} sayaç)':<38} | {statistics.median(partial_ms):>10.1f}")
+    print(f"{'eski: sayaç başına pandas (tahmini)':<38} | {old_full_ms:>10.1f}")
+    print(f"Hızlanma (soğuk, eskiye göre): {old_full_ms / cold_ms:.1f}x")
+
+    width = (result["days_high"] - result["days_low"]).dropna()
+    print(f"Tahmin edilen sayaç: {result['days_left'].notna().sum():,}/{len(result):,}, "
+          f"medyan kalan gün {result['days_left'].median():.1f}, medyan aralık genişliği {width.median():.1f} gün")
+
+if __name__ == "__main__":
+    main()
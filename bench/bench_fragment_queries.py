@@ -0,0 +1,147 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+from streamlit.testing.v1 import AppTest
+
+import db
+from bench import scratch
+from expenses import record_expense
+from rollup import DAILY_BACKFILL_SQL
+
+# dashboard.py'de her etkileşimin kaç DB sorgusu çalıştırdığını AppTest ile sayar:
+# önce (DASHBOARD_FRAGMENTS=0, her etkileşimde tüm sayfa) ve sonra (bölümler st.fragment).
+# Her etkileşimden önce sayılmayan bir tam çalıştırma yapılır; böylece iki modda da
+# önbellek durumu aynıdır. Sekme değiştirmek tarayıcı tarafındadır, hiç çalıştırma olmaz;
+# enerji bölümlerinin zamanlayıcı ile yenilenmesi AppTest'te tetiklenemez. İlk yükleme
+# önceki ölçümlerle karşılaştırılabilsin diye panel girişsiz de veri gösterir (DASHBOARD_PUBLIC).
+# Kullanım: TEST_DATABASE_URL=... python -m bench.bench_fragment_queries
+SCRATCH_SCHEMA = "fragment_bench"
+DASHBOARD = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dashboard.py")
+PEOPLE = ["Metin", "Zafer", "Doğan", "Mehmet"]
+ACCOUNT = "00470913"
+QUERY_COUNT = [0]
+
+class CountingCursor(psycopg2.extensions.cursor):
+    def execute(self, query, vars=None):
+        QUERY_COUNT[0] += 1
+        return super().execute(query, vars)
+
+    def copy_expert(self, sql, file, size=8192):
+        QUERY_COUNT[0] += 1
+        return super().copy_expert(sql, file, size)
+
+def seed(conn):
+    scratch.create(conn, SCRATCH_SCHEMA)
+    with conn.cursor() as cur:
+        # Göç 7 boş veritabanında tek daire ("daire-6", sayaç 00470913) oluşturur
+        cur.execute("SELECT id FROM tenants WHERE slug = 'daire-6'")
+        tenant_id = cur.fetchone()[0]
+        cur.execute("INSERT INTO users (tenant_id, username, password, role) SELECT %s, unnest(%s::text[]), '1', 'user'",
+                    (tenant_id, PEOPLE))
+        cur.execute("""
+            INSERT INTO readings (date_time, account_no, balance)
+            SELECT TIMESTAMP '2026-01-01' + (i || ' minutes')::interval * 15, %s, 4000 - (i * 3 %% 3500)
+            FROM generate_series(1, 4 * 24 * 60) i
+        """, (ACCOUNT,))
+        cur.execute(DAILY_BACKFILL_SQL)
+    conn.commit()
+    # Metin çoğu harcamayı yapar, diğerlerinden alacaklıdır; log akışı birden fazla sayfa
+    start = datetime(2026, 1, 1)
+    for i in range(120):
+        buyer = PEOPLE[0] if i % 4 else PEOPLE[1 + i % 3]
+        record_expense(conn, tenant_id, f"ürün {i}", 40 + i, buyer, PEOPLE, date_time=start + timedelta(hours=6 * i))
+
+def counted(at, action):
+    QUERY_COUNT[0] = 0
+    started = time.perf_counter()
+    action(at)
+    at.run()
+    elapsed = (time.perf_counter() - started) * 1000.0
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return QUERY_COUNT[0], elapsed
+
+def login(at):
+    at.sidebar.text_input[0].input("Metin")
+    at.sidebar.text_input[1].input("1")
+    at.sidebar.button[0].click()
+
+def chart_range(at):
+    at.radio(key="chart_range").set_value("7 gün")
+
+def load_more(at):
+    [b for b in at.button if "Daha fazla" in b.label][0].click()
+
+def collect(at):
+    [b for b in at.button if b.key and b.key.startswith("coll_")][0].click()
+
+def add_expense(at):
+    at.text_input(key="exp_item").input("Deterjan")
+    at.number_input(key="exp_price").set_value(120.0)
+    [b for b in at.button if b.label == "Kaydet ve Böl"][0].click()
+
+def toggle_min_flow(at):
+    at.toggle(key="min_cash_flow").set_value(True)
+
+INTERACTIONS = [
+    ("giriş", login),
+    ("grafik aralığı", chart_range),
+    ("en az transfer", toggle_min_flow),
+    ("daha fazla log", load_more),
+    ("tahsil ettim", collect),
+    ("harcama kaydet", add_expense),
+]
+
+def scenario(fragments):
+    os.environ["DASHBOARD_FRAGMENTS"] = "1" if fragments else "0"
+    os.environ["DASHBOARD_PUBLIC"] = "1"
+    db.invalidate_reads()
+    db.get_readings_cache(ACCOUNT).reset()
+    at = AppTest.from_file(DASHBOARD, default_timeout=120)
+    results = [("ilk yükleme",) + counted(at, lambda at: None)]
+    for label, action in INTERACTIONS:
+        if label != "giriş":
+            at.run()  # sayılmaz: tüm widget'lar ağaçta olsun, önbellekler ısınsın
+        results.append((label,) + counted(at, action))
+    return results
+
+def main():
+    database_url = os.environ.get("TEST_DATABASE_URL")
+    if not database_url:
+        print("HATA: TEST_DATABASE_URL bulunamadı!")
+        sys.exit(2)
+    options = scratch.options(SCRATCH_SCHEMA)
+
+    pool = psycopg2.pool.ThreadedConnectionPool(1, 5, database_url, options=options, cursor_factory=CountingCursor)
+    db.get_pool = lambda: pool
+    # Anlık görüntüler geçici dizinde: gerçek .snapshot/<sayaç> okunmasın ve üzerine yazılmasın
+    snapshot_dir = tempfile.mkdtemp(prefix="fragment_bench_")
+    db.SNAPSHOT_DIR = snapshot_dir
+    try:
+        AppTest.from_file(DASHBOARD, default_timeout=120).run()  # ısınma: içe aktarmalar
+        results = {}
+        for fragments in (False, True):
+            conn = psycopg2.connect(database_url)
+            try:
+                seed(conn)
+            finally:
+                conn.close()
+            results[fragments] = scenario(fragments)
+
+        print(f"{'etkileşim':<16} | {'önce sorgu':>10} | {'sonra sorgu':>11} | {'önce (ms)':>9} | {'sonra (ms)':>10}")
+        for (label, q0, t0), (_, q1, t1) in zip(results[False], results[True]):
+            print(f"{label:<16} | {q0:>10} | {q1:>11} | {t0:>9.1f} | {t1:>10.1f}")
+    finally:
+        pool.closeall()
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+        scratch.drop(database_url, SCRATCH_SCHEMA)
+
+if __name__ == "__main__":
+    main()
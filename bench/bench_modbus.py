@@ -0,0 +1,103 @@
+import argparse
+import io
+import os
+import time
+from datetime import datetime, timedelta
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+import modbus_ingest
+from bench import scratch
+from bench.modbus_simulator import serve_in_background
+
+# Yerel Modbus simülatöründeki N sayacı beklemeden okuyup geçici şemaya yazar ve
+# okuma/yazma hızını (satır/sn) raporlar; ardından aynı partiyi satır satır INSERT,
+# execute_values ve COPY ile yazıp karşılaştırır.
+# Kullanım: TEST_DATABASE_URL=... python -m bench.bench_modbus --meters 50 --seconds 10
+SCRATCH_SCHEMA = "modbus_bench"
+
+def ingest(database_url, n_meters, seconds):
+    server = serve_in_background(range(1, n_meters + 1))
+    modbus_ingest.MODBUS_HOST, modbus_ingest.MODBUS_PORT = server.server_address
+    meters = [(unit, f"{unit:08d}") for unit in range(1, n_meters + 1)]
+    try:
+        started = time.perf_counter()
+        polled, flushed, dropped = modbus_ingest.run(database_url, meters, duration=seconds, poll_interval=0)
+        elapsed = time.perf_counter() - started
+    finally:
+        server.shutdown()
+
+    conn = psycopg2.connect(database_url)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM readings")
+            stored = cur.fetchone()[0]
+    finally:
+        conn.close()
+    print(f"{n_meters} sayaç, {seconds} sn: okunan={polled}, yazılan={flushed}, düşürülen={dropped}, tabloda={stored}")
+    print(f"okuma hızı: {polled / seconds:,.0f} satır/sn, uçtan uca yazma: {flushed / elapsed:,.0f} satır/sn\n")
+
+def write_insert(conn, rows):
+    with conn.cursor() as cur:
+        for row in rows:
+            cur.execute("INSERT INTO readings (date_time, account_no, balance) VALUES (%s, %s, %s)", row)
+    conn.commit()
+
+def write_execute_values(conn, rows):
+    with conn.cursor() as cur:
+        execute_values(cur, "INSERT INTO readings (date_time, account_no, balance) VALUES %s", rows, page_size=1000)
+    conn.commit()
+
+def write_copy(conn, rows):
+    buf = io.StringIO()
+    for date_time, account_no, balance in rows:
+        buf.write(f"{date_time:%Y-%m-%d %H:%M:%S.%f}\t{account_no}\t{balance}\n")
+    buf.seek(0)
+    with conn.cursor() as cur:
+        cur.copy_expert("COPY readings (date_time, account_no, balance) FROM STDIN", buf)
+    conn.commit()
+
+def compare_writers(database_url, n_rows, n_meters):
+    start = datetime(2026, 1, 1)
+    rows = [(start + timedelta(seconds=i), f"{1 + i % n_meters:08d}", round(4000 - i * 0.01, 2)) for i in range(n_rows)]
+    conn = psycopg2.connect(database_url)
+    try:
+        print(f"{'yöntem':<16} | {'süre (ms)':>10} | {'satır/sn':>10}")
+        for label, writer in (("satır satır", write_insert), ("execute_values", write_execute_values), ("COPY", write_copy)):
+            with conn.cursor() as cur:
+                cur.execute("TRUNCATE readings")
+            conn.commit()
+            started = time.perf_counter()
+            writer(conn, rows)
+            elapsed = time.perf_counter() - started
+            print(f"{label:<16} | {elapsed * 1000:>10.1f} | {n_rows / elapsed:>10,.0f}")
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--meters", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--rows", type=int, default=50_000)
+    args = parser.parse_args()
+
+    database_url = os.environ.get("TEST_DATABASE_URL")
+    if not database_url:
+        print("HATA: TEST_DATABASE_URL bulunamadı!")
+        return
+    # Flusher kendi bağlantısını açar; PGOPTIONS ile geçici şemaya yönlendirilir
+    os.environ["PGOPTIONS"] = scratch.options(SCRATCH_SCHEMA)
+    conn = psycopg2.connect(database_url)
+    try:
+        scratch.create(conn, SCRATCH_SCHEMA)
+    finally:
+        conn.close()
+    try:
+        ingest(database_url, args.meters, args.seconds)
+        compare_writers(database_url, args.rows, args.meters)
+    finally:
+        scratch.drop(database_url, SCRATCH_SCHEMA)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import argparse
+import contextlib
+import io
+import os
+import socket
+import time
+
+import psycopg2
+
+import outbox
+from bench import scratch
+from bench.smtp_sink import serve_in_background
+
+# Uyarı kuyruğunun (outbox.py) gönderim hızını yerel SMTP sunucusuna (bench/smtp_sink.py) karşı
+# ölçer: eski yöntem (her mail için yeni bağlantı + STARTTLS + giriş) ile tek oturumu yeniden
+# kullanan arka plan işçisi karşılaştırılır; tekrar eden uyarıların elenmesi ve geçici
+# hatalarda yeniden deneme de kontrol edilir.
+# Kullanım: TEST_DATABASE_URL=... python -m bench.bench_outbox -n 500 --connect-delay 0.3
+SCRATCH_SCHEMA = "outbox_bench"
+
+def prepare_db(database_url):
+    # İşçi kendi bağlantısını açar; PGOPTIONS ile geçici şemaya yönlendirilir
+    os.environ["PGOPTIONS"] = scratch.options(SCRATCH_SCHEMA)
+    conn = psycopg2.connect(database_url)
+    scratch.create(conn, SCRATCH_SCHEMA)
+    return conn
+
+def enqueue_all(conn, n, kind="percent"):
+    created = 0
+    with conn.cursor() as cur:
+        for i in range(n):
+            body = f"Hesap No: {i:08d}\nGüncel Bakiye: 300 TL\n" + "Lütfen yükleme yapınız.\n" * 10
+            created += outbox.enqueue(cur, f"{i:08d}", kind, True, f"Düşük bakiye ({i})", body)
+    conn.commit()
+    return created
+
+def old_way(n):
+    # Eski send_alert_email: her uyarı için bağlan, (STARTTLS/giriş), gönder, kapat
+    for i in range(n):
+        server = outbox.open_smtp()
+        server.sendmail(outbox.SENDER_EMAIL, [outbox.RECEIVER_EMAIL], outbox.build_message(f"Düşük bakiye ({i})", "test"))
+        server.quit()
+
+def drain(database_url):
+    worker = outbox.OutboxWorker(database_url, poll_interval=0.05)
+    started = time.perf_counter()
+    worker.start()
+    worker.stop(drain=600)
+    worker.join()
+    return time.perf_counter() - started, worker
+
+def status_counts(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT status, count(*), sum(attempts) FROM alert_outbox GROUP BY status ORDER BY status")
+        return {status: (count, attempts) for status, count, attempts in cur.fetchall()}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=500)
+    parser.add_argument("--connect-delay", type=float, default=0.3, help="oturum açılış gecikmesi (TLS + giriş yerine), sn")
+    parser.add_argument("--send-delay", type=float, default=0.005, help="mail başına sunucu gecikmesi, sn")
+    parser.add_argument("--batch", type=int, default=outbox.OUTBOX_BATCH)
+    parser.add_argument("--baseline", type=int, default=50, help="eski yöntemle gönderilecek mail sayısı")
+    args = parser.parse_args()
+
+    database_url = os.environ.get("TEST_DATABASE_URL")
+    if not database_url:
+        print("HATA: TEST_DATABASE_URL bulunamadı!")
+        return
+
+    controller, handler = serve_in_background(connect_delay=args.connect_delay, send_delay=args.send_delay)
+    outbox.SMTP_HOST, outbox.SMTP_PORT, outbox.SMTP_STARTTLS = "127.0.0.1", controller.port, False
+    outbox.SENDER_EMAIL, outbox.RECEIVER_EMAIL, outbox.SENDER_PASSWORD = "bot@example.com", "ev@example.com", None
+    outbox.OUTBOX_BATCH = args.batch
+    conn = prepare_db(database_url)
+    try:
+        started = time.perf_counter()
+        old_way(args.baseline)
+        old_rate = args.baseline / (time.perf_counter() - started)
+
+        started = time.perf_counter()
+        created = enqueue_all(conn, args.n)
+        enqueue_ms = (time.perf_counter() - started) * 1000.0
+        sessions_before = handler.sessions
+        elapsed, worker = drain(database_url)
+        new_rate = worker.sent / elapsed
+        duplicates = enqueue_all(conn, args.n)
+
+        print(f"{args.n} uyarı, oturum açılışı {args.connect_delay * 1000:.0f} ms, mail başına {args.send_delay * 1000:.0f} ms")
+        print(f"{'yöntem':<34} | {'mail/sn':>8}")
+        print(f"{'eski: mail başına yeni bağlantı':<34} | {old_rate:>8.1f}")
+        print(f"{'kuyruk + tek oturum':<34} | {new_rate:>8.1f}")
+        print(f"Hızlanma: {new_rate / old_rate:.1f}x | kuyruğa ekleme {enqueue_ms:.1f} ms ({created} uyarı), "
+              f"{worker.sent} gönderildi, {handler.sessions - sessions_before} SMTP oturumu")
+        print(f"Tekrar çalışmada kuyruğa eklenen (aynı aşım): {duplicates}")
+
+        # Geçici hatalar: ilk mailler 451 ile reddedilir, üstel beklemeyle yeniden denenir
+        outbox.RETRY_BASE = 0.1
+        handler.fail_first, handler.rejected = min(args.n, 20), 0
+        enqueue_all(conn, args.n, kind="days_left")
+        with contextlib.redirect_stdout(io.StringIO()):
+            elapsed, worker = drain(database_url)
+            while status_counts(conn).get("pending"):
+                time.sleep(0.2)
+                elapsed += drain(database_url)[0]
+        print(f"Yeniden deneme: {handler.rejected} geçici hata, durumlar {status_counts(conn)} "
+              f"(durum: (adet, toplam deneme)), {elapsed:.1f} sn")
+
+        # Ulaşılamayan sunucu: bağlantı kabul edilir ama selamlama gelmez (SMTP_TIMEOUT dolar).
+        # Parti ilk bağlantı hatasında durmalı, kalan uyarılar deneme sayılmadan ertelenmeli.
+        with socket.socket() as silent:
+            silent.bind(("127.0.0.1", 0))
+            silent.listen(args.batch)
+            outbox.SMTP_PORT, outbox.SMTP_TIMEOUT = silent.getsockname()[1], 0.5
+            enqueue_all(conn, args.batch, kind="unreachable")
+            worker = outbox.OutboxWorker(database_url)
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                handled = worker.deliver_batch()
+            elapsed = time.perf_counter() - started
+            worker.conn.close()
+        with conn.cursor() as cur:
+            cur.execute("SELECT attempts, count(*) FROM alert_outbox WHERE kind = 'unreachable' AND next_attempt > now() GROUP BY 1 ORDER BY 1")
+            postponed = dict(cur.fetchall())
+        print(f"Ulaşılamayan sunucu: {args.batch} uyarılık parti {elapsed:.1f} sn, {handled} deneme sayıldı, "
+              f"ertelenen (deneme: adet) {postponed}")
+    finally:
+        controller.stop()
+        conn.close()
+        scratch.drop(database_url, SCRATCH_SCHEMA)
+
+if __name__ == "__main__":
+    main()
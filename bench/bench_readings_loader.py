@@ -0,0 +1,68 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from energy import ReadingsCache, full_load
+
+# Tam yükleme (her çalıştırmada SELECT * + ayrıştırma + diff + groupby) ile
+# artımlı yüklemeyi (sadece yeni satırlar) karşılaştırır.
+# Kullanım: python -m bench.bench_readings_loader [10000 100000 1000000]
+SIZES = [10_000, 100_000, 1_000_000]
+TAIL_ROWS = 60  # her yenilemede gelen yeni satır sayısı
+REPEAT = 5
+
+def synthetic_readings(n, start="2020-01-01"):
+    # Dakikalık okumalar: yavaş düşüş + ara sıra yükleme; DB'den gelen gibi metin sütunlar
+    rng = np.random.default_rng(42)
+    drops = rng.uniform(0.0, 0.05, n)
+    recharge = rng.random(n) < 0.0005
+    balance = 4000 - np.cumsum(drops) + np.cumsum(np.where(recharge, 1000.0, 0.0))
+    times = pd.date_range(start, periods=n, freq="min")
+    return pd.DataFrame({
+        'id': np.arange(1, n + 1),
+        'date_time': times.strftime("%Y-%m-%d %H:%M:%S"),
+        'account_no': "00470913",
+        'balance': balance.round(2).astype(str),
+    })
+
+def best_of(fn, repeat=REPEAT):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000.0
+
+def run(n):
+    raw = synthetic_readings(n + TAIL_ROWS)
+    head, tail = raw.iloc[:n], raw.iloc[n:]
+
+    full_ms = best_of(lambda: full_load(raw))
+
+    def incremental():
+        cache.frame, cache.daily, cache.watermark = base_frame, base_daily, base_watermark
+        cache.append(tail)
+
+    cache = ReadingsCache()
+    cache.append(head)
+    base_frame, base_daily, base_watermark = cache.frame, cache.daily, cache.watermark
+    inc_ms = best_of(incremental)
+
+    # Sonuçlar tam yükleme ile aynı olmalı
+    full_df, full_daily = full_load(raw)
+    pd.testing.assert_series_equal(cache.frame['diff'], full_df['diff'], check_names=False)
+    pd.testing.assert_series_equal(cache.daily, full_daily, check_names=False, check_index_type=False)
+    return full_ms, inc_ms
+
+def main():
+    sizes = [int(x) for x in sys.argv[1:]] or SIZES
+    print(f"{'satır':>10} | {'tam (ms)':>10} | {'artımlı (ms)':>12} | {'hızlanma':>8}")
+    for n in sizes:
+        full_ms, inc_ms = run(n)
+        print(f"{n:>10} | {full_ms:>10.1f} | {inc_ms:>12.1f} | {full_ms / inc_ms:>7.1f}x")
+    print("Not: ağ üzerinden tüm tabloyu çekme süresi dahil değildir, gerçek fark daha büyüktür.")
+
+if __name__ == "__main__":
+    main()
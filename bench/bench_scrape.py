@@ -0,0 +1,105 @@
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+
+import psycopg2
+
+import app
+import metrics
+import spool
+from bench import scratch
+from bench.fixture_server import base_url, serve_in_background
+
+# app.py boru hattını yerel fixture sunucusuna karşı N kez çalıştırır ve
+# toplam/aşama bazında p50/p95 sürelerini raporlar.
+# Kullanım: python -m bench.bench_scrape -n 50 --engine http
+#           python -m bench.bench_scrape -n 10 --engine selenium   (Chrome gerekir)
+#           TEST_DATABASE_URL=... python -m bench.bench_scrape --db   (DB kaydı dahil)
+SCRATCH_SCHEMA = "scrape_bench"
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = (len(values) - 1) * p / 100.0
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+def prepare_db(database_url, spool_dir):
+    # app.main() kendi bağlantısını açar; PGOPTIONS ile geçici şemaya yönlendirilir.
+    # Yerel kuyruk da geçici bir dizinde: gerçek kuyrukta bekleyen okumalar geçici şemaya
+    # aktarılıp onunla silinmesin, ölçüm okumaları da gerçek kuyrukta kalmasın.
+    os.environ["PGOPTIONS"] = scratch.options(SCRATCH_SCHEMA)
+    spool.SPOOL_PATH = os.path.join(spool_dir, "readings.db")
+    conn = psycopg2.connect(database_url)
+    try:
+        scratch.create(conn, SCRATCH_SCHEMA)
+    finally:
+        conn.close()
+
+def run_once(with_db):
+    run = metrics.start_run("bench")
+    with contextlib.redirect_stdout(io.StringIO()):
+        if with_db:
+            status = app.run_pipeline(run)
+        else:
+            balance, engine = app.get_balance()
+            run.set(engine=engine, balance=balance)
+            status = "ok" if balance is not None else "fetch_failed"
+    return run.summary(status)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=30)
+    parser.add_argument("--engine", default="http", choices=["http", "selenium", "auto"])
+    parser.add_argument("--db", action="store_true")
+    args = parser.parse_args()
+
+    server = serve_in_background()
+    app.URL = base_url(server) + "/?lang=tr&t=prepaid"
+    app.KIBTEK_API_URL = base_url(server) + "/api/prepaid/balance"
+    app.FETCH_ENGINE = args.engine
+
+    database_url = os.environ.get("TEST_DATABASE_URL") if args.db else None
+    if args.db and not database_url:
+        print("HATA: --db için TEST_DATABASE_URL gerekli!")
+        return
+    if database_url:
+        app.DATABASE_URL = database_url
+        spool_dir = tempfile.mkdtemp(prefix="scrape_bench_spool_")
+        prepare_db(database_url, spool_dir)
+
+    records = []
+    try:
+        for _ in range(args.n):
+            records.append(run_once(bool(database_url)))
+    finally:
+        server.shutdown()
+        if database_url:
+            scratch.drop(database_url, SCRATCH_SCHEMA)
+            shutil.rmtree(spool_dir, ignore_errors=True)
+
+    ok = [r for r in records if r['status'] == 'ok']
+    totals = [r['total_ms'] for r in ok]
+    print(f"{args.n} çalışma, motor={args.engine}, başarılı={len(ok)}")
+    print(f"{'aşama':<16} | {'p50 (ms)':>9} | {'p95 (ms)':>9}")
+    print(f"{'TOPLAM':<16} | {percentile(totals, 50):>9.1f} | {percentile(totals, 95):>9.1f}")
+    phases = sorted({p for r in ok for p in r['phases_ms']})
+    for name in phases:
+        values = [r['phases_ms'].get(name, 0.0) for r in ok]
+        print(f"{name:<16} | {percentile(values, 50):>9.1f} | {percentile(values, 95):>9.1f}")
+
+    failures = {}
+    for r in records:
+        for label, count in r['failures'].items():
+            failures[label] = failures.get(label, 0) + count
+    if failures:
+        print(f"Hatalar: {failures}")
+    if records:
+        print(f"Tepe bellek (MB): {records[-1]['peak_rss_mb']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from settlement import net_debts, offset_lines, owed_matrix, user_positions
+
+# Eski iterrows döngüleri ile settlement.py'yi süre açısından karşılaştırır. Sonuçların
+# aynı olduğu ve değişmezler (para korunur, en az transfer <= n-1) tests/test_settlement.py'de.
+# Kullanım: python -m bench.bench_settlement [harcama_sayısı ...]
+SIZES = [500, 2000, 5000]
+RESIDENTS = ["Metin", "Zafer", "Doğan", "Mehmet", "Ayşe", "Elif"]
+
+def synthetic_payments(n_expenses, residents=RESIDENTS, seed=1):
+    # Her harcama alan kişi dışındaki herkese eşit bölünür (panelin yaptığı gibi)
+    rng = np.random.default_rng(seed)
+    buyers = rng.choice(residents, n_expenses)
+    prices = rng.integers(10, 2000, n_expenses).astype(float)
+    rows = []
+    for exp_id, (buyer, price) in enumerate(zip(buyers, prices), start=1):
+        share = price / len(residents)
+        for name in residents:
+            if name != buyer:
+                rows.append((exp_id, name, buyer, share, f"ürün {exp_id}", pd.Timestamp("2024-01-01")))
+    return pd.DataFrame(rows, columns=['expense_id', 'payer', 'receiver', 'amount', 'item_name', 'date'])
+
+# --- ESKİ YÖNTEM (dashboard.py'deki döngüler) ---
+def legacy(payments, residents):
+    net_matrix_df = payments.groupby(['payer', 'receiver'])['amount'].sum().reset_index()
+    debts = {}
+    processed_pairs = set()
+    for _, row in net_matrix_df.iterrows():
+        p1, p2 = row['payer'], row['receiver']
+        pair = tuple(sorted((p1, p2)))
+        if pair in processed_pairs: continue
+        processed_pairs.add(pair)
+        amt1 = net_matrix_df[(net_matrix_df['payer'] == p1) & (net_matrix_df['receiver'] == p2)]['amount'].sum()
+        amt2 = net_matrix_df[(net_matrix_df['payer'] == p2) & (net_matrix_df['receiver'] == p1)]['amount'].sum()
+        diff = amt1 - amt2
+        if diff > 0: debts[(p1, p2)] = diff
+        elif diff < 0: debts[(p2, p1)] = -diff
+
+    offsets = 0
+    for _, row in payments.iterrows():
+        opp_amt = net_matrix_df[(net_matrix_df['payer'] == row['receiver']) & (net_matrix_df['receiver'] == row['payer'])]['amount'].sum()
+        if opp_amt > 0: offsets += 1
+
+    positions = {}
+    for me in residents:
+        for name in residents:
+            if name == me: continue
+            they_owe_me = payments[(payments['payer'] == name) & (payments['receiver'] == me)]['amount'].sum()
+            i_owe_them = payments[(payments['payer'] == me) & (payments['receiver'] == name)]['amount'].sum()
+            positions[(me, name)] = i_owe_them - they_owe_me
+    return debts, offsets, positions
+
+def vectorized(payments, residents):
+    owed = owed_matrix(payments, residents)
+    debts = {(p, r): a for p, r, a in net_debts(owed).itertuples(index=False)}
+    offsets = len(offset_lines(payments, owed))
+    positions = {me: user_positions(owed, me) for me in residents}
+    return debts, offsets, positions, owed
+
+def timed(fn):
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) * 1000.0
+
+def main():
+    sizes = [int(x) for x in sys.argv[1:]] or SIZES
+    print(f"{'harcama':>8} | {'ödeme':>7} | {'eski (ms)':>10} | {'yeni (ms)':>9} | {'hızlanma':>8}")
+    for n in sizes:
+        payments = synthetic_payments(n)
+        old_ms = timed(lambda: legacy(payments, RESIDENTS))
+        new_ms = timed(lambda: vectorized(payments, RESIDENTS))
+        print(f"{n:>8} | {len(payments):>7} | {old_ms:>10.1f} | {new_ms:>9.1f} | {old_ms / new_ms:>7.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import psycopg2
+import psycopg2.pool
+from streamlit.testing.v1 import AppTest
+
+import db
+from bench import scratch
+from rollup import DAILY_BACKFILL_SQL
+from snapshot import SnapshotStore
+
+# Panelin ilk çizim süresini (time-to-first-render) soğuk başlangıçta (anlık görüntü yok,
+# tüm okumalar çekilip ayrıştırılır) ve ılık başlangıçta (diskteki Arrow anlık görüntüsü +
+# sadece sonraki satırlar) AppTest ile ölçer. Her ölçümden önce süreç önbellekleri temizlenir,
+# yani yeniden başlatılmış bir uygulama gibi davranır. Panel girişsiz çizilir (DASHBOARD_PUBLIC).
+# Kullanım: TEST_DATABASE_URL=... python -m bench.bench_snapshot --readings 500000
+SCRATCH_SCHEMA = "snapshot_bench"
+DASHBOARD = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dashboard.py")
+
+def seed(database_url, n_readings):
+    conn = psycopg2.connect(database_url)
+    try:
+        scratch.create(conn, SCRATCH_SCHEMA)
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO readings (date_time, account_no, balance)
+                -- dakikalık okumalar, 30 günde bir yükleme
+                SELECT TIMESTAMP '2020-01-01' + (i || ' minutes')::interval, '00470913', 4000 - (i %% 43200) * 0.08
+                FROM generate_series(1, %s) i
+            """, (n_readings,))
+            cur.execute(DAILY_BACKFILL_SQL)
+            cur.execute("ANALYZE readings, energy_daily")
+        conn.commit()
+    finally:
+        conn.close()
+
+def add_readings(database_url, n):
+    # İki başlangıç arasında gelen yeni okumalar (delta)
+    conn = psycopg2.connect(database_url, options=scratch.options(SCRATCH_SCHEMA))
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO readings (date_time, account_no, balance)
+                SELECT m.t + (i || ' minutes')::interval, '00470913', 1000
+                FROM (SELECT max(date_time) AS t FROM readings) m, generate_series(1, %s) i
+            """, (n,))
+        conn.commit()
+    finally:
+        conn.close()
+
+def first_render(store):
+    # Yeni süreç: önbellekler boş, anlık görüntü deposu baştan
+    db.get_snapshot_store = lambda account_no: store
+    db.get_readings_cache.clear()
+    db.invalidate_reads()
+    os.environ["DASHBOARD_PUBLIC"] = "1"
+    at = AppTest.from_file(DASHBOARD, default_timeout=300)
+    started = time.perf_counter()
+    at.run()
+    elapsed = (time.perf_counter() - started) * 1000.0
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    store.join()  # arka plandaki anlık görüntü yazımı ölçümü etkilemesin
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readings", type=int, default=500_000)
+    parser.add_argument("--delta", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    database_url = os.environ.get("TEST_DATABASE_URL")
+    if not database_url:
+        print("HATA: TEST_DATABASE_URL bulunamadı!")
+        return
+    seed(database_url, args.readings)
+    pool = psycopg2.pool.ThreadedConnectionPool(1, 5, database_url, options=scratch.options(SCRATCH_SCHEMA))
+    db.get_pool = lambda: pool
+    snapshot_dir = tempfile.mkdtemp(prefix="snapshot_bench_")
+    try:
+        first_render(SnapshotStore(snapshot_dir))  # ısınma: içe aktarmalar
+        cold, warm = [], []
+        for _ in range(args.repeat):
+            shutil.rmtree(snapshot_dir, ignore_errors=True)
+            cold.append(first_render(SnapshotStore(snapshot_dir)))
+            add_readings(database_url, args.delta)
+            warm.append(first_render(SnapshotStore(snapshot_dir)))
+        size_mb = sum(os.path.getsize(os.path.join(snapshot_dir, f)) for f in os.listdir(snapshot_dir)) / 1e6
+
+        print(f"{args.readings:,} okuma, başlangıçlar arası {args.delta} yeni okuma, anlık görüntü {size_mb:.1f} MB")
+        print(f"{'başlangıç':<10} | {'medyan (ms)':>11} | {'en iyi (ms)':>11}")
+        print(f"{'soğuk':<10} | {statistics.median(cold):>11.1f} | {min(cold):>11.1f}")
+        print(f"{'ılık':<10} | {statistics.median(warm):>11.1f} | {min(warm):>11.1f}")
+        print("Not: yerel Postgres; ağ üzerinden tüm tabloyu çekme süresi soğuk başlangıçta daha da büyüktür.")
+    finally:
+        pool.closeall()
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+        scratch.drop(database_url, SCRATCH_SCHEMA)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import psycopg2
+
+from bench import scratch
+from spool import ReadingSpool
+
+# Yerel okuma kuyruğunu (spool.py) yerel Postgres'e karşı dener ve ölçer:
+#  1) kesinti: veritabanına ulaşılamayan N çalışma boyunca okumalar kuyrukta birikir,
+#     veritabanı dönünce tek seferde aktarılır (kayıp yok)
+#  2) çökme: Postgres'e yazılmış ama yerelden silinmemiş parti tekrar gönderilir (tekrar yok)
+#  3) aktarım hızı: parti boyutuna göre satır/sn, eski satır satır INSERT + commit ile karşılaştırma
+# Kullanım: TEST_DATABASE_URL=... python -m bench.bench_spool --rows 100000
+SCRATCH_SCHEMA = "spool_bench"
+DOWN_URL = "postgresql://bench@127.0.0.1:1/yok"  # kapalı port: bağlantı hemen reddedilir
+
+def connect(database_url):
+    return psycopg2.connect(database_url, options=scratch.options(SCRATCH_SCHEMA), connect_timeout=2)
+
+def prepare_db(database_url):
+    conn = psycopg2.connect(database_url)
+    try:
+        scratch.create(conn, SCRATCH_SCHEMA)
+    finally:
+        conn.close()
+
+def reset_tables(conn):
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE readings, energy_daily")
+    conn.commit()
+
+def stored(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT count(*), count(DISTINCT (account_no, date_time)) FROM readings")
+        return cur.fetchone()
+
+def make_rows(n, n_meters, start=datetime(2026, 1, 1)):
+    return [(start + timedelta(seconds=15 * (i // n_meters)), f"{1 + i % n_meters:08d}", round(4000 - i * 0.001, 2))
+            for i in range(n)]
+
+def outage(database_url, spool_path, runs):
+    readings = ReadingSpool(spool_path)
+    failed = 0
+    for row in make_rows(runs, 1):
+        readings.append([row])
+        try:
+            readings.flush(connect(DOWN_URL))
+        except psycopg2.OperationalError:
+            failed += 1
+    pending = readings.pending()
+
+    conn = connect(database_url)
+    reset_tables(conn)
+    started = time.perf_counter()
+    flushed, inserted = readings.flush(conn)
+    elapsed = (time.perf_counter() - started) * 1000.0
+    total, distinct = stored(conn)
+    print(f"Kesinti: {runs} çalışmanın {failed}'i veritabanına ulaşamadı, kuyrukta {pending} okuma birikti")
+    print(f"  veritabanı dönünce: {flushed} aktarıldı, {inserted} eklendi, {elapsed:.1f} ms; "
+          f"tabloda {total} satır, kuyrukta {readings.pending()} kaldı")
+
+    # Çökme: aynı okumalar Postgres'e yazıldıktan sonra yerelden silinmeden tekrar gönderilir
+    readings.append(make_rows(runs, 1))
+    flushed, inserted = readings.flush(conn)
+    total, distinct = stored(conn)
+    print(f"Tekrar gönderim: {flushed} aktarıldı, {inserted} eklendi; tabloda {total} satır ({distinct} benzersiz)")
+    conn.close()
+    readings.close()
+
+def row_by_row(conn, rows):
+    # Eski app.py yolu: her okuma ayrı INSERT + commit
+    with conn.cursor() as cur:
+        for row in rows:
+            cur.execute("INSERT INTO readings (date_time, account_no, balance) VALUES (%s, %s, %s)", row)
+            conn.commit()
+
+def throughput(database_url, spool_path, n_rows, n_meters, batch_sizes):
+    rows = make_rows(n_rows, n_meters)
+    conn = connect(database_url)
+    try:
+        sample = rows[:min(2000, n_rows)]
+        reset_tables(conn)
+        started = time.perf_counter()
+        row_by_row(conn, sample)
+        old_rate = len(sample) / (time.perf_counter() - started)
+
+        print(f"\n{n_rows:,} okuma, {n_meters} sayaç")
+        print(f"{'yöntem':<26} | {'süre (ms)':>10} | {'satır/sn':>10}")
+        print(f"{'eski: satır satır commit':<26} | {n_rows / old_rate * 1000:>10.1f} | {old_rate:>10,.0f}  (tahmini)")
+        for batch in batch_sizes:
+            readings = ReadingSpool(spool_path)
+            started = time.perf_counter()
+            readings.append(rows)
+            append_ms = (time.perf_counter() - started) * 1000.0
+            reset_tables(conn)
+            started = time.perf_counter()
+            flushed, _ = readings.flush(conn, batch_size=batch)
+            elapsed = time.perf_counter() - started
+            readings.close()
+            label = f"kuyruk, parti {batch}"
+            print(f"{label:<26} | {elapsed * 1000:>10.1f} | {flushed / elapsed:>10,.0f}  (kuyruğa yazma {append_ms:.0f} ms)")
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=200, help="kesinti sırasında çalışma sayısı")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--meters", type=int, default=50)
+    parser.add_argument("--batches", default="500,5000,20000")
+    args = parser.parse_args()
+
+    database_url = os.environ.get("TEST_DATABASE_URL")
+    if not database_url:
+        print("HATA: TEST_DATABASE_URL bulunamadı!")
+        return
+    prepare_db(database_url)
+    spool_dir = tempfile.mkdtemp(prefix="spool_bench_")
+    try:
+        outage(database_url, os.path.join(spool_dir, "outage.db"), args.runs)
+        throughput(database_url, os.path.join(spool_dir, "throughput.db"), args.rows, args.meters,
+                   [int(b) for b in args.batches.split(",")])
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+        scratch.drop(database_url, SCRATCH_SCHEMA)
+
+if __name__ == "__main__":
+    main()
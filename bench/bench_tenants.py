@@ -0,0 +1,275 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import psycopg2
+import psycopg2.pool
+from streamlit.testing.v1 import AppTest
+
+import db
+from bench import scratch
+from bench.bench_scrape import percentile
+from events import ANOMALY_SQL
+from log_feed import FEED_SQL, feed_params
+from rollup import DAILY_SQL, SUMMARY_SQL
+from spool import write_readings
+from tenants import RESIDENTS_SQL, TENANT_SQL
+
+# Daire sayısı arttıkça bir dairenin sayfa sorgularının süresinin sabit kaldığını gösterir.
+# Geçici bir şemaya kademeli olarak daire eklenir (her biri kendi sayacı, 4 kullanıcısı,
+# harcamaları ve borçlarıyla; okumalar spool.write_readings ile yazılır, yani günlük özet ve
+# olaylar da gerçek yazma yolundan hesaplanır). Her kademede rastgele seçilen dairelerde
+# dashboard.py'nin giriş yapmış kullanıcı için çalıştırdığı sorgular ölçülür (istemci tarafı,
+# satırlar çekilene kadar). --renders verilirse paneli AppTest ile ?daire=<slug> adresinden
+# açar: her daire süreç önbelleklerine (okumalar, tahmin, anlık görüntü) soğuk girer; ilk
+# yükleme girişsiz veri gösterir (DASHBOARD_PUBLIC), giriş sonrası borçlar ve kullanıcı paneli eklenir.
+# Kullanım: TEST_DATABASE_URL=... python -m bench.bench_tenants --tenants 10,100,1000,3000
+SCRATCH_SCHEMA = "tenant_bench"
+DASHBOARD = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dashboard.py")
+PEOPLE = ["Metin", "Zafer", "Doğan", "Mehmet"]
+START = datetime(2026, 1, 1)
+CHUNK = 250  # bir write_readings çağrısındaki daire sayısı
+
+# dashboard.py'deki daireye özel sorgular (giriş, borçlar, tahsil) parametreleri ile
+LOGIN_SQL = "SELECT * FROM users WHERE tenant_id = %s AND username = %s AND password = %s"
+DEBTS_SQL = """
+    SELECT p.*, u.username as payer, r.username as receiver, e.item_name, e.date_time as date
+    FROM payments p JOIN users u ON p.payer_id = u.id JOIN users r ON p.receiver_id = r.id JOIN expenses e ON p.expense_id = e.id
+    WHERE e.tenant_id = %s AND p.status = 'pending_payment'
+"""
+COLLECT_SQL = """
+    UPDATE payments p SET status = 'paid'
+    FROM users u
+    WHERE u.tenant_id = %s AND u.username = %s AND p.status = 'pending_payment'
+    AND ((p.payer_id = u.id AND p.receiver_id = %s)
+      OR (p.payer_id = %s AND p.receiver_id = u.id))
+"""
+READINGS_ALL_SQL = "SELECT * FROM readings WHERE account_no = %s ORDER BY date_time ASC"
+READINGS_SINCE_SQL = "SELECT * FROM readings WHERE account_no = %s AND date_time > %s ORDER BY date_time ASC"
+
+def page_queries(t, days):
+    # (etiket, sorgu, parametreler); t: (id, slug, account_no, metin_id)
+    tenant_id, slug, account_no, user_id = t
+    tenant = {'id': tenant_id, 'account_no': account_no}
+    watermark = START + timedelta(days=days - 1)
+    return [
+        ("daire", TENANT_SQL, {'slug': slug}),
+        ("sakinler", RESIDENTS_SQL, (tenant_id,)),
+        ("giriş", LOGIN_SQL, (tenant_id, "Metin", "1")),
+        ("enerji özeti", SUMMARY_SQL, {'account_no': account_no}),
+        ("anomaliler", ANOMALY_SQL, {'account_no': account_no}),
+        ("okumalar (soğuk)", READINGS_ALL_SQL, (account_no,)),
+        ("okumalar (artımlı)", READINGS_SINCE_SQL, (account_no, watermark)),
+        ("günlük tüketim", DAILY_SQL, {'account_no': account_no}),
+        ("bekleyen borçlar", DEBTS_SQL, (tenant_id,)),
+        ("log akışı", FEED_SQL, feed_params(tenant)),
+        ("tahsil ettim", COLLECT_SQL, (tenant_id, "Zafer", user_id, user_id)),
+    ]
+
+# --- VERİ ---
+def setup(conn):
+    scratch.create(conn, SCRATCH_SCHEMA)
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM tenants")  # göç 7'nin boş veritabanında eklediği daire
+    conn.commit()
+
+def meter_rows(account_no, days, rng):
+    # Saatlik okumalar; sayaç başına farklı tüketim, bakiye 300 ₺'nin altına inince yükleme
+    drops = rng.uniform(0.5, 2.5) * rng.uniform(0.5, 1.5, days * 24)
+    balance, rows = 2000.0, []
+    for i, drop in enumerate(drops):
+        balance -= drop
+        if balance < 300:
+            balance += 1500
+        rows.append((START + timedelta(hours=i), account_no, round(balance, 2)))
+    return rows
+
+def add_tenants(conn, first, last, days, expenses, rng):
+    # first..last (dahil) numaralı daireler: daire, kullanıcılar, harcamalar + borçlar, okumalar
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO tenants (slug, name, account_no)
+            SELECT 'bench-' || i, 'Daire ' || i, lpad(i::text, 8, '0') FROM generate_series(%s, %s) i
+            RETURNING id
+        """, (first, last))
+        ids = [row[0] for row in cur.fetchall()]
+        cur.execute("""
+            INSERT INTO users (tenant_id, username, password, role)
+            SELECT t, p, '1', 'user' FROM unnest(%s::int[]) t, unnest(%s::text[]) WITH ORDINALITY u(p, n)
+            ORDER BY t, n
+        """, (ids, PEOPLE))
+        # Harcamalar gün boyunca dağılır; alıcı dışındaki herkes borçlanır, son 10 harcama ödenmemiş
+        cur.execute("""
+            INSERT INTO expenses (tenant_id, item_name, price, buyer, date_time)
+            SELECT t, 'ürün ' || i, 20 + (i * 37) %% 200, (%s::text[])[1 + i %% 4],
+                   %s::timestamp + make_interval(hours => i * %s * 24 / %s)
+            FROM unnest(%s::int[]) t, generate_series(0, %s - 1) i
+        """, (PEOPLE, START, days, expenses, ids, expenses))
+        cur.execute("""
+            INSERT INTO payments (expense_id, payer_id, receiver_id, amount, status)
+            SELECT e.id, u.id, b.id, round(e.price / 4, 2),
+                   CASE WHEN e.date_time >= %s THEN 'pending_payment' ELSE 'paid' END
+            FROM expenses e
+            JOIN users b ON b.tenant_id = e.tenant_id AND b.username = e.buyer
+            JOIN users u ON u.tenant_id = e.tenant_id AND u.username <> e.buyer
+            WHERE e.tenant_id = ANY(%s)
+        """, (START + timedelta(hours=(expenses - 10) * days * 24 // expenses), ids))
+    conn.commit()
+    for start in range(first, last + 1, CHUNK):
+        rows = []
+        for i in range(start, min(start + CHUNK, last + 1)):
+            rows += meter_rows(f"{i:08d}", days, rng)
+        write_readings(conn, rows)
+
+def sample_tenants(conn, n, rng):
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT t.id, t.slug, t.account_no, u.id FROM tenants t
+            JOIN users u ON u.tenant_id = t.id AND u.username = 'Metin'
+        """)
+        rows = cur.fetchall()
+    return rng.sample(rows, min(n, len(rows)))
+
+# --- ÖLÇÜM ---
+def timed(conn, sql, params):
+    with conn.cursor() as cur:
+        started = time.perf_counter()
+        cur.execute(sql, params)
+        if cur.description is not None:
+            cur.fetchall()
+        elapsed = (time.perf_counter() - started) * 1000.0
+    conn.rollback()  # tahsil ettim geri alınsın, her ölçüm aynı veride yapılsın
+    return elapsed
+
+def measure(conn, tenants, days):
+    # Dönüş: [(etiket, ms), ...]; her daire için iki tur, ilki ısınma
+    results = []
+    for rnd in range(2):
+        for t in tenants:
+            for label, sql, params in page_queries(t, days):
+                ms = timed(conn, sql, params)
+                if rnd:
+                    results.append((label, ms))
+    return results
+
+def relations(plan):
+    # EXPLAIN (FORMAT JSON) planındaki tablo/bölüm adları
+    found = [plan['Relation Name']] if 'Relation Name' in plan else []
+    for child in plan.get('Plans', []):
+        found += relations(child)
+    return found
+
+def scanned_partitions(conn, t, days):
+    label, sql, params = [q for q in page_queries(t, days) if q[0] == "okumalar (artımlı)"][0]
+    with conn.cursor() as cur:
+        cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cur.fetchone()[0]
+    conn.rollback()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return [r for r in relations(plan[0]['Plan']) if r.startswith("readings")]
+
+def table_rows(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT (SELECT count(*) FROM readings), (SELECT count(*) FROM payments)")
+        return cur.fetchone()
+
+def render(tenants):
+    # Panelin ilk yüklemesi ve girişi, her daire soğuk süreç önbellekleriyle
+    first, login = [], []
+    os.environ["DASHBOARD_PUBLIC"] = "1"
+    for tenant_id, slug, account_no, user_id in tenants:
+        at = AppTest.from_file(DASHBOARD, default_timeout=120)
+        at.query_params["daire"] = slug
+        started = time.perf_counter()
+        at.run()
+        first.append((time.perf_counter() - started) * 1000.0)
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+        at.sidebar.text_input[0].input("Metin")
+        at.sidebar.text_input[1].input("1")
+        at.sidebar.button[0].click()
+        started = time.perf_counter()
+        at.run()
+        login.append((time.perf_counter() - started) * 1000.0)
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+        if not at.metric:
+            raise RuntimeError(f"{slug}: enerji metrikleri yok")
+    return first, login
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tenants", default="10,100,1000,3000", help="virgülle ayrılmış daire sayıları (artan)")
+    parser.add_argument("--days", type=int, default=30, help="daire başına saatlik okuma günü")
+    parser.add_argument("--expenses", type=int, default=60, help="daire başına harcama")
+    parser.add_argument("--sample", type=int, default=50, help="her kademede ölçülen rastgele daire")
+    parser.add_argument("--renders", type=int, default=0, help="her kademede AppTest ile açılan daire (0: yok)")
+    args = parser.parse_args()
+
+    database_url = os.environ.get("TEST_DATABASE_URL")
+    if not database_url:
+        print("HATA: TEST_DATABASE_URL bulunamadı!")
+        return
+    rng = np.random.default_rng(11)
+    pick = random.Random(11)
+    conn = psycopg2.connect(database_url, options=scratch.options(SCRATCH_SCHEMA))
+    pool = psycopg2.pool.ThreadedConnectionPool(1, 5, database_url, options=scratch.options(SCRATCH_SCHEMA))
+    db.get_pool = lambda: pool
+    snapshot_dir = tempfile.mkdtemp(prefix="tenant_bench_")
+    db.SNAPSHOT_DIR = snapshot_dir
+    try:
+        setup(conn)
+        if args.renders:
+            AppTest.from_file(DASHBOARD, default_timeout=120).run()  # ısınma: içe aktarmalar
+        print(f"daire başına: {args.days} gün saatlik okuma, {len(PEOPLE)} kullanıcı, {args.expenses} harcama; "
+              f"her kademede {args.sample} rastgele daire")
+        levels, by_query = [], {}
+        count = 0
+        for level in (int(s) for s in args.tenants.split(",")):
+            started = time.perf_counter()
+            add_tenants(conn, count + 1, level, args.days, args.expenses, rng)
+            with conn.cursor() as cur:
+                cur.execute("ANALYZE")
+            conn.commit()
+            seed_s = time.perf_counter() - started
+            count = level
+
+            tenants = sample_tenants(conn, args.sample, pick)
+            results = measure(conn, tenants, args.days)
+            pages = [sum(ms for _, ms in results[i:i + 11]) for i in range(0, len(results), 11)]
+            frame = pd.DataFrame(results, columns=["sorgu", "ms"])
+            by_query[level] = frame.groupby("sorgu", sort=False)["ms"].median()
+            parts = scanned_partitions(conn, tenants[0], args.days)
+            readings, payments = table_rows(conn)
+            row = {'daire': level, 'okuma': readings, 'ödeme': payments, 'ekleme_sn': seed_s,
+                   'sayfa_p50': percentile(pages, 50), 'sayfa_p95': percentile(pages, 95),
+                   'bölüm': f"{len(parts)}/16"}
+            if args.renders:
+                db.invalidate_reads()
+                first, login = render(tenants[:args.renders])
+                row['panel_p50'] = percentile(first, 50)
+                row['giriş_p50'] = percentile(login, 50)
+            levels.append(row)
+            print(f"{level} daire hazır ({seed_s:.1f} sn), ölçüldü.")
+
+        print("\nKademe bazında (sayfa: giriş yapmış kullanıcının 11 sorgusunun toplamı, ms):")
+        print(pd.DataFrame(levels).set_index('daire').round(1).to_string())
+        print("\nSorgu bazında p50 (ms):")
+        print(pd.DataFrame(by_query).round(2).to_string())
+        print("\n'bölüm': artımlı okuma sorgusunun taradığı readings bölümü (HASH, 16 bölüm).")
+    finally:
+        pool.closeall()
+        conn.close()
+        scratch.drop(database_url, SCRATCH_SCHEMA)
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
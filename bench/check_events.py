@@ -0,0 +1,149 @@
+import contextlib
+import io
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import psycopg2
+from psycopg2.extras import execute_values
+
+import schema
+from bench import scratch
+from events import EVENTS_BACKFILL_SQL
+from spool import write_readings
+
+# Olay tespitini (events.py) yerel bir Postgres'te, içine bilinen olaylar eklenmiş yapay
+# serilerle kontrol eder. Her sayaç 2 saatte bir okuma verir, günlük tüketim ~30 ₺:
+# - yükleme: belirli okumalarda +1500 ₺
+# - tüketim tepesi: bir günde her aralıkta 3 kat düşüş (yüksek anomali)
+# - takılan sayaç: bir gün boyunca okumalar gelir ama bakiye değişmez (düşük anomali)
+# - kesinti: 60 saat okuma yok (kesinti olayı; değdiği günler anomali sayılmaz)
+# Beklenen olaylar birebir bulunmalı (fazlası da hata sayılır). İlk yarı göçle geri doldurulur,
+# kalan okumalar spool.write_readings ile küçük partiler halinde yazılır; sonuç tüm geçmişin
+# baştan hesaplanmasıyla da aynı olmalı.
+# Kullanım: TEST_DATABASE_URL=postgresql://localhost/test python -m bench.check_events
+SCRATCH_SCHEMA = "events_check"
+START = pd.Timestamp("2026-01-01 00:30:00")
+STEP = pd.Timedelta(hours=2)
+N_DAYS = 90
+
+def synthetic_meter(account_no, seed, spikes=(), stuck=(), recharges=(), gap=None):
+    # spikes/stuck: gün numaraları; recharges: okuma sıra numaraları; gap: (başlangıç günü, saat)
+    rng = np.random.default_rng(seed)
+    rows, expected = [], []
+    balance = 3000.0
+    t = START
+    gap_start = START + pd.Timedelta(days=gap[0], hours=9) if gap else None
+    last_time = None
+    for i in range(N_DAYS * 12):
+        if gap_start is not None and gap_start <= t < gap_start + pd.Timedelta(hours=gap[1]):
+            t += STEP
+            continue
+        day = (t - START).days
+        drop = rng.uniform(1.5, 3.5)
+        if day in spikes:
+            drop *= 3
+        if day in stuck:
+            drop = 0.0
+        balance -= drop
+        if i in recharges:
+            balance += 1500
+            expected.append((account_no, t, 'recharge'))
+        if last_time is not None and t - last_time > STEP:
+            expected.append((account_no, t, 'stale'))
+        rows.append((t.to_pydatetime(), account_no, round(balance, 2)))
+        last_time = t
+        t += STEP
+    for day in (*spikes, *stuck):
+        expected.append((account_no, START.normalize() + pd.Timedelta(days=day, hours=23, minutes=59), 'anomaly'))
+    return rows, expected
+
+def synthetic_readings():
+    meters = [
+        synthetic_meter("00000001", 1, spikes=(20, 61), recharges=(300, 700)),
+        synthetic_meter("00000002", 2, stuck=(35,), recharges=(500,)),
+        synthetic_meter("00000003", 3, spikes=(75,), gap=(40, 60)),
+        synthetic_meter("00000004", 4),  # hiç olay yok: yanlış alarm olmamalı
+    ]
+    rows = sorted((row for m, _ in meters for row in m), key=lambda r: (r[0], r[1]))
+    expected = sorted((e[0], e[1].to_pydatetime(), e[2]) for _, m in meters for e in m)
+    return rows, expected
+
+def insert(conn, rows):
+    with conn.cursor() as cur:
+        execute_values(cur, "INSERT INTO readings (date_time, account_no, balance) VALUES %s", rows)
+    conn.commit()
+
+def fetch_events(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT account_no, ev_time, kind, amount, score FROM energy_events
+            ORDER BY account_no, ev_time, kind
+        """)
+        return cur.fetchall()
+
+def compare(conn, events, expected):
+    got = sorted((a, t, k) for a, t, k, _, _ in events if k != 'consumption')
+    missing = sorted(set(expected) - set(got))
+    extra = sorted(set(got) - set(expected))
+    errors = [f"eksik: {e}" for e in missing] + [f"fazla: {e}" for e in extra]
+    # Günlük tüketim olayları energy_daily ile birebir aynı olmalı
+    with conn.cursor() as cur:
+        cur.execute("SELECT account_no, day + TIME '23:59', -drop_total FROM energy_daily WHERE drop_total > 0 ORDER BY 1, 2")
+        daily = cur.fetchall()
+    if daily != [(a, t, m) for a, t, k, m, _ in events if k == 'consumption']:
+        errors.append("günlük tüketim olayları energy_daily ile aynı değil")
+    return errors
+
+def main():
+    database_url = os.environ.get("TEST_DATABASE_URL")
+    if not database_url:
+        print("HATA: TEST_DATABASE_URL bulunamadı!")
+        sys.exit(2)
+
+    conn = psycopg2.connect(database_url)
+    failures = 0
+    try:
+        rows, expected = synthetic_readings()
+        half = len(rows) // 2
+        print(f"{len(rows)} okuma, 4 sayaç, {len(expected)} beklenen olay "
+              f"({sum(1 for e in expected if e[2] == 'anomaly')} anomali)")
+
+        # 1) İlk yarı yüklü iken göç + geri doldurma (energy_daily ve energy_events)
+        scratch.create(conn, SCRATCH_SCHEMA, target=0)
+        insert(conn, rows[:half])
+        with contextlib.redirect_stdout(io.StringIO()):
+            schema.migrate(conn)
+        half_time = rows[half - 1][0]
+        errors = compare(conn, fetch_events(conn), [e for e in expected if e[1] <= half_time])
+        print(f"geri doldurma ({half} okuma): {'OK' if not errors else errors}")
+        failures += bool(errors)
+
+        # 2) Kalan okumalar app.py / modbus_ingest.py gibi küçük partilerle yazılır
+        for i in range(half, len(rows), 8):
+            write_readings(conn, rows[i:i + 8])
+        incremental = fetch_events(conn)
+        errors = compare(conn, incremental, expected)
+        print(f"artımlı tespit ({len(rows) - half} okuma): {'OK' if not errors else errors}")
+        failures += bool(errors)
+
+        # 3) Tüm geçmişin baştan hesaplanması artımlı sonuçla aynı olmalı
+        with conn.cursor() as cur:
+            cur.execute(EVENTS_BACKFILL_SQL)
+        conn.commit()
+        full = fetch_events(conn)
+        differ = sorted(set(full) ^ set(incremental))
+        print(f"baştan hesaplama ile aynı: {'OK' if not differ else differ[:5]}")
+        failures += bool(differ)
+
+        for a, t, k, m, s in incremental:
+            if k == 'anomaly':
+                print(f"   {a} {t:%Y-%m-%d} tüketim {abs(float(m)):.1f} ₺, z={s:.1f}")
+    finally:
+        conn.close()
+        scratch.drop(database_url, SCRATCH_SCHEMA)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
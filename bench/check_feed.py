@@ -0,0 +1,83 @@
+import os
+import sys
+
+import pandas as pd
+import psycopg2
+
+from bench import scratch
+from expenses import record_expenses_bulk
+from log_feed import FEED_SQL, feed_params, next_cursor
+
+# Sistem logları sayfalamasının (log_feed.FEED_SQL) satır atlamadığını ve tekrar etmediğini
+# kontrol eder: sayfa boyundan fazla harcama aynı anda (CSV toplu yükleme; tarihsiz satırlar
+# record_expenses_bulk ile yükleme anını alır) ve aynı anda birden fazla enerji olayı (gün sonu
+# tüketim + anomali) varken tüm sayfalar gezilir, her satır tam bir kez ve tarihli gelmelidir.
+# Kullanım: TEST_DATABASE_URL=postgresql://localhost/test python -m bench.check_feed
+SCRATCH_SCHEMA = "feed_check"
+PAGE_SIZE = 50
+
+def seed(conn):
+    # Dönüş: (daire, beklenen satır sayısı)
+    with conn.cursor() as cur:
+        cur.execute("SELECT id, account_no FROM tenants")
+        tenant_id, account_no = cur.fetchone()
+        cur.execute("""
+            INSERT INTO expenses (tenant_id, item_name, price, buyer, date_time)
+            SELECT %s, 'ürün ' || i, 10, 'Metin', TIMESTAMP '2026-01-02' FROM generate_series(1, %s) i
+        """, (tenant_id, 2 * PAGE_SIZE + 30))
+        cur.execute("""
+            INSERT INTO energy_events (account_no, ev_time, kind, amount, detail)
+            SELECT %s, TIMESTAMP '2026-01-02', k, -30, '30 saat'
+            FROM unnest(ARRAY['consumption', 'anomaly', 'recharge', 'stale']) k
+        """, (account_no,))
+        cur.execute("""
+            INSERT INTO energy_events (account_no, ev_time, kind, amount)
+            SELECT %s, TIMESTAMP '2026-01-01' + make_interval(mins => i), 'recharge', 1500
+            FROM generate_series(1, %s) i
+        """, (account_no, PAGE_SIZE + 20))
+        cur.execute("INSERT INTO users (tenant_id, username, password, role) VALUES (%s, 'Metin', '', 'user')", (tenant_id,))
+    conn.commit()
+    # Tarihsiz CSV satırları (date_time None)
+    record_expenses_bulk(conn, tenant_id, [{'item_name': f"tarihsiz {i}", 'price': 10, 'buyer': 'Metin', 'date_time': None,
+                                            'participants': ['Metin']} for i in range(PAGE_SIZE + 10)])
+    return {'id': tenant_id, 'account_no': account_no}, 2 * PAGE_SIZE + 30 + 4 + PAGE_SIZE + 20 + PAGE_SIZE + 10
+
+def all_pages(conn, tenant):
+    keys, before = [], None
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(FEED_SQL, feed_params(tenant, before, PAGE_SIZE))
+            page = pd.DataFrame(cur.fetchall(), columns=[d[0] for d in cur.description])
+        if page.empty:
+            return keys
+        keys += list(zip(page['ev_date'], page['ev_key']))
+        before = next_cursor(page)
+
+def main():
+    database_url = os.environ.get("TEST_DATABASE_URL")
+    if not database_url:
+        print("HATA: TEST_DATABASE_URL bulunamadı!")
+        sys.exit(2)
+
+    conn = psycopg2.connect(database_url)
+    try:
+        scratch.create(conn, SCRATCH_SCHEMA)
+        tenant, expected = seed(conn)
+        keys = all_pages(conn, tenant)
+        errors = []
+        if len(set(keys)) != expected:
+            errors.append(f"{expected} satırdan {len(set(keys))} tanesi geldi")
+        if len(keys) != len(set(keys)):
+            errors.append(f"{len(keys) - len(set(keys))} satır tekrarlandı")
+        if any(pd.isna(ev_date) for ev_date, _ in keys):
+            errors.append("tarihsiz satır geldi")
+        elif keys != sorted(keys, reverse=True):
+            errors.append("sıra bozuk")
+        print(f"sayfalama ({expected} satır, sayfa {PAGE_SIZE}): {'OK' if not errors else errors}")
+    finally:
+        conn.close()
+        scratch.drop(database_url, SCRATCH_SCHEMA)
+    sys.exit(1 if errors else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import math
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import psycopg2
+from psycopg2.extras import execute_values
+
+import schema
+from bench import scratch
+from energy import energy_metrics, full_load
+from rollup import DAILY_SQL, SUMMARY_SQL, refresh_daily, summary_from_row
+
+# Sunucu tarafı özetlerin (energy_daily + SUMMARY_SQL) pandas sonuçlarıyla birebir
+# aynı olduğunu yerel bir Postgres'te kontrol eder. Veriler geçici bir şemaya yazılır.
+# Kullanım: TEST_DATABASE_URL=postgresql://localhost/test python -m bench.check_rollup
+SCRATCH_SCHEMA = "rollup_check"
+ACCOUNT = "00470913"
+
+def synthetic_readings(n_days=60, seed=7):
+    # Düzensiz aralıklı okumalar, yüklemeler ve eksik günler içeren tek sayaç serisi
+    rng = np.random.default_rng(seed)
+    rows, balance, t = [], 3500, pd.Timestamp("2024-01-01 08:00:00")
+    end = t + pd.Timedelta(days=n_days)
+    while t < end:
+        t += pd.Timedelta(minutes=int(rng.integers(30, 60 * 20)))
+        if rng.random() < 0.03:
+            t += pd.Timedelta(days=int(rng.integers(1, 4)))
+        if rng.random() < 0.04:
+            balance += int(rng.integers(500, 2500))
+        else:
+            balance = max(0, balance - int(rng.integers(0, 60)))
+        rows.append((t.to_pydatetime(), ACCOUNT, balance))
+    return rows
+
+def setup(conn):
+    scratch.create(conn, SCRATCH_SCHEMA, migrate=False)
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE readings (
+                id SERIAL PRIMARY KEY,
+                date_time TIMESTAMP NOT NULL,
+                account_no TEXT NOT NULL,
+                balance NUMERIC NOT NULL
+            )
+        """)
+    conn.commit()
+
+def insert(conn, rows):
+    with conn.cursor() as cur:
+        execute_values(cur, "INSERT INTO readings (date_time, account_no, balance) VALUES %s", rows)
+    conn.commit()
+
+def fetch(conn, sql, params=None):
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        cols = [d[0] for d in cur.description]
+        return pd.DataFrame(cur.fetchall(), columns=cols)
+
+def compare(conn, rows):
+    df, drops = full_load(pd.DataFrame(rows, columns=['date_time', 'account_no', 'balance']))
+    expected_metrics = energy_metrics(df)
+    expected_daily = drops.abs()
+
+    got_metrics = summary_from_row(fetch(conn, SUMMARY_SQL, {'account_no': ACCOUNT}).iloc[0])
+    daily = fetch(conn, DAILY_SQL, {'account_no': ACCOUNT})
+    got_daily = pd.Series(daily['drop_total'].astype(float).values, index=daily['day'].values)
+
+    errors = []
+    for key, want in expected_metrics.items():
+        have = got_metrics[key]
+        same = have == want if key == 'last_upd' else math.isclose(have, want, rel_tol=1e-12, abs_tol=1e-9)
+        if not same:
+            errors.append(f"{key}: pandas={want} postgres={have}")
+    if list(got_daily.index) != list(expected_daily.index):
+        errors.append(f"günler farklı: {len(expected_daily)} vs {len(got_daily)}")
+    elif not np.allclose(got_daily.values, expected_daily.values, rtol=0, atol=1e-9):
+        errors.append("günlük tüketim değerleri farklı")
+    return errors
+
+def main():
+    database_url = os.environ.get("TEST_DATABASE_URL")
+    if not database_url:
+        print("HATA: TEST_DATABASE_URL bulunamadı!")
+        sys.exit(2)
+
+    conn = psycopg2.connect(database_url)
+    failures = 0
+    try:
+        setup(conn)
+        rows = synthetic_readings()
+        half = len(rows) // 2
+
+        # 1) İlk yarı yüklü iken göç + geri doldurma
+        insert(conn, rows[:half])
+        schema.migrate(conn)
+        errors = compare(conn, rows[:half])
+        print(f"geri doldurma ({half} okuma): {'OK' if not errors else errors}")
+        failures += bool(errors)
+
+        # 2) Kalan okumalar app.main() gibi teker teker eklenip artımlı tazelenir
+        for row in rows[half:]:
+            insert(conn, [row])
+            with conn.cursor() as cur:
+                refresh_daily(cur, ACCOUNT, row[0])
+            conn.commit()
+        errors = compare(conn, rows)
+        print(f"artımlı tazeleme ({len(rows) - half} okuma): {'OK' if not errors else errors}")
+        failures += bool(errors)
+    finally:
+        conn.close()
+        scratch.drop(database_url, SCRATCH_SCHEMA)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import json
+import os
+import sys
+
+import psycopg2
+
+import schema
+from bench import scratch
+from rollup import DAILY_BACKFILL_SQL, DAILY_SQL, SUMMARY_SQL
+
+# Yerel bir Postgres'e büyük sentetik veri yükler ve paneldeki her sorgu için
+# EXPLAIN ANALYZE sürelerini indeks göçünden (2) önce ve sonra raporlar.
+# Kullanım: TEST_DATABASE_URL=postgresql://localhost/test python -m bench.explain_queries [okuma_sayısı]
+SCRATCH_SCHEMA = "explain_bench"
+INDEX_MIGRATION = 2
+READINGS = 500_000
+ACCOUNTS = 50
+USERS = 40
+EXPENSES = 50_000
+
+# dashboard.py / db.py'deki sorgular (parametreleri sabitlenmiş halde)
+QUERIES = [
+    ("giriş kontrolü", "SELECT * FROM users WHERE username = %s AND password = %s", ("kisi7", "x")),
+    ("okumalar (artımlı)", "SELECT * FROM readings WHERE date_time > %s ORDER BY date_time ASC", ("2025-12-31",)),
+    ("enerji özeti", SUMMARY_SQL, {'account_no': "00000007"}),
+    ("günlük tüketim", DAILY_SQL, {'account_no': "00000007"}),
+    ("bekleyen borçlar", """
+        SELECT p.*, u.username as payer, r.username as receiver, e.item_name, e.date_time as date
+        FROM payments p JOIN users u ON p.payer_id = u.id JOIN users r ON p.receiver_id = r.id JOIN expenses e ON p.expense_id = e.id
+        WHERE p.status = 'pending_payment'
+    """, ()),
+    ("tahsil ettim (eski)", """
+        UPDATE payments SET status = 'paid'
+        WHERE status = 'pending_payment'
+        AND ((payer_id = (SELECT id FROM users WHERE username=%s) AND receiver_id = %s)
+          OR (payer_id = %s AND receiver_id = (SELECT id FROM users WHERE username=%s)))
+    """, ("kisi3", 5, 5, "kisi3")),
+    ("tahsil ettim", """
+        UPDATE payments p SET status = 'paid'
+        FROM users u
+        WHERE u.username = %s AND p.status = 'pending_payment'
+        AND ((p.payer_id = u.id AND p.receiver_id = %s)
+          OR (p.payer_id = %s AND p.receiver_id = u.id))
+    """, ("kisi3", 5, 5)),
+    ("harcama logları", "SELECT item_name, price, buyer, date_time FROM expenses", ()),
+]
+
+def load_data(cur, n_readings):
+    per_account = n_readings // ACCOUNTS
+    cur.execute("""
+        INSERT INTO readings (date_time, account_no, balance)
+        SELECT TIMESTAMP '2026-01-01' - (i || ' minutes')::interval * 30,
+               lpad(a::text, 8, '0'),
+               4000 - (i * 7 %% 3700)
+        FROM generate_series(1, %s) a, generate_series(1, %s) i
+    """, (ACCOUNTS, per_account))
+    cur.execute("INSERT INTO users (username, password, role) SELECT 'kisi' || i, 'x', 'user' FROM generate_series(1, %s) i", (USERS,))
+    cur.execute("""
+        INSERT INTO expenses (item_name, price, buyer, date_time)
+        SELECT 'ürün ' || i, 10 + i %% 500, 'kisi' || (1 + i %% %s), TIMESTAMP '2024-01-01' + (i || ' minutes')::interval * 15
+        FROM generate_series(1, %s) i
+    """, (USERS, EXPENSES))
+    # Her harcama 3 kişiye bölünür; eski harcamaların çoğu ödenmiş
+    cur.execute("""
+        INSERT INTO payments (expense_id, payer_id, receiver_id, amount, status)
+        SELECT e.id, 1 + (e.id + k) %% %s, 1 + e.id %% %s, e.price / 4,
+               CASE WHEN e.id > %s THEN 'pending_payment' ELSE 'paid' END
+        FROM expenses e, generate_series(1, 3) k
+    """, (USERS, USERS, EXPENSES - 2000))
+
+def explain(conn, sql, params):
+    with conn.cursor() as cur:
+        cur.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + sql, params)
+        plan = cur.fetchone()[0]
+    conn.rollback()  # UPDATE'ler geri alınsın, her ölçüm aynı veride yapılsın
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Execution Time'] + plan[0].get('Planning Time', 0.0)
+
+def measure(conn, repeat=3):
+    results = {}
+    for label, sql, params in QUERIES:
+        results[label] = min(explain(conn, sql, params) for _ in range(repeat))
+    return results
+
+def main():
+    database_url = os.environ.get("TEST_DATABASE_URL")
+    if not database_url:
+        print("HATA: TEST_DATABASE_URL bulunamadı!")
+        sys.exit(2)
+    n_readings = int(sys.argv[1]) if len(sys.argv) > 1 else READINGS
+
+    conn = psycopg2.connect(database_url)
+    try:
+        scratch.create(conn, SCRATCH_SCHEMA, target=INDEX_MIGRATION - 1)
+        with conn.cursor() as cur:
+            cur.execute("SET synchronous_commit TO off")
+            load_data(cur, n_readings)
+            cur.execute("DELETE FROM energy_daily")
+            cur.execute(DAILY_BACKFILL_SQL)
+            cur.execute("ANALYZE readings, users, expenses, payments, energy_daily")
+        conn.commit()
+        print(f"{n_readings} okuma, {EXPENSES} harcama, {EXPENSES * 3} ödeme yüklendi.\n")
+
+        before = measure(conn)
+        schema.migrate(conn, target=INDEX_MIGRATION)
+        after = measure(conn)
+
+        print(f"{'sorgu':<22} | {'önce (ms)':>10} | {'sonra (ms)':>10} | {'kazanç':>7}")
+        for label, _, _ in QUERIES:
+            b, a = before[label], after[label]
+            print(f"{label:<22} | {b:>10.2f} | {a:>10.2f} | {b / a if a else 0:>6.1f}x")
+    finally:
+        conn.close()
+        scratch.drop(database_url, SCRATCH_SCHEMA)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- ÖRNEK CEVAPLAR ---
+# Yol -> fixtures klasöründeki dosya. Sunucu cevapları olduğu gibi tekrar oynatır.
+# Bunlar KIBTEK'ten kaydedilmiş cevaplar değildir: JSON uç noktası ve cevap biçimi varsayımdır
+# (bkz. app.KIBTEK_API_URL), sadece motorların ve ölçümlerin yerelde çalışması içindir.
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+ROUTES = {
+    "/api/prepaid/balance": ("prepaid_balance.json", "application/json"),
+    "/api/prepaid/no-balance": ("prepaid_no_balance.json", "application/json"),  # bakiye alanı yok
+    "/": ("prepaid_form.html", "text/html"),
+}
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def _replay(self):
+        route = ROUTES.get(self.path.split("?")[0])
+        if route is None:
+            self.send_error(404)
+            return
+        file_name, content_type = route
+        with open(os.path.join(FIXTURE_DIR, file_name), "rb") as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._replay()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        self.server.requests_seen.append((self.path, body))
+        self._replay()
+
+    def log_message(self, format, *args):
+        pass
+
+def serve_in_background(port=0):
+    server = ThreadingHTTPServer(("127.0.0.1", port), FixtureHandler)
+    server.requests_seen = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def base_url(server):
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+if __name__ == "__main__":
+    # Kullanım: python -m bench.fixture_server 8765
+    #   KIBTEK_API_URL=http://127.0.0.1:8765/api/prepaid/balance FETCH_ENGINE=http python app.py
+    import sys
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    server = ThreadingHTTPServer(("127.0.0.1", port), FixtureHandler)
+    server.requests_seen = []
+    print(f"Fixture sunucusu: http://127.0.0.1:{port}")
+    server.serve_forever()
@@ -0,0 +1,294 @@
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime, timedelta
+
+import pandas as pd
+import psycopg2
+import psycopg2.extensions
+import websocket
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+import db
+from bench import scratch
+from bench.bench_scrape import percentile
+from events import EVENTS_BACKFILL_SQL
+from expenses import record_expense
+from rollup import DAILY_BACKFILL_SQL
+
+# dashboard.py'yi gerçek bir "streamlit run" sunucusunda N eşzamanlı oturumla çalıştırır.
+# Her oturum tarayıcı gibi websocket (/_stcore/stream) üzerinden bağlanır, giriş yapar ve
+# sırayla yenileme / grafik aralığı / en az transfer / daha fazla log etkileşimlerini dener
+# (bölüm içindeki widget'lar tarayıcıdaki gibi sadece kendi fragment'ını yeniden çalıştırır).
+# Rapor: yeniden çalıştırma süresi p50/p95 (istekten script_finished'a), DB bağlantı sayısı
+# (pg_stat_activity) ve profil modundaki bölüm ölçümleri (bkz. profiler.py, PROFILE_FILE).
+# Enerji bölümlerinin zamanlayıcı ile yenilenmesi (run_every) istemci tarafındadır, denenmez.
+# Kullanım: TEST_DATABASE_URL=... python -m bench.load_test --sessions 1,4,8 --reruns 10 --meters 20
+SCRATCH_SCHEMA = "load_test"
+APP_NAME = "kibtek_load_test"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PEOPLE = ["Metin", "Zafer", "Doğan", "Mehmet"]
+WIDGET_TYPES = {"text_input", "button", "radio", "checkbox"}
+
+def seed(database_url, n_meters, days):
+    conn = psycopg2.connect(database_url)
+    try:
+        scratch.create(conn, SCRATCH_SCHEMA)
+        with conn.cursor() as cur:
+            # Göç 7'nin boş veritabanında oluşturduğu daire panelde açılır, sayacı 1. sayaç olur
+            cur.execute("UPDATE tenants SET account_no = '00000001' WHERE slug = 'daire-6' RETURNING id")
+            tenant_id = cur.fetchone()[0]
+            cur.execute("INSERT INTO users (tenant_id, username, password, role) SELECT %s, unnest(%s::text[]), '1', 'user'",
+                        (tenant_id, PEOPLE))
+            cur.execute("""
+                INSERT INTO readings (date_time, account_no, balance)
+                -- 15 dakikalık okumalar, sayaç başına farklı tüketim
+                SELECT TIMESTAMP '2026-01-01' + (i || ' minutes')::interval * 15, lpad(a::text, 8, '0'),
+                       4000 - (i * (2 + a %% 5) %% 3500)
+                FROM generate_series(1, %s) a, generate_series(1, %s) i
+            """, (n_meters, days * 96))
+            cur.execute(DAILY_BACKFILL_SQL)
+            cur.execute(EVENTS_BACKFILL_SQL)
+            cur.execute("ANALYZE")
+        conn.commit()
+        start = datetime(2026, 1, 1)
+        for i in range(120):
+            record_expense(conn, tenant_id, f"ürün {i}", 40 + i, PEOPLE[i % 4], PEOPLE, date_time=start + timedelta(hours=6 * i))
+    finally:
+        conn.close()
+
+# --- SUNUCU ---
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(database_url, workdir, profile_file):
+    # Panel kendi havuzunu st.secrets["DATABASE_URL"] ile açar; geçici şema ve uygulama adı DSN'e eklenir
+    dsn = psycopg2.extensions.make_dsn(database_url, options=scratch.options(SCRATCH_SCHEMA), application_name=APP_NAME)
+    secrets = os.path.join(workdir, "secrets.toml")
+    with open(secrets, "w", encoding="utf-8") as f:
+        f.write(f"DATABASE_URL = {json.dumps(dsn)}\n")
+    port = free_port()
+    env = dict(os.environ, DASHBOARD_PROFILE="1", DASHBOARD_PUBLIC="1", PROFILE_FILE=profile_file, SNAPSHOT_DIR=os.path.join(workdir, "snapshot"))
+    log = open(os.path.join(workdir, "server.log"), "w")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.join(ROOT, "dashboard.py"),
+         "--server.headless", "true", "--server.port", str(port), "--secrets.files", secrets,
+         "--browser.gatherUsageStats", "false"],
+        cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            with urllib.request.urlopen(base_url + "/_stcore/health", timeout=1):
+                return process, base_url
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"Streamlit sunucusu başlamadı, bkz. {log.name}")
+
+# --- İSTEMCİ ---
+class DashboardSession:
+    # Tarayıcının yaptığını taklit eder: tüm widget durumları her istekte gönderilir,
+    # tetikleyiciler (buton) sadece bir kez
+    def __init__(self, base_url):
+        self.ws = websocket.create_connection(base_url.replace("http", "ws") + "/_stcore/stream",
+                                              origin=base_url, timeout=300)
+        self.widgets = {}  # id -> (tür, etiket, fragment_id, seçenekler)
+        self.states = {}   # id -> WidgetState
+        self.errors = []
+
+    def find(self, name):
+        # Etiket ya da key ile widget id'si
+        for widget_id, (_, label, _, _) in self.widgets.items():
+            if label == name or widget_id.endswith("-" + name):
+                return widget_id
+        return None
+
+    def rerun(self, values=None, trigger=None):
+        # values: {id: (alan, değer)}; trigger: tetiklenen buton id'si. Widget bir fragment
+        # içindeyse istek sadece o fragment için gönderilir. Dönüş: süre (ms)
+        for widget_id, (field, value) in (values or {}).items():
+            state = WidgetState(id=widget_id)
+            setattr(state, field, value)
+            self.states[widget_id] = state
+        msg = BackMsg()
+        client = msg.rerun_script
+        client.widget_states.widgets.extend(self.states.values())
+        if trigger:
+            client.widget_states.widgets.append(WidgetState(id=trigger, trigger_value=True))
+        changed = trigger or next(iter(values or {}), None)
+        fragment_id = self.widgets[changed][2] if changed else ""
+        if fragment_id:
+            client.fragment_id = fragment_id
+
+        started = time.perf_counter()
+        self.ws.send_binary(msg.SerializeToString())
+        seen = set()
+        while True:
+            fm = ForwardMsg()
+            fm.ParseFromString(self.ws.recv())
+            kind = fm.WhichOneof("type")
+            if kind == "delta" and fm.delta.WhichOneof("type") == "new_element":
+                self._element(fm.delta, seen)
+            elif kind == "script_finished" and fm.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                elapsed = (time.perf_counter() - started) * 1000.0
+                break
+        if not fragment_id:
+            # Tam çalıştırmada görünmeyen widget'lar (ör. girişten sonra form) artık gönderilmez
+            self.states = {k: v for k, v in self.states.items() if k in seen}
+        return elapsed
+
+    def _element(self, delta, seen):
+        element = delta.new_element
+        kind = element.WhichOneof("type")
+        if kind == "exception":
+            self.errors.append(element.exception.message)
+        elif kind in WIDGET_TYPES:
+            widget = getattr(element, kind)
+            options = list(widget.options) if kind == "radio" else None
+            self.widgets[widget.id] = (kind, widget.label, delta.fragment_id, options)
+            seen.add(widget.id)
+
+    def close(self):
+        self.ws.close()
+
+def login(session, k, name):
+    session.rerun({session.find("İsim"): ("string_value", name), session.find("Şifre"): ("string_value", "1")},
+                  trigger=session.find("Giriş"))
+
+def rerun(session, k, name):
+    session.rerun()
+
+def chart_range(session, k, name):
+    widget_id = session.find("chart_range")
+    options = session.widgets[widget_id][3]
+    session.rerun({widget_id: ("string_value", options[k % len(options)])})
+
+def min_flow(session, k, name):
+    session.rerun({session.find("min_cash_flow"): ("bool_value", k % 2 == 0)})
+
+def load_more(session, k, name):
+    button = session.find("⬇️ Daha fazla yükle")
+    session.rerun(trigger=button) if button else session.rerun()
+
+ACTIONS = [("yenile", rerun), ("grafik aralığı", chart_range), ("en az transfer", min_flow), ("daha fazla log", load_more)]
+
+def run_session(base_url, index, reruns, results):
+    name = PEOPLE[index % len(PEOPLE)]
+    try:
+        session = DashboardSession(base_url)
+    except Exception as e:
+        results.append(("bağlantı", 0.0, repr(e)))
+        return
+    try:
+        steps = [("ilk yükleme", rerun), ("giriş", login)] + [ACTIONS[k % len(ACTIONS)] for k in range(reruns)]
+        for k, (label, action) in enumerate(steps):
+            started = time.perf_counter()
+            action(session, k, name)
+            results.append((label, (time.perf_counter() - started) * 1000.0, session.errors.pop() if session.errors else None))
+    except Exception as e:
+        results.append(("hata", 0.0, repr(e)))
+    finally:
+        session.close()
+
+def sample_connections(database_url, stop, samples):
+    conn = psycopg2.connect(database_url)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            while not stop.is_set():
+                cur.execute("SELECT count(*) FROM pg_stat_activity WHERE application_name = %s", (APP_NAME,))
+                samples.append(cur.fetchone()[0])
+                stop.wait(0.05)
+    finally:
+        conn.close()
+
+def run_level(database_url, base_url, n_sessions, reruns):
+    results, samples, stop = [], [], threading.Event()
+    sampler = threading.Thread(target=sample_connections, args=(database_url, stop, samples), daemon=True)
+    sampler.start()
+    threads = [threading.Thread(target=run_session, args=(base_url, i, reruns, results)) for i in range(n_sessions)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    sampler.join()
+    return results, elapsed, samples
+
+def section_summary(profile_file):
+    if not os.path.exists(profile_file):
+        return pd.DataFrame()
+    with open(profile_file, encoding="utf-8") as f:
+        profile = pd.DataFrame([json.loads(line) for line in f])
+    if profile.empty:
+        return profile
+    return profile.groupby("bölüm", sort=False).agg(
+        adet=("ms", "size"), p50_ms=("ms", "median"), p95_ms=("ms", lambda s: s.quantile(0.95)),
+        sorgu=("sorgu", "mean"), satır=("satır", "mean"), öğe=("öğe", "mean"), kb=("kb", "mean")).round(1)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", default="1,4,8", help="virgülle ayrılmış eşzamanlı oturum sayıları")
+    parser.add_argument("--reruns", type=int, default=10, help="oturum başına etkileşim sayısı (ilk yükleme ve giriş hariç)")
+    parser.add_argument("--meters", type=int, default=20)
+    parser.add_argument("--days", type=int, default=60)
+    args = parser.parse_args()
+
+    database_url = os.environ.get("TEST_DATABASE_URL")
+    if not database_url:
+        print("HATA: TEST_DATABASE_URL bulunamadı!")
+        return
+    seed(database_url, args.meters, args.days)
+    workdir = tempfile.mkdtemp(prefix="load_test_")
+    profile_file = os.path.join(workdir, "profile.jsonl")
+    process = None
+    try:
+        process, base_url = start_server(database_url, workdir, profile_file)
+        run_level(database_url, base_url, 1, 0)  # ısınma: içe aktarmalar, süreç önbellekleri
+        print(f"{args.meters} sayaç x {args.days} gün okuma, oturum başına {args.reruns + 2} çalıştırma, "
+              f"havuz en fazla {db.POOL_MAX} bağlantı")
+        print(f"{'oturum':>6} | {'p50 (ms)':>9} | {'p95 (ms)':>9} | {'çalıştırma/sn':>13} | {'DB bağ. tepe':>12} | {'hata':>4}")
+        for n in (int(s) for s in args.sessions.split(",")):
+            if os.path.exists(profile_file):
+                os.remove(profile_file)
+            results, elapsed, samples = run_level(database_url, base_url, n, args.reruns)
+            latencies = [ms for _, ms, error in results if not error]
+            errors = [f"{label}: {error}" for label, _, error in results if error]
+            print(f"{n:>6} | {percentile(latencies, 50):>9.1f} | {percentile(latencies, 95):>9.1f} | "
+                  f"{len(latencies) / elapsed:>13.1f} | {max(samples, default=0):>12} | {len(errors):>4}")
+            for error in errors[:3]:
+                print(f"   hata: {error[:200]}")
+
+        by_action = pd.DataFrame(results, columns=["etkileşim", "ms", "hata"])
+        print(f"\nEtkileşim bazında (son seviye, {n} oturum):")
+        print(by_action.groupby("etkileşim", sort=False)["ms"].agg(
+            adet="size", p50_ms="median", p95_ms=lambda s: s.quantile(0.95)).round(1).to_string())
+        summary = section_summary(profile_file)
+        if not summary.empty:
+            print(f"\nBölüm profili (son seviye, sunucu tarafı):")
+            print(summary.to_string())
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(10)
+        shutil.rmtree(workdir, ignore_errors=True)
+        scratch.drop(database_url, SCRATCH_SCHEMA)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import socketserver
+import struct
+import threading
+import time
+
+# Yerel test için küçük bir Modbus TCP sayaç simülatörü (sadece 0x03 Read Holding Registers).
+# Her birim (unit id) ayrı bir sayaçtır; bakiye zamanla azalır ve float32 olarak
+# BALANCE_REGISTER adresinden itibaren iki yazmaçta döner.
+# Kullanım: python -m bench.modbus_simulator 5020 10   (port, sayaç sayısı)
+START_BALANCE = 4000.0
+DRAIN_PER_SECOND = 0.05
+
+class MeterBank:
+    def __init__(self, units):
+        self.units = set(units)
+        self.started = time.monotonic()
+
+    def registers(self, unit, address, count):
+        balance = START_BALANCE - unit - (time.monotonic() - self.started) * DRAIN_PER_SECOND
+        words = struct.unpack(">2H", struct.pack(">f", balance))
+        regs = list(words) + [0] * max(0, address + count - 2)
+        return regs[address:address + count]
+
+class ModbusHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        sock = self.request
+        while True:
+            header = self._recv(7)
+            if not header:
+                return
+            tid, proto, length, unit = struct.unpack(">HHHB", header)
+            pdu = self._recv(length - 1)
+            if not pdu:
+                return
+            function = pdu[0]
+            if function != 0x03 or unit not in self.server.bank.units:
+                # Geçersiz fonksiyon ya da bilinmeyen birim: Modbus istisna cevabı
+                code = 0x01 if function != 0x03 else 0x0B
+                body = struct.pack(">BB", function | 0x80, code)
+            else:
+                address, count = struct.unpack(">HH", pdu[1:5])
+                regs = self.server.bank.registers(unit, address, count)
+                body = struct.pack(f">BB{len(regs)}H", function, 2 * len(regs), *regs)
+            sock.sendall(struct.pack(">HHHB", tid, proto, len(body) + 1, unit) + body)
+
+    def _recv(self, n):
+        data = b""
+        while len(data) < n:
+            chunk = self.request.recv(n - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+class SimulatorServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+def serve_in_background(units, port=0):
+    server = SimulatorServer(("127.0.0.1", port), ModbusHandler)
+    server.bank = MeterBank(units)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    import sys
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 5020
+    n_meters = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    server = SimulatorServer(("127.0.0.1", port), ModbusHandler)
+    server.bank = MeterBank(range(1, n_meters + 1))
+    print(f"Modbus simülatörü: 127.0.0.1:{port}, birimler 1..{n_meters}")
+    server.serve_forever()
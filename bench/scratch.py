@@ -0,0 +1,34 @@
+import contextlib
+import io
+
+import psycopg2
+
+import schema
+
+# --- GEÇİCİ ŞEMA ---
+# Benchmark ve kontrol betikleri gerçek tablolara dokunmadan kendi şemalarında çalışır.
+# create() şemayı sıfırdan kurar, bağlantıyı ona yönlendirir ve göçleri sessizce uygular;
+# kendi bağlantısını açan kod (app.main, işçiler, havuzlar) options() ile yönlendirilir.
+def options(name):
+    return f"-c search_path={name}"
+
+def create(conn, name, target=None, migrate=True):
+    # migrate=False: tablolar çağırana kalır; target: göçler bu sürümde durur (bkz. schema.migrate)
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {name} CASCADE")
+        cur.execute(f"CREATE SCHEMA {name}")
+        cur.execute(f"SET search_path TO {name}")
+    conn.commit()
+    if migrate:
+        with contextlib.redirect_stdout(io.StringIO()):
+            schema.migrate(conn, target=target)
+
+def drop(database_url, name):
+    # Yeni bağlantıyla silinir; betiğin kendi bağlantısı önce kapatılmalı (açık işlem kilit tutar)
+    conn = psycopg2.connect(database_url)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {name} CASCADE")
+        conn.commit()
+    finally:
+        conn.close()
@@ -0,0 +1,66 @@
+import asyncio
+import socket
+import threading
+
+from aiosmtpd.controller import Controller
+
+# Yerel test için SMTP sunucusu (aiosmtpd): gelen mailleri saklar, oturum sayısını tutar.
+# connect_delay: oturum açılış (EHLO) gecikmesi, gerçek sunucudaki TLS + giriş maliyetinin yerine
+# send_delay: mail başına gecikme; fail_first: ilk N maile geçici hata (451) döner
+# Kullanım: python -m bench.smtp_sink 8025
+#   SMTP_HOST=127.0.0.1 SMTP_PORT=8025 SMTP_STARTTLS=0 SENDER_EMAIL=a@b RECEIVER_EMAIL=c@d python app.py
+class SinkHandler:
+    def __init__(self, connect_delay=0.0, send_delay=0.0, fail_first=0):
+        self.connect_delay = connect_delay
+        self.send_delay = send_delay
+        self.fail_first = fail_first
+        self.lock = threading.Lock()
+        self.messages = []
+        self.sessions = 0
+        self.rejected = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        session.host_name = hostname
+        with self.lock:
+            self.sessions += 1
+        if self.connect_delay:
+            await asyncio.sleep(self.connect_delay)
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.send_delay:
+            await asyncio.sleep(self.send_delay)
+        with self.lock:
+            if self.rejected < self.fail_first:
+                self.rejected += 1
+                return "451 Gecici hata, sonra tekrar deneyin"
+            self.messages.append(envelope.content)
+        return "250 OK"
+
+def serve_in_background(port=0, **handler_args):
+    # port=0: boş bir port seçilir; controller.port ile okunur
+    handler = SinkHandler(**handler_args)
+    controller = Controller(handler, hostname="127.0.0.1", port=port or free_port())
+    controller.start()
+    return controller, handler
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+if __name__ == "__main__":
+    import sys
+    import time
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8025
+    controller, handler = serve_in_background(port)
+    print(f"SMTP test sunucusu: 127.0.0.1:{port}")
+    try:
+        seen = 0
+        while True:
+            time.sleep(1)
+            if len(handler.messages) != seen:
+                seen = len(handler.messages)
+                print(f"{seen} mail alındı ({handler.sessions} oturum)")
+    except KeyboardInterrupt:
+        controller.stop()
@@ -1,17 +1,118 @@
+import functools
+import os
+import psycopg2
 import streamlit as st
 import pandas as pd
-import psycopg2
 from datetime import datetime, timedelta
-
-# --- SAYFA AYARLARI ---
-st.set_page_config(page_title="Daire 6 Pro", page_icon="🏠", layout="centered")
+from expenses import record_expense
+from settlement import owed_matrix, net_debts, offset_lines, user_positions, min_cash_flow
+from log_feed import FEED_SQL, PAGE_SIZE, feed_params, next_cursor, render_events_html
+from db import run_query, read_query, load_readings, load_balance_chart, load_energy_summary, load_daily_consumption, load_anomalies, load_forecasts, load_tenant, load_residents, connection, invalidate_reads, reset_query_timings, render_query_timings
+from forecast import RESERVE_BALANCE, balance_percent
+from events import STALE_HOURS
+from downsample import RANGES, downsample_series, range_filter
+from profiler import profiled, reset_section_profile, render_section_profile, enabled as profiling_enabled
+from streamlit.runtime.scriptrunner_utils.script_run_context import get_script_run_ctx
 
 TR_AYLAR = {1: "Ocak", 2: "Şubat", 3: "Mart", 4: "Nisan", 5: "Mayıs", 6: "Haziran", 7: "Temmuz", 8: "Ağustos", 9: "Eylül", 10: "Ekim", 11: "Kasım", 12: "Aralık"}
 
-# EV SAKİNLERİ
-EV_SAKINLERI = ["Metin", "Zafer", "Doğan", "Mehmet"]
+# --- BÖLÜMLER ---
+# Her bölüm kendi verisini kendisi yükler ve st.fragment olarak tek başına yeniden çalışır:
+# bir bölümdeki etkileşim sadece o bölümü yeniler. Başka bölümleri de etkileyen işlemler
+# etkiledikleri bölümleri AFFECTS'te açıkça listeler. Enerji bölümleri ENERGY_REFRESH
+# saniyede bir kendiliğinden yenilenir. DASHBOARD_FRAGMENTS=0 ile eski davranışa
+# (her etkileşimde tüm sayfa) dönülür. Profil modunda (bkz. profiler.py) her bölüm ölçülür.
+DASHBOARD_FRAGMENTS = os.environ.get("DASHBOARD_FRAGMENTS", "1") == "1"
+ENERGY_REFRESH = 60
+
+AFFECTS = {
+    'expense': ['debts', 'log_feed'],  # yeni harcama borçları ve logları değiştirir
+    'collect': ['debts'],              # ödemeler loglarda görünmez
+    'min_flow': ['debts'],
+    'log_more': ['log_feed'],
+    'chart_range': ['energy_charts'],
+}
+
+def fragment_run_started():
+    # Sadece fragment'ların yeniden çalıştığı turda, o turun ilk fragment'ında True döner
+    # (her turda Streamlit yeni bir fragment_ids_this_run listesi verir); tam çalıştırmada
+    # sayfanın başı zaten sıfırlıyor
+    ctx = get_script_run_ctx()
+    if ctx is None or not ctx.fragment_ids_this_run:
+        return False
+    if st.session_state.get('_fragment_run') is ctx.fragment_ids_this_run:
+        return False
+    st.session_state['_fragment_run'] = ctx.fragment_ids_this_run
+    return True
+
+def show_db_error(e):
+    st.error(f"Veritabanı hatası, veriler yüklenemedi: {e}")
+
+def guarded(func):
+    # Veritabanı hatasında bölüm boş veri yerine hatayı gösterir; diğer bölümler çalışmaya devam eder
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except psycopg2.Error as e:
+            show_db_error(e)
+    return run
+
+def section(key, run_every=None):
+    def wrap(func):
+        func = profiled(key)(guarded(func))
+        if not DASHBOARD_FRAGMENTS:
+            return func
+
+        @functools.wraps(func)
+        def run(*args, **kwargs):
+            # Fragment turlarında da sorgu süreleri ve profil sadece o turu göstersin
+            if fragment_run_started():
+                reset_query_timings()
+                reset_section_profile()
+            return func(*args, **kwargs)
+        return st.fragment(key=key, run_every=run_every)(run)
+    return wrap
+
+def rerun_affected(action):
+    # Sadece widget callback'lerinden çağrılır; fragment kapalıysa varsayılan tam yenileme olur
+    if DASHBOARD_FRAGMENTS:
+        st.rerun(AFFECTS[action])
 
 if 'user' not in st.session_state: st.session_state.user = None
+reset_query_timings()
+reset_section_profile()
+
+# --- DAİRE ---
+# Panel adresteki ?daire=<slug> ile bir daireye bağlanır (verilmezse ilk daire, bkz. tenants.py).
+# Tüm sorgular ve süreç önbellekleri bu dairenin id'si ve sayacıyla sınırlıdır. Slug gizli
+# değildir; dairenin verileri (bakiye, borçlar, sakinler) sadece o dairenin kullanıcısı giriş
+# yapınca gösterilir. DASHBOARD_PUBLIC=1 ile giriş yapmadan da gösterilir (ortak ekran, ölçümler).
+DASHBOARD_PUBLIC = os.environ.get("DASHBOARD_PUBLIC", "0") == "1"
+try:
+    TENANT = load_tenant(st.query_params.get("daire"))
+except psycopg2.Error as e:
+    show_db_error(e)
+    st.stop()
+
+# --- SAYFA AYARLARI ---
+st.set_page_config(page_title=f"{TENANT['name']} Pro" if TENANT else "Ortak Panel", page_icon="🏠", layout="centered")
+
+if TENANT is None:
+    st.error("Daire bulunamadı! Adresteki ?daire= değerini kontrol edin (python schema.py çalıştırıldı mı?).")
+    st.stop()
+HESAP_NO = TENANT['account_no']
+
+# EV SAKİNLERİ (dairenin kullanıcıları)
+try:
+    EV_SAKINLERI = load_residents(TENANT['id'])
+except psycopg2.Error as e:
+    show_db_error(e)
+    st.stop()
+
+# Başka dairenin adresine geçilirse o dairenin oturumu yoktur
+if st.session_state.user is not None and st.session_state.user['tenant_id'] != TENANT['id']:
+    st.session_state.user = None
 
 # --- GELİŞMİŞ CSS ---
 st.markdown("""
@@ -33,34 +134,26 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# --- VERİTABANI YARDIMCI FONKSİYONU ---
-def run_query(query, params=(), is_select=True):
-    try:
-        conn = psycopg2.connect(st.secrets["DATABASE_URL"])
-        cur = conn.cursor()
-        cur.execute(query, params)
-        if is_select:
-            cols = [desc[0] for desc in cur.description]
-            res = pd.DataFrame(cur.fetchall(), columns=cols)
-            conn.close()
-            return res
-        conn.commit()
-        conn.close()
-    except Exception as e:
-        return pd.DataFrame()
-
 # --- SIDEBAR: GİRİŞ ---
 with st.sidebar:
     if st.session_state.user is None:
         st.subheader("🔑 Giriş Yap")
-        u_name = st.text_input("İsim")
-        u_pass = st.text_input("Şifre", type="password")
-        if st.button("Giriş", use_container_width=True):
-            user_check = run_query("SELECT * FROM users WHERE username = %s AND password = %s", (u_name, u_pass))
-            if user_check is not None and not user_check.empty:
-                st.session_state.user = user_check.iloc[0].to_dict()
-                st.rerun()
-            else: st.error("Hatalı Giriş!")
+        # Form içinde yazarken sayfa yeniden çalışmaz, sadece "Giriş" ile gönderilir
+        with st.form("login"):
+            u_name = st.text_input("İsim")
+            u_pass = st.text_input("Şifre", type="password")
+            submitted = st.form_submit_button("Giriş", use_container_width=True)
+        if submitted:
+            try:
+                user_check = run_query("SELECT * FROM users WHERE tenant_id = %s AND username = %s AND password = %s",
+                                       (TENANT['id'], u_name, u_pass))
+            except psycopg2.Error as e:
+                show_db_error(e)
+            else:
+                if not user_check.empty:
+                    st.session_state.user = user_check.iloc[0].to_dict()
+                    st.rerun()
+                else: st.error("Hatalı Giriş!")
     else:
         st.success(f"Oturum: {st.session_state.user['username']}")
         if st.button("Çıkış Yap", use_container_width=True):
@@ -69,213 +162,236 @@ with st.sidebar:
         
         if st.session_state.user['role'] == 'admin':
             st.divider()
-            if st.button("🔴 Tüm Datayı Sıfırla"):
-                run_query("TRUNCATE payments, expenses RESTART IDENTITY CASCADE", is_select=False)
-                st.rerun()
-
-# --- VERİLERİ YÜKLE ---
-df_energy = run_query("SELECT * FROM readings ORDER BY date_time ASC")
-if df_energy is not None and not df_energy.empty:
-    df_energy['balance'] = pd.to_numeric(df_energy['balance'], errors='coerce')
-    df_energy['date_time'] = pd.to_datetime(df_energy['date_time'])
-    
-    # 🌟 KRİTİK DÜZELTME: Farkları en başta TÜM veritabanı için hesaplıyoruz!
-    df_energy['diff'] = df_energy['balance'].diff()
+            if st.button("🔴 Tüm Datayı Sıfırla", help="Sadece bu dairenin harcamaları ve borçları silinir."):
+                # Önce dairenin ödemeleri, sonra harcamaları; tek işlemde (eski kurulumlarda
+                # payments.expense_id için ON DELETE CASCADE olmayabilir)
+                try:
+                    run_query("""
+                        DELETE FROM payments p USING expenses e WHERE p.expense_id = e.id AND e.tenant_id = %(tenant_id)s;
+                        DELETE FROM expenses WHERE tenant_id = %(tenant_id)s;
+                    """, {'tenant_id': TENANT['id']}, is_select=False, scope=TENANT['id'])
+                except psycopg2.Error as e:
+                    st.error(f"Veriler silinemedi: {e}")
+                else:
+                    st.rerun()
+
+    st.divider()
+    st.checkbox("⏱️ Sorgu sürelerini göster", key="show_timings")
+
+if st.session_state.user is None and not DASHBOARD_PUBLIC:
+    st.title("🏠 Ortak Panel")
+    st.info("Dairenin verilerini görmek için kenar çubuğundan giriş yapın.")
+    st.stop()
 
 # ==========================================
 # ⚡ 1. BÖLÜM: ENERJİ DURUMU 
 # ==========================================
-st.title("🏠 Daire 6 Ortak Panel")
-
-if df_energy is not None and not df_energy.empty:
-    curr_bal = float(df_energy.iloc[-1]['balance'])
-    last_upd = df_energy.iloc[-1]['date_time']
-
-    # ✅ Yüzde hesabı (senin sistemle uyumlu bıraktım)
-    percent = max(0.0, min(100.0, ((curr_bal - 300) / 3700) * 100))
-    color = "#F44336" if percent < 15 else ("#FFC107" if percent < 40 else "#4CAF50")
-
-    # =========================
-    # ✅ SON 24 SAAT (DÜZELTİLDİ)
-    # =========================
-    one_day_ago = last_upd - timedelta(hours=24)
-    past_df = df_energy[df_energy['date_time'] <= one_day_ago]
-
-    if not past_df.empty:
-        past_balance = float(past_df.iloc[-1]['balance'])
-        last_24h_cons = max(0.0, past_balance - curr_bal)
-    else:
-        last_24h_cons = 0.0
-
-    # =========================
-    # ✅ SON 7 GÜN ORTALAMA
-    # =========================
-    seven_days_ago = last_upd - timedelta(days=7)
-    recent_df = df_energy[df_energy['date_time'] >= seven_days_ago]
-
-    avg_daily = 0.0
-    if len(recent_df) > 1:
-        total_drop = float(recent_df[recent_df['diff'] < 0]['diff'].abs().sum())
-        time_span_days = (recent_df['date_time'].max() - recent_df['date_time'].min()).total_seconds() / 86400.0
-        if time_span_days > 0:
-            avg_daily = total_drop / max(1.0, time_span_days)
-
-    # =========================
-    # ✅ KALAN GÜN
-    # =========================
-    usable_balance = max(0, curr_bal - 300)
-    days_left = int(usable_balance / avg_daily) if avg_daily > 0 else 0
-
-    # =========================
-    # ✅ UI (BURASI SİLİNMİŞTİ MUHTEMELEN)
-    # =========================
-    st.markdown(f"""
-        <div style="background:#1a1a1a; border-radius:15px; padding:20px; border:1px solid #333;">
-            <div style="display:flex; justify-content:space-between; margin-bottom:10px;">
-                <span style="color:#aaa;">Kalan Enerji Bakiye</span>
-                <span style="font-weight:bold; color:{color};">%{percent:.1f}</span>
-            </div>
-            <div style="width:100%; height:25px; background:#333; border-radius:20px; overflow:hidden;">
-                <div class="energy-bar-fill" style="width:{percent}%; height:100%; background-color:{color};"></div>
+st.title(f"🏠 {TENANT['name']} Ortak Panel")
+
+@section("energy_status", run_every=ENERGY_REFRESH)
+def energy_status():
+    # Metrikler Postgres'te hesaplanır (bkz. rollup.SUMMARY_SQL), buraya tek satır gelir
+    energy = load_energy_summary(HESAP_NO)
+
+    if energy is not None:
+        curr_bal = energy['curr_bal']
+        last_upd = energy['last_upd']
+
+        # ✅ Yüzde hesabı (uyarı maili ile aynı eşikler, bkz. forecast.py)
+        percent = max(0.0, balance_percent(curr_bal))
+        color = "#F44336" if percent < 15 else ("#FFC107" if percent < 40 else "#4CAF50")
+
+        # =========================
+        # ✅ SON 24 SAAT / SON 7 GÜN ORTALAMA
+        # =========================
+        last_24h_cons = energy['last_24h_cons']
+        avg_daily = energy['avg_daily']
+
+        # =========================
+        # ✅ KALAN GÜN (forecast.py: yükleme ayrımlı EWMA + haftanın günü etkisi)
+        # =========================
+        forecasts = load_forecasts(HESAP_NO)
+        fc = forecasts[forecasts['account_no'] == energy['account_no']]
+        days_help = None
+        if not fc.empty and pd.notna(fc['days_left'].iloc[0]):
+            fc = fc.iloc[0]
+            days_left = int(fc['days_left'])
+            days_help = (f"%80 aralık: {fc['days_low']:.1f} - {fc['days_high']:.1f} gün, "
+                         f"tahmini bitiş {fc['depletion_date']:%d.%m.%Y}")
+        else:
+            usable_balance = max(0, curr_bal - RESERVE_BALANCE)
+            days_left = int(usable_balance / avg_daily) if avg_daily > 0 else 0
+
+        # =========================
+        # ✅ UI (BURASI SİLİNMİŞTİ MUHTEMELEN)
+        # =========================
+        st.markdown(f"""
+            <div style="background:#1a1a1a; border-radius:15px; padding:20px; border:1px solid #333;">
+                <div style="display:flex; justify-content:space-between; margin-bottom:10px;">
+                    <span style="color:#aaa;">Kalan Enerji Bakiye</span>
+                    <span style="font-weight:bold; color:{color};">%{percent:.1f}</span>
+                </div>
+                <div style="width:100%; height:25px; background:#333; border-radius:20px; overflow:hidden;">
+                    <div class="energy-bar-fill" style="width:{percent}%; height:100%; background-color:{color};"></div>
+                </div>
+                <div style="margin-top:15px; font-size:2.2rem; font-weight:bold;">{int(curr_bal)} ₺</div>
             </div>
-            <div style="margin-top:15px; font-size:2.2rem; font-weight:bold;">{int(curr_bal)} ₺</div>
-        </div>
-    """, unsafe_allow_html=True)
-
-    # =========================
-    # ✅ METRİKLER
-    # =========================
-    c1, c2, c3 = st.columns(3)
-
-    with c1:
-        st.metric("Son 24 Saat", f"{int(last_24h_cons)} ₺")
-
-    with c2:
-        st.metric("Günlük Ort.", f"{int(avg_daily)} ₺")
-
-    with c3:
-        st.metric("Kalan", f"{days_left} Gün")
+        """, unsafe_allow_html=True)
 
+        # =========================
+        # ✅ METRİKLER
+        # =========================
+        c1, c2, c3 = st.columns(3)
+
+        with c1:
+            st.metric("Son 24 Saat", f"{int(last_24h_cons)} ₺")
+
+        with c2:
+            st.metric("Günlük Ort.", f"{int(avg_daily)} ₺")
+
+        with c3:
+            st.metric("Kalan", f"{days_left} Gün", help=days_help)
+
+        # =========================
+        # ✅ OLAYLAR (events.py: okuma yazılırken hesaplanır)
+        # =========================
+        if datetime.now() - last_upd > timedelta(hours=STALE_HOURS):
+            st.warning(f"⏸️ {STALE_HOURS:.0f} saatten uzun süredir yeni okuma yok (son okuma {last_upd:%d.%m.%Y %H:%M}).")
+        anomalies = load_anomalies(HESAP_NO)
+        recent = anomalies[pd.to_datetime(anomalies['day']) >= (last_upd - timedelta(days=1)).normalize()]
+        if not recent.empty:
+            last_anomaly = recent.iloc[-1]
+            st.warning(f"⚠️ {last_anomaly['day']:%d.%m} günü olağandışı tüketim: "
+                       f"{float(last_anomaly['drop_total']):.0f} ₺ ({last_anomaly['detail']}).")
+
+energy_status()
 st.divider()
 
 # ==========================================
 # ⚖️ 2. BÖLÜM: AKILLI MAHSUPLAŞMA VE BORÇ LİSTESİ
+# 🛠️ 3. BÖLÜM: KULLANICI İŞLEMLERİ 
 # ==========================================
-st.subheader("⚖️ Güncel Borç / Mahsuplaşma Listesi")
-
-payments = run_query("""
-    SELECT p.*, u.username as payer, r.username as receiver, e.item_name, e.date_time as date
-    FROM payments p JOIN users u ON p.payer_id = u.id JOIN users r ON p.receiver_id = r.id JOIN expenses e ON p.expense_id = e.id
-    WHERE p.status = 'pending_payment'
-""")
-
-if not payments.empty:
-    net_matrix = payments.groupby(['payer', 'receiver'])['amount'].sum().reset_index()
-    
-    st.markdown("#### 🔴 Nakit Ödeme Bekleyenler")
-    processed_pairs = set()
-    for _, row in net_matrix.iterrows():
-        p1, p2 = row['payer'], row['receiver']
-        pair = tuple(sorted((p1, p2)))
-        if pair in processed_pairs: continue
-        processed_pairs.add(pair)
-        
-        amt1 = net_matrix[(net_matrix['payer'] == p1) & (net_matrix['receiver'] == p2)]['amount'].sum()
-        amt2 = net_matrix[(net_matrix['payer'] == p2) & (net_matrix['receiver'] == p1)]['amount'].sum()
-        
-        diff = amt1 - amt2
-        if diff > 0:
-            st.markdown(f"<div class='list-item'><div><b>{p1}</b> ➔ {p2}</div><div style='text-align:right'><span class='status-badge bg-red'>ÖDEME BEKLENİYOR</span><br><b>{int(diff)} ₺</b></div></div>", unsafe_allow_html=True)
-        elif diff < 0:
-            st.markdown(f"<div class='list-item'><div><b>{p2}</b> ➔ {p1}</div><div style='text-align:right'><span class='status-badge bg-red'>ÖDEME BEKLENİYOR</span><br><b>{int(abs(diff))} ₺</b></div></div>", unsafe_allow_html=True)
-
-    st.markdown("#### 🟡 Otomatik Mahsuplaşma")
-    for _, row in payments.iterrows():
-        opp_amt = net_matrix[(net_matrix['payer'] == row['receiver']) & (net_matrix['receiver'] == row['payer'])]['amount'].sum()
-        if opp_amt > 0:
+# İki bölüm aynı bekleyen ödemeler verisini kullandığı için tek fragment'tir
+def save_expense(tenant_id, my_name):
+    # Form gönderiminde callback olarak çalışır; değerler session_state'ten okunur
+    s = st.session_state
+    participants = s.exp_participants
+    if not (s.exp_item and s.exp_price > 0 and participants):
+        return
+    try:
+        with connection() as conn:
+            record_expense(conn, tenant_id, s.exp_item, s.exp_price, my_name, participants, {n: s[f"w_{n}"] for n in participants})
+    except (psycopg2.Error, ValueError) as e:
+        s.expense_status = ('error', f"Harcama kaydedilemedi: {e}")
+        return
+    invalidate_reads(tenant_id)
+    s.expense_status = ('success', "İşlendi!")
+    rerun_affected('expense')
+
+def collect(tenant_id, name, my_id):
+    try:
+        run_query("""
+            UPDATE payments p SET status = 'paid'
+            FROM users u
+            WHERE u.tenant_id = %s AND u.username = %s AND p.status = 'pending_payment'
+            AND ((p.payer_id = u.id AND p.receiver_id = %s)
+              OR (p.payer_id = %s AND p.receiver_id = u.id))
+        """, (tenant_id, name, my_id, my_id), is_select=False, scope=tenant_id)
+    except psycopg2.Error as e:
+        st.error(f"Tahsilat kaydedilemedi: {e}")
+        return
+    rerun_affected('collect')
+
+@section("debts")
+def debts():
+    st.subheader("⚖️ Güncel Borç / Mahsuplaşma Listesi")
+
+    payments = read_query("""
+        SELECT p.*, u.username as payer, r.username as receiver, e.item_name, e.date_time as date
+        FROM payments p JOIN users u ON p.payer_id = u.id JOIN users r ON p.receiver_id = r.id JOIN expenses e ON p.expense_id = e.id
+        WHERE e.tenant_id = %s AND p.status = 'pending_payment'
+    """, (TENANT['id'],), scope=TENANT['id'])
+
+    # Kişi x kişi borç matrisi tek seferde kurulur (bkz. settlement.py)
+    owed = owed_matrix(payments, EV_SAKINLERI)
+    settlement_list(payments, owed)
+    user_panel(payments, owed)
+
+@profiled("settlement")
+def settlement_list(payments, owed):
+    if not payments.empty:
+        min_mode = st.toggle("🔀 En az transferle kapat", key="min_cash_flow", on_change=rerun_affected, args=('min_flow',), help="Tüm evin borçlarını kişi çiftleri yerine en az sayıda transferle kapatır.")
+
+        st.markdown("#### 🔴 Nakit Ödeme Bekleyenler")
+        transfers = min_cash_flow(owed) if min_mode else net_debts(owed)
+        for p1, p2, amount in transfers[['payer', 'receiver', 'amount']].itertuples(index=False):
+            st.markdown(f"<div class='list-item'><div><b>{p1}</b> ➔ {p2}</div><div style='text-align:right'><span class='status-badge bg-red'>ÖDEME BEKLENİYOR</span><br><b>{int(amount)} ₺</b></div></div>", unsafe_allow_html=True)
+
+        st.markdown("#### 🟡 Otomatik Mahsuplaşma")
+        for _, row in offset_lines(payments, owed).iterrows():
             st.markdown(f"""
                 <div class='list-item' style='opacity:0.7'>
                     <div><b>{row['payer']}</b> ➔ {row['receiver']}<br><small>{row['item_name']} ({row['date'].day} {TR_AYLAR[row['date'].month]})</small></div>
                     <div style='text-align:right'><span class='status-badge bg-yellow'>MAHSUPLAŞILDI</span><br><b>{int(row['amount'])} ₺</b></div>
                 </div>
             """, unsafe_allow_html=True)
-else:
-    st.success("Herkes ödeşmiş, bekleyen borç yok! ✨")
-
-# ==========================================
-# 🛠️ 3. BÖLÜM: KULLANICI İŞLEMLERİ 
-# ==========================================
-if st.session_state.user:
-    st.divider()
-    my_name = st.session_state.user['username']
-    my_id = int(st.session_state.user['id'])
-    
-    st.subheader(f"🛠️ Kullanıcı Paneli: {my_name}")
-    t1, t2, t3 = st.tabs(["➕ Harcama", "💸 Borçlarım", "🏦 Alacaklarım"])
-
-    with t1:
-        with st.form("new_exp", clear_on_submit=True):
-            item = st.text_input("Ne alındı?")
-            price = st.number_input("Toplam Fiyat", min_value=0.0)
-            if st.form_submit_button("Kaydet ve Böl"):
-                if item and price > 0:
-                    conn = psycopg2.connect(st.secrets["DATABASE_URL"])
-                    cur = conn.cursor()
-                    try:
-                        cur.execute("INSERT INTO expenses (item_name, price, buyer, date_time) VALUES (%s, %s, %s, NOW()) RETURNING id", (item, price, my_name))
-                        exp_id = cur.fetchone()[0]
-                        share = price / 4
-                        for name in EV_SAKINLERI:
-                            if name != my_name:
-                                cur.execute("INSERT INTO payments (expense_id, payer_id, receiver_id, amount, status) VALUES (%s, (SELECT id FROM users WHERE username=%s), (SELECT id FROM users WHERE username=%s), %s, 'pending_payment')", (exp_id, name, my_name, share))
-                        conn.commit()
-                        st.success("İşlendi!")
-                        st.rerun()
-                    except: conn.rollback()
-                    finally: conn.close()
-
-    with t2:
-        st.write("Başkalarına olan **NET** borçlarınız (Ödemeyi yaptıktan sonra karşı taraftan onaylamasını isteyin):")
-        if not payments.empty:
-            borclar = {}
-            for name in EV_SAKINLERI:
-                if name == my_name: continue
-                they_owe_me = payments[(payments['payer'] == name) & (payments['receiver'] == my_name)]['amount'].sum()
-                i_owe_them = payments[(payments['payer'] == my_name) & (payments['receiver'] == name)]['amount'].sum()
-                net_debt = i_owe_them - they_owe_me
-                if net_debt > 0: borclar[name] = net_debt
-            
-            if borclar:
-                for name, net_amount in borclar.items():
-                    st.markdown(f"<div class='list-item'><div>👤 <b>{name}</b> kişisine net borcunuz:</div><div><b style='color:#f44336'>{int(net_amount)} ₺</b></div></div>", unsafe_allow_html=True)
+    else:
+        st.success("Herkes ödeşmiş, bekleyen borç yok! ✨")
+
+@profiled("user_panel")
+def user_panel(payments, owed):
+    if st.session_state.user:
+        st.divider()
+        my_name = st.session_state.user['username']
+        my_id = int(st.session_state.user['id'])
+
+        st.subheader(f"🛠️ Kullanıcı Paneli: {my_name}")
+        t1, t2, t3 = st.tabs(["➕ Harcama", "💸 Borçlarım", "🏦 Alacaklarım"])
+
+        with t1:
+            with st.form("new_exp", clear_on_submit=True):
+                st.text_input("Ne alındı?", key="exp_item")
+                st.number_input("Toplam Fiyat", min_value=0.0, key="exp_price")
+                st.multiselect("Kimler arasında bölünsün?", EV_SAKINLERI, default=EV_SAKINLERI, key="exp_participants")
+                with st.expander("⚖️ Ağırlıklı paylaşım"):
+                    st.caption("Varsayılan eşit bölüştürmedir. Örn. 2 yazılan kişi, 1 yazılanın iki katı öder.")
+                    weight_cols = st.columns(len(EV_SAKINLERI))
+                    for name, col in zip(EV_SAKINLERI, weight_cols):
+                        col.number_input(name, min_value=0.0, value=1.0, step=0.5, key=f"w_{name}")
+                st.form_submit_button("Kaydet ve Böl", on_click=save_expense, args=(TENANT['id'], my_name))
+            status = st.session_state.pop('expense_status', None)
+            if status:
+                kind, message = status
+                if kind == 'success':
+                    st.success(message)
+                else:
+                    st.error(message)
+
+        with t2:
+            st.write("Başkalarına olan **NET** borçlarınız (Ödemeyi yaptıktan sonra karşı taraftan onaylamasını isteyin):")
+            if not payments.empty:
+                borclar, _ = user_positions(owed, my_name)
+
+                if borclar:
+                    for name, net_amount in borclar.items():
+                        st.markdown(f"<div class='list-item'><div>👤 <b>{name}</b> kişisine net borcunuz:</div><div><b style='color:#f44336'>{int(net_amount)} ₺</b></div></div>", unsafe_allow_html=True)
+                else: st.info("Kimseye net borcunuz yok, rahatsınız!")
             else: st.info("Kimseye net borcunuz yok, rahatsınız!")
-        else: st.info("Kimseye net borcunuz yok, rahatsınız!")
-
-    with t3:
-        st.write("Sana olan net borcunu ödeyenleri buradan onayla ve sil:")
-        if not payments.empty:
-            alacaklar = {}
-            for name in EV_SAKINLERI:
-                if name == my_name: continue
-                they_owe_me = payments[(payments['payer'] == name) & (payments['receiver'] == my_name)]['amount'].sum()
-                i_owe_them = payments[(payments['payer'] == my_name) & (payments['receiver'] == name)]['amount'].sum()
-                net_credit = they_owe_me - i_owe_them
-                if net_credit > 0: alacaklar[name] = net_credit
-            
-            if alacaklar:
-                for name, net_amount in alacaklar.items():
-                    col1, col2 = st.columns([3, 1])
-                    col1.write(f"💰 **{name}**, tüm mahsuplaşmalar düşüldükten sonra sana net **{int(net_amount)} ₺** borçlu.", unsafe_allow_html=True)
-                    if col2.button("Tahsil Ettim ✅", key=f"coll_{name}"):
-                        run_query("""
-                            UPDATE payments SET status = 'paid' 
-                            WHERE status = 'pending_payment' 
-                            AND ((payer_id = (SELECT id FROM users WHERE username=%s) AND receiver_id = %s) 
-                              OR (payer_id = %s AND receiver_id = (SELECT id FROM users WHERE username=%s)))
-                        """, (name, my_id, my_id, name), is_select=False)
-                        st.rerun()
+
+        with t3:
+            st.write("Sana olan net borcunu ödeyenleri buradan onayla ve sil:")
+            if not payments.empty:
+                _, alacaklar = user_positions(owed, my_name)
+
+                if alacaklar:
+                    for name, net_amount in alacaklar.items():
+                        col1, col2 = st.columns([3, 1])
+                        col1.write(f"💰 **{name}**, tüm mahsuplaşmalar düşüldükten sonra sana net **{int(net_amount)} ₺** borçlu.", unsafe_allow_html=True)
+                        col2.button("Tahsil Ettim ✅", key=f"coll_{name}", on_click=collect, args=(TENANT['id'], name, my_id))
+                else: st.write("Kimseden net bir alacağın kalmamış.")
             else: st.write("Kimseden net bir alacağın kalmamış.")
-        else: st.write("Kimseden net bir alacağın kalmamış.")
+
+debts()
 
 # ==========================================
 # 📈 4. BÖLÜM: ENERJİ GRAFİKLERİ 
@@ -283,22 +399,42 @@ if st.session_state.user:
 st.divider()
 st.subheader("📊 Enerji Kullanım Grafikleri")
 
-if df_energy is not None and not df_energy.empty:
-    
-    st.markdown("**⚡ KIBTEK Bakiye Akışı**")
-    st.area_chart(df_energy.set_index('date_time')['balance'], height=200)
-    
-    st.markdown("**📉 Günlük Tüketim Trendi**")
-    df_cons_chart = df_energy.copy()
-    df_cons_chart['date_only'] = df_cons_chart['date_time'].dt.date
-    
-    daily_cons = df_cons_chart[df_cons_chart['diff'] < 0].groupby('date_only')['diff'].sum().abs().reset_index()
-    
-    if not daily_cons.empty:
-        daily_cons.rename(columns={'date_only': 'Tarih', 'diff': 'Tüketim (₺)'}, inplace=True)
-        st.line_chart(daily_cons.set_index('Tarih')['Tüketim (₺)'], height=200)
-    else:
-        st.info("Henüz günlük tüketim grafiği oluşturacak kadar veri birikmedi.")
+@section("energy_charts", run_every=ENERGY_REFRESH)
+def energy_charts():
+    # Okumalar süreç önbelleğinde tutulur, her çalıştırmada sadece yeni satırlar çekilir.
+    # 'diff' ve 'date_only' sütunları ile günlük düşüşler eklenen kısım için güncellenir.
+    df_energy, daily_drops = load_readings(HESAP_NO)
+
+    if df_energy is not None and not df_energy.empty:
+
+        # Tarayıcıya seçilen aralıkta en fazla birkaç bin nokta gider (downsample.py)
+        chart_range = st.radio("Zaman aralığı", list(RANGES), index=len(RANGES) - 1, horizontal=True, key="chart_range",
+                               on_change=rerun_affected, args=('chart_range',))
+
+        st.markdown("**⚡ KIBTEK Bakiye Akışı**")
+        st.area_chart(load_balance_chart(HESAP_NO, chart_range), height=200)
+
+        st.markdown("**📉 Günlük Tüketim Trendi**")
+        # energy_daily özet tablosundan gelir; göç henüz uygulanmadıysa yerel hesaba düşer
+        daily_series = load_daily_consumption(HESAP_NO)
+        if daily_series.empty:
+            daily_series = daily_drops.abs()
+        daily_series = downsample_series(range_filter(daily_series, chart_range))
+        daily_cons = daily_series.rename_axis('date_only').rename('diff').reset_index()
+
+        if not daily_cons.empty:
+            daily_cons.rename(columns={'date_only': 'Tarih', 'diff': 'Tüketim (₺)'}, inplace=True)
+            chart = daily_cons.set_index('Tarih')[['Tüketim (₺)']]
+            # Anomali günleri (energy_events) ayrı seride işaretlenir, diğer günler boş kalır
+            anomalies = load_anomalies(HESAP_NO)
+            if not anomalies.empty:
+                flagged = pd.to_datetime(chart.index).isin(pd.to_datetime(anomalies['day']))
+                chart['Anomali (₺)'] = chart['Tüketim (₺)'].where(flagged)
+            st.line_chart(chart, height=200)
+        else:
+            st.info("Henüz günlük tüketim grafiği oluşturacak kadar veri birikmedi.")
+
+energy_charts()
 
 # ==========================================
 # 📜 5. BÖLÜM: SİSTEM LOGLARI 
@@ -306,62 +442,40 @@ if df_energy is not None and not df_energy.empty:
 st.divider()
 st.subheader("📜 Sistem Logları (Son Hareketler)")
 
-log_events = []
-
-df_all_expenses = run_query("SELECT item_name, price, buyer, date_time FROM expenses")
-if df_all_expenses is not None and not df_all_expenses.empty:
-    for _, row in df_all_expenses.iterrows():
-        log_events.append({
-            'date': pd.to_datetime(row['date_time']),
-            'icon': '🛒',
-            'title': f"Harcama: {row['item_name']} ({row['buyer']})",
-            'amount': -float(row['price']),
-            'color': '#ff4b4b' 
-        })
-
-if df_energy is not None and not df_energy.empty:
-    recharges = df_energy[df_energy['diff'] > 20]
-    for _, row in recharges.iterrows():
-        log_events.append({
-            'date': pd.to_datetime(row['date_time']),
-            'icon': '⚡',
-            'title': 'KIBTEK Yükleme',
-            'amount': float(row['diff']),
-            'color': '#2ecc71' 
-        })
-        
-    df_energy['date_only'] = df_energy['date_time'].dt.date
-    daily_drops = df_energy[df_energy['diff'] < 0].groupby('date_only')['diff'].sum()
-    for date_val, drop_val in daily_drops.items():
-        dt_val = pd.to_datetime(date_val) + pd.Timedelta(hours=23, minutes=59) 
-        if abs(drop_val) > 0:
-            log_events.append({
-                'date': dt_val,
-                'icon': '🔌',
-                'title': 'Elektrik Günlük Tüketi',
-                'amount': float(drop_val),
-                'color': '#ff9800' 
-            })
-
-log_events.sort(key=lambda x: x['date'], reverse=True)
-
-if log_events:
-    st.markdown('<div style="background:#161b22; border-radius:12px; padding:10px;">', unsafe_allow_html=True)
-    for ev in log_events[:100]:
-        amt_str = f"+{ev['amount']:.2f} ₺" if ev['amount'] > 0 else f"{ev['amount']:.2f} ₺"
-        date_str = f"{ev['date'].day} {TR_AYLAR[ev['date'].month]} {ev['date'].strftime('%H:%M')}"
-        st.markdown(f"""
-            <div style="display:flex; justify-content:space-between; align-items:center; padding:10px; border-bottom:1px solid #2a2e33;">
-                <div>
-                    <span style="font-size:1.2rem; margin-right:10px;">{ev['icon']}</span>
-                    <span style="font-weight:bold; color:#ddd;">{ev['title']}</span><br>
-                    <small style="color:#888; margin-left:35px;">{date_str}</small>
-                </div>
-                <div style="font-weight:bold; color:{ev['color']}; font-size:1.1rem;">
-                    {amt_str}
-                </div>
-            </div>
-        """, unsafe_allow_html=True)
-    st.markdown('</div>', unsafe_allow_html=True)
-else:
-    st.info("Sistemde henüz kaydedilmiş bir hareket bulunmuyor.")
+def load_more_logs():
+    st.session_state.log_pages += 1
+    rerun_affected('log_more')
+
+@section("log_feed")
+def log_feed():
+    # Olaylar tek sorguda, sayfa sayfa gelir (bkz. log_feed.py); önceki sayfalar önbellekten okunur
+    if 'log_pages' not in st.session_state: st.session_state.log_pages = 1
+
+    log_pages, cursor, has_more = [], None, False
+    for _ in range(st.session_state.log_pages):
+        page = read_query(FEED_SQL, feed_params(TENANT, cursor), scope=TENANT['id'])
+        if page.empty:
+            has_more = False
+            break
+        log_pages.append(page)
+        cursor = next_cursor(page)
+        has_more = len(page) == PAGE_SIZE
+
+    if log_pages:
+        st.markdown(render_events_html(pd.concat(log_pages, ignore_index=True), TR_AYLAR), unsafe_allow_html=True)
+        if has_more:
+            st.button("⬇️ Daha fazla yükle", use_container_width=True, on_click=load_more_logs)
+    else:
+        st.info("Sistemde henüz kaydedilmiş bir hareket bulunmuyor.")
+
+log_feed()
+
+if st.session_state.get('show_timings'):
+    with st.sidebar:
+        st.markdown("**⏱️ Sorgu Süreleri**")
+        render_query_timings()
+
+if profiling_enabled():
+    with st.sidebar:
+        st.markdown("**🧪 Bölüm Profili**")
+        render_section_profile()
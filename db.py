@@ -0,0 +1,228 @@
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+
+import pandas as pd
+import psycopg2
+import psycopg2.pool
+import streamlit as st
+
+from downsample import balance_chart
+from energy import ReadingsCache
+from events import ANOMALY_SQL
+from forecast import ForecastCache
+from rollup import DAILY_SQL, SUMMARY_SQL, summary_from_row
+from snapshot import SNAPSHOT_DIR, SnapshotStore
+from tenants import RESIDENTS_SQL, TENANT_SQL
+
+# --- AYARLAR ---
+POOL_MIN = 1
+POOL_MAX = 10
+POOL_WAIT = 30  # saniye; havuz doluyken boş bağlantı bu kadar beklenir
+READ_TTL = 60  # saniye; yazma işlemlerinde zaten temizleniyor
+MAX_QUERY_TIMINGS = 500  # oturum başına tutulan en fazla sorgu kaydı
+# Sayaç (daire) başına süreç önbellekleri (okumalar, tahmin, anlık görüntü); en son kullanılan
+# bu kadar daire bellekte tutulur, diğerleri ilk istekte anlık görüntüden/veritabanından yüklenir
+TENANT_CACHE_SIZE = int(os.environ.get("TENANT_CACHE_SIZE", "200"))
+
+# --- BAĞLANTI HAVUZU ---
+# Süreç boyunca tek havuz; her sorguda yeniden bağlantı kurulmaz
+@st.cache_resource
+def get_pool():
+    return psycopg2.pool.ThreadedConnectionPool(POOL_MIN, POOL_MAX, st.secrets["DATABASE_URL"])
+
+# ThreadedConnectionPool doluyken getconn() beklemez, PoolError verir; aynı anda en fazla
+# POOL_MAX bağlantı alınsın diye önce bu semafor beklenir
+@st.cache_resource
+def get_slots():
+    return threading.BoundedSemaphore(POOL_MAX)
+
+@contextmanager
+def connection():
+    slots = get_slots()
+    if not slots.acquire(timeout=POOL_WAIT):
+        raise psycopg2.pool.PoolError(f"{POOL_WAIT} sn içinde boş veritabanı bağlantısı bulunamadı")
+    try:
+        pool = get_pool()
+        conn = pool.getconn()
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            if not broken and not conn.closed:
+                # Havuza temiz bağlantı geri dönsün
+                if conn.status != psycopg2.extensions.STATUS_READY:
+                    conn.rollback()
+            pool.putconn(conn, close=broken or bool(conn.closed))
+    finally:
+        slots.release()
+
+# --- SORGU SÜRELERİ ---
+def reset_query_timings():
+    st.session_state['_query_timings'] = []
+
+def _record(label, started, rows):
+    timings = st.session_state.setdefault('_query_timings', [])
+    timings.append({'sorgu': label, 'ms': (time.perf_counter() - started) * 1000.0, 'satır': rows})
+    del timings[:-MAX_QUERY_TIMINGS]
+
+def _label(query):
+    return " ".join(query.split())[:60]
+
+def render_query_timings():
+    timings = st.session_state.get('_query_timings', [])
+    if not timings:
+        st.caption("Bu çalıştırmada sorgu yok.")
+        return
+    df = pd.DataFrame(timings)
+    st.caption(f"{len(df)} sorgu, toplam {df['ms'].sum():.1f} ms")
+    st.dataframe(df.style.format({'ms': '{:.1f}'}), use_container_width=True, hide_index=True)
+
+# --- SORGULAR ---
+def _execute(query, params=(), is_select=True):
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            if is_select:
+                cols = [desc[0] for desc in cur.description]
+                return pd.DataFrame(cur.fetchall(), columns=cols)
+        conn.commit()
+
+def run_query(query, params=(), is_select=True, scope=None):
+    # Önbelleksiz sorgu (giriş kontrolü, yazma işlemleri). Veritabanı hataları (psycopg2.Error)
+    # boş tablo yerine çağırana iletilir; panel bölümleri hatayı gösterir (dashboard.section).
+    # Yazmalar sadece scope'un (daire id'si) okumalarını geçersiz kılar; scope yoksa hepsini
+    started = time.perf_counter()
+    res = None
+    try:
+        res = _execute(query, params, is_select)
+    finally:
+        _record(_label(query), started, len(res) if res is not None else 0)
+    if not is_select:
+        invalidate_reads(scope)
+    return res
+
+# Önbellekli okumalar kapsamın (daire id'si) sürümüyle anahtarlanır; bir dairenin yazması sadece
+# o dairenin sürümünü artırır, diğer dairelerin önbelleği korunur. Eski sürümün girdileri
+# bir daha okunmaz ve READ_TTL sonunda düşer
+_generations = itertools.count(1)
+
+@st.cache_resource
+def get_read_generations():
+    return {}
+
+@st.cache_data(ttl=READ_TTL, show_spinner=False)
+def _cached_read(query, params, scope, generation):
+    return _execute(query, params)
+
+def read_query(query, params=(), scope=None):
+    # TTL önbellekli okuma; yazmalarda invalidate_reads(scope) ile tazelenir. Hatalar run_query gibi iletilir
+    started = time.perf_counter()
+    res = None
+    try:
+        generation = get_read_generations().get(scope, 0) if scope is not None else 0
+        res = _cached_read(query, params if isinstance(params, dict) else tuple(params), scope, generation)
+    finally:
+        _record(_label(query), started, len(res) if res is not None else 0)
+    return res
+
+def invalidate_reads(scope=None):
+    # scope verilmezse (ölçüm betikleri, toplu işlemler) tüm okuma önbelleği temizlenir
+    if scope is None:
+        _cached_read.clear()
+    else:
+        get_read_generations()[scope] = next(_generations)
+
+# --- DAİRE ---
+def load_tenant(slug=None):
+    # Dönüş: {'id', 'slug', 'name', 'account_no'} ya da None (bkz. tenants.py)
+    res = read_query(TENANT_SQL, {'slug': slug})
+    if res.empty:
+        return None
+    row = res.iloc[0]
+    return {'id': int(row['id']), 'slug': row['slug'], 'name': row['name'], 'account_no': row['account_no']}
+
+def load_residents(tenant_id):
+    res = read_query(RESIDENTS_SQL, (tenant_id,))
+    return res['username'].tolist() if not res.empty else []
+
+# --- OKUMALAR (ARTIMLI) ---
+# Her sayacın kendi okuma önbelleği ve anlık görüntü dizini vardır; bir dairenin sorguları
+# sadece kendi sayacının bölümünü (readings HASH bölümleri, bkz. schema.py göç 7) okur.
+@st.cache_resource(max_entries=TENANT_CACHE_SIZE)
+def get_snapshot_store(account_no):
+    return SnapshotStore(os.path.join(SNAPSHOT_DIR, account_no))
+
+def _count_readings_until(account_no, watermark):
+    res = run_query("SELECT count(*) AS n FROM readings WHERE account_no = %s AND date_time <= %s",
+                    (account_no, watermark.to_pydatetime()))
+    return int(res['n'].iloc[0]) if not res.empty else -1
+
+def _snapshot_matches(account_no, watermark, rows):
+    # Anlık görüntüden sonra eski okumalar silinmiş/eklenmişse kullanılmaz
+    return _count_readings_until(account_no, watermark) == rows
+
+@st.cache_resource(max_entries=TENANT_CACHE_SIZE)
+def get_readings_cache(account_no):
+    # Soğuk başlangıçta diskteki anlık görüntüden başlar, sadece sonrası çekilir
+    cache = ReadingsCache()
+    snap = get_snapshot_store(account_no).load(partial(_snapshot_matches, account_no))
+    if snap is not None:
+        cache.restore(*snap)
+    return cache
+
+def _fetch_readings_since(account_no, watermark):
+    if watermark is None:
+        return run_query("SELECT * FROM readings WHERE account_no = %s ORDER BY date_time ASC", (account_no,))
+    return run_query("SELECT * FROM readings WHERE account_no = %s AND date_time > %s ORDER BY date_time ASC",
+                     (account_no, watermark.to_pydatetime()))
+
+def load_readings(account_no):
+    # Dönüş: (okumalar, günlük düşüşler); ikisi de salt okunur paylaşılan nesneler
+    cache = get_readings_cache(account_no)
+    frame, daily = cache.refresh(partial(_fetch_readings_since, account_no), partial(_count_readings_until, account_no))
+    get_snapshot_store(account_no).maybe_save(cache)
+    return frame, daily
+
+@st.cache_resource(max_entries=TENANT_CACHE_SIZE)
+def get_forecast_cache(account_no):
+    return ForecastCache()
+
+def load_forecasts(account_no):
+    # Sayacın tükenme tahmini; sadece yeni okuma geldiyse yeniden hesaplanır
+    frame, _ = load_readings(account_no)
+    return get_forecast_cache(account_no).get(frame)
+
+def load_balance_chart(account_no, range_key):
+    # load_readings() sonrası çağrılır; katmanlar yenileme sırasında güncellenir
+    return balance_chart(get_readings_cache(account_no).tiers, range_key)
+
+# --- SUNUCU TARAFI ÖZETLER ---
+def load_energy_summary(account_no):
+    # 1. bölüm metrikleri Postgres'te hesaplanır, tek satır gelir
+    res = read_query(SUMMARY_SQL, {'account_no': account_no})
+    if res.empty:
+        return None
+    summary = summary_from_row(res.iloc[0])
+    summary['account_no'] = res['account_no'].iloc[0]
+    return summary
+
+def load_daily_consumption(account_no):
+    # energy_daily özet tablosundan günlük tüketim (pozitif ₺)
+    res = read_query(DAILY_SQL, {'account_no': account_no})
+    if res.empty:
+        return pd.Series(dtype=float)
+    return pd.Series(res['drop_total'].astype(float).values, index=res['day'].values)
+
+def load_anomalies(account_no):
+    # energy_events'ten anomali günleri (okuma yazılırken hesaplanır, bkz. events.py)
+    res = read_query(ANOMALY_SQL, {'account_no': account_no})
+    if res.empty:
+        return pd.DataFrame(columns=['day', 'drop_total', 'score', 'detail'])
+    return res
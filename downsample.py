@@ -0,0 +1,111 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+# --- GRAFİK ÇÖZÜNÜRLÜKLERİ ---
+# Bakiye grafiği tarayıcıya en fazla MAX_POINTS nokta gönderir. Okumalar üç katmanda tutulur:
+# raw (tüm okumalar), hourly ve daily (her saat/gün için en düşük ve en yüksek bakiyenin
+# olduğu okumalar; tüketim tepeleri ve yükleme sıçramaları kaybolmaz). Seçilen zaman aralığında
+# TIER_LIMIT'i aşmayan en ince katman alınır ve LTTB ile MAX_POINTS noktaya indirilir.
+MAX_POINTS = 2000
+TIER_LIMIT = 50_000
+TIERS = [('raw', None), ('hourly', 'h'), ('daily', 'D')]
+
+RANGES = {
+    '24 saat': timedelta(days=1),
+    '7 gün': timedelta(days=7),
+    '30 gün': timedelta(days=30),
+    '1 yıl': timedelta(days=365),
+    'Tümü': None,
+}
+
+def lttb(x, y, n_out):
+    # Largest-Triangle-Three-Buckets: seçilen noktaların indekslerini döner (ilk ve son dahil)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            nxt = slice(edges[i + 1], edges[i + 2])
+            xc, yc = x[nxt].mean(), y[nxt].mean()
+        else:
+            xc, yc = x[-1], y[-1]
+        xa, ya = x[a], y[a]
+        area = np.abs((xa - xc) * (y[lo:hi] - ya) - (xa - x[lo:hi]) * (yc - ya))
+        a = lo + int(area.argmax())
+        idx[i + 1] = a
+    return idx
+
+def bucket_extremes(frame, freq):
+    # Her zaman diliminde en düşük ve en yüksek bakiyeli okuma (zaman sırasıyla)
+    if frame.empty:
+        return frame[['date_time', 'balance']]
+    balance = frame['balance']
+    buckets = frame['date_time'].dt.floor(freq)
+    groups = balance.groupby(buckets.values)
+    keep = np.union1d(groups.idxmin().values, groups.idxmax().values)
+    return frame.loc[keep, ['date_time', 'balance']].reset_index(drop=True)
+
+def build_tiers(frame):
+    # raw katmanı okuma tablosunun kendisidir (kopyalanmaz)
+    tiers = {'raw': frame}
+    valid = frame.dropna(subset=['balance'])
+    for name, freq in TIERS[1:]:
+        tiers[name] = bucket_extremes(valid, freq)
+    return tiers
+
+def update_tiers(tiers, frame, since):
+    # Sadece 'since' gününden itibaren yeniden hesaplanır; öncesi aynen kalır
+    if not tiers:
+        return build_tiers(frame)
+    cutoff = pd.Timestamp(since).floor('D')
+    recent = frame[frame['date_time'] >= cutoff].dropna(subset=['balance'])
+    updated = {'raw': frame}
+    for name, freq in TIERS[1:]:
+        old = tiers[name]
+        updated[name] = pd.concat([old[old['date_time'] < cutoff], bucket_extremes(recent.reset_index(drop=True), freq)],
+                                  ignore_index=True)
+    return updated
+
+def pick_tier(tiers, start=None, limit=TIER_LIMIT):
+    # Aralıkta 'limit'i aşmayan en ince katman; hiçbiri uymazsa daily
+    for name, _ in TIERS:
+        tier = tiers[name]
+        if start is not None:
+            tier = tier[tier['date_time'] >= start]
+        if len(tier) <= limit or name == TIERS[-1][0]:
+            return name, tier
+
+def downsample_series(series, max_points=MAX_POINTS):
+    # Zaman indeksli seriyi LTTB ile en fazla max_points noktaya indirir
+    series = series.dropna()
+    if len(series) <= max_points:
+        return series
+    x = pd.to_datetime(series.index).asi8 / 1e9
+    return series.iloc[lttb(x - x[0], series.values, max_points)]
+
+def balance_chart(tiers, range_key='Tümü', max_points=MAX_POINTS):
+    # Dönüş: date_time indeksli bakiye serisi (en fazla max_points nokta)
+    raw = tiers.get('raw') if tiers else None
+    if raw is None or raw.empty:
+        return pd.Series(dtype=float, name='balance')
+    span = RANGES.get(range_key)
+    start = raw['date_time'].iloc[-1] - span if span is not None else None
+    _, tier = pick_tier(tiers, start)
+    return downsample_series(tier.set_index('date_time')['balance'], max_points)
+
+def range_filter(series, range_key='Tümü'):
+    # Günlük seri (tarih indeksli) için aynı zaman aralığı seçimi
+    span = RANGES.get(range_key)
+    if span is None or series.empty:
+        return series
+    index = pd.to_datetime(pd.Series(series.index))
+    return series[(index >= index.max() - span).values]
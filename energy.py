@@ -0,0 +1,113 @@
+import threading
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from downsample import update_tiers
+
+READING_COLUMNS = ['date_time', 'account_no', 'balance', 'diff', 'date_only']
+
+# --- OKUMA HAZIRLIĞI ---
+def prepare_readings(df):
+    df = df.copy()
+    df['balance'] = pd.to_numeric(df['balance'], errors='coerce')
+    df['date_time'] = pd.to_datetime(df['date_time'])
+    return df.sort_values('date_time', kind='stable').reset_index(drop=True)
+
+def add_derived(df, prev_balance=np.nan):
+    # diff: bir önceki okumaya göre fark (ilk satır için önceki parçanın son bakiyesi)
+    df['diff'] = df['balance'].diff()
+    if len(df):
+        df.loc[df.index[0], 'diff'] = df['balance'].iloc[0] - prev_balance
+    df['date_only'] = df['date_time'].dt.date
+    return df
+
+def daily_drops(df):
+    # Gün bazında toplam düşüş (negatif değerler), ör. 2024-05-01 -> -42.0
+    return df[df['diff'] < 0].groupby('date_only')['diff'].sum()
+
+def full_load(raw):
+    df = add_derived(prepare_readings(raw))
+    return df, daily_drops(df)
+
+# --- ENERJİ METRİKLERİ ---
+def energy_metrics(df):
+    # Panelin 1. bölümündeki hesaplar: son bakiye, son 24 saat tüketimi, 7 günlük ortalama
+    curr_bal = float(df.iloc[-1]['balance'])
+    last_upd = df.iloc[-1]['date_time']
+
+    one_day_ago = last_upd - timedelta(hours=24)
+    past_df = df[df['date_time'] <= one_day_ago]
+    past_balance = float(past_df.iloc[-1]['balance']) if not past_df.empty else None
+
+    seven_days_ago = last_upd - timedelta(days=7)
+    recent_df = df[df['date_time'] >= seven_days_ago]
+    recent_drop = float(recent_df[recent_df['diff'] < 0]['diff'].abs().sum())
+    span_days = (recent_df['date_time'].max() - recent_df['date_time'].min()).total_seconds() / 86400.0
+
+    return summarize(curr_bal, last_upd, past_balance, len(recent_df), recent_drop, span_days)
+
+def summarize(curr_bal, last_upd, past_balance, recent_count, recent_drop, span_days):
+    last_24h_cons = max(0.0, past_balance - curr_bal) if past_balance is not None else 0.0
+
+    avg_daily = 0.0
+    if recent_count > 1 and span_days > 0:
+        avg_daily = recent_drop / max(1.0, span_days)
+
+    return {
+        'curr_bal': curr_bal,
+        'last_upd': last_upd,
+        'last_24h_cons': last_24h_cons,
+        'avg_daily': avg_daily,
+    }
+
+# --- ARTIMLI YÜKLEYİCİ ---
+class ReadingsCache:
+    # Süreç boyunca ayrıştırılmış okumaları tutar; her yenilemede sadece
+    # son görülen date_time'dan sonraki satırlar çekilip sona eklenir. Watermark'tan
+    # eski bir satır sonradan yazılırsa (yerel kuyruk aktarımı, geriye dönük yükleme) ya da
+    # silinirse sayım tutmaz ve önbellek baştan kurulur.
+    # Dönen frame oturumlar arasında paylaşılır, değiştirilmemelidir.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.frame = pd.DataFrame(columns=READING_COLUMNS)
+        self.daily = pd.Series(dtype=float)
+        self.tiers = {}  # grafik çözünürlük katmanları (downsample.py)
+        self.watermark = None
+
+    def restore(self, frame, daily, tiers, watermark):
+        # Diskteki anlık görüntüden (snapshot.py) başlatır
+        with self._lock:
+            self.frame, self.daily, self.tiers, self.watermark = frame, daily, tiers, watermark
+
+    def state(self):
+        with self._lock:
+            return self.frame, self.daily, self.tiers, self.watermark
+
+    def refresh(self, fetch_since, count_until=None):
+        # fetch_since(watermark) -> watermark'tan sonraki ham satırlar (DataFrame)
+        # count_until(watermark) -> veritabanında watermark'a kadar (dahil) olan satır sayısı
+        with self._lock:
+            if count_until is not None and self.watermark is not None and count_until(self.watermark) != len(self.frame):
+                self.reset()
+            tail = fetch_since(self.watermark)
+            if tail is not None and not tail.empty:
+                self.append(tail)
+            return self.frame, self.daily
+
+    def append(self, raw_tail):
+        tail = prepare_readings(raw_tail)
+        prev_balance = self.frame['balance'].iloc[-1] if not self.frame.empty else np.nan
+        tail = add_derived(tail, prev_balance)
+
+        self.daily = self.daily.add(daily_drops(tail), fill_value=0).sort_index()
+        if self.frame.empty:
+            self.frame = tail
+        else:
+            self.frame = pd.concat([self.frame, tail], ignore_index=True)
+        self.tiers = update_tiers(self.tiers, self.frame, tail['date_time'].min())
+        self.watermark = tail['date_time'].max()
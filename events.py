@@ -0,0 +1,132 @@
+import os
+from datetime import timedelta
+
+from psycopg2.extensions import adapt
+
+# --- ENERJİ OLAYLARI (energy_events) ---
+# Okumalar yazıldığı anda (spool.write_readings) sayaç bazında olaylar çıkarılır ve saklanır;
+# panelin log akışı ve grafikler geçmişi yeniden taramaz, sadece bu tabloyu okur:
+# - recharge: bir önceki okumaya göre RECHARGE_THRESHOLD ₺'den büyük artış (KIBTEK yükleme)
+# - consumption: günlük toplam düşüş (energy_daily.drop_total), gün sonuna (23:59) yazılır
+# - anomaly: günün tüketimi önceki ANOMALY_WINDOW_DAYS günün medyanından sağlam z-skoru
+#   0.6745 * (x - medyan) / MAD ile ANOMALY_Z'den fazla sapıyorsa. Yüksek sapma (tüketim
+#   tepesi) gün bitmeden de işaretlenir; düşük sapma (sayaç takılması, hiç düşüş yok) sadece
+#   tamamlanmış günlerde. Okuma kesintisinin değdiği günler atlanır (kesinti başladığı gün eksik
+#   kalır, kesintinin tüketimi ise okumaların döndüğü güne düşer).
+# - stale: iki okuma arasında STALE_HOURS saatten uzun boşluk (sayaç/scraper okuma vermedi)
+# Yeni okumalar geldiğinde silinip yeniden hesaplanan kısım (DAILY_REFRESH_SQL ile aynı yaklaşım):
+# okuma olayları en eski yeni okumadan, günlük olaylar onun bir önceki gününden itibaren.
+# Günlük olaylar energy_daily'den okunduğu için refresh_daily'den sonra çağrılır.
+RECHARGE_THRESHOLD = float(os.environ.get("RECHARGE_THRESHOLD", "20"))
+STALE_HOURS = float(os.environ.get("STALE_HOURS", "36"))  # günlük çalışma + pay
+ANOMALY_WINDOW_DAYS = 28
+ANOMALY_MIN_DAYS = 7     # daha az geçmişi olan günler değerlendirilmez
+ANOMALY_Z = 3.5
+# MAD alt sınırı: medyanın %10'u, en az 1 ₺; çok düzenli tüketimde küçük sapmalar anomali olmasın
+ANOMALY_MIN_MAD_RATIO = 0.1
+ANOMALY_MIN_MAD = 1.0
+
+EVENTS_REFRESH_SQL = """
+    DELETE FROM energy_events
+    WHERE (%(account_no)s::text IS NULL OR account_no = %(account_no)s)
+      AND ((kind IN ('recharge', 'stale') AND ev_time >= %(since)s::timestamp)
+           OR (kind IN ('consumption', 'anomaly') AND ev_time >= %(day)s::date));
+
+    -- Okuma olayları: since'tan önceki son okuma da LAG için pencereye alınır
+    WITH accounts AS (
+        SELECT %(account_no)s::text AS account_no WHERE %(account_no)s::text IS NOT NULL
+        UNION ALL
+        SELECT DISTINCT account_no FROM readings WHERE %(account_no)s::text IS NULL
+    ), bounds AS (
+        SELECT a.account_no, COALESCE(
+                (SELECT MAX(p.date_time) FROM readings p
+                 WHERE p.account_no = a.account_no AND p.date_time < %(since)s::timestamp),
+                %(since)s::timestamp) AS win_start
+        FROM accounts a
+    ), steps AS (
+        SELECT r.account_no, r.date_time,
+               r.balance::numeric - LAG(r.balance::numeric) OVER w AS diff,
+               EXTRACT(EPOCH FROM r.date_time - LAG(r.date_time) OVER w) / 3600.0 AS gap_hours
+        FROM readings r JOIN bounds b ON r.account_no = b.account_no AND r.date_time >= b.win_start
+        WINDOW w AS (PARTITION BY r.account_no ORDER BY r.date_time)
+    )
+    INSERT INTO energy_events (account_no, ev_time, kind, amount, score, detail)
+    SELECT s.account_no, s.date_time, e.kind, e.amount, e.score, e.detail
+    FROM steps s
+    CROSS JOIN LATERAL (VALUES
+        ('recharge', s.diff, NULL::float8, NULL::text),
+        ('stale', s.diff, s.gap_hours::float8, round(s.gap_hours)::text || ' saat')  -- score: boşluk (saat)
+    ) e (kind, amount, score, detail)
+    WHERE s.date_time >= %(since)s::timestamp
+      AND ((e.kind = 'recharge' AND s.diff > %(threshold)s)
+           OR (e.kind = 'stale' AND s.gap_hours > %(stale_hours)s));
+
+    INSERT INTO energy_events (account_no, ev_time, kind, amount)
+    SELECT d.account_no, d.day + TIME '23:59', 'consumption', -d.drop_total
+    FROM energy_daily d
+    WHERE (%(account_no)s::text IS NULL OR d.account_no = %(account_no)s)
+      AND d.day >= %(day)s::date AND d.drop_total > 0;
+
+    INSERT INTO energy_events (account_no, ev_time, kind, amount, score, detail)
+    SELECT account_no, day + TIME '23:59', 'anomaly', -drop_total, score, 'olağan ' || round(med)::text || ' ₺'
+    FROM (
+        SELECT d.account_no, d.day, d.drop_total, h.med,
+               0.6745 * (d.drop_total::float8 - h.med)
+                   / GREATEST(m.mad, %(min_mad_ratio)s * h.med, %(min_mad)s) AS score,
+               d.day < (SELECT MAX(l.day) FROM energy_daily l WHERE l.account_no = d.account_no) AS complete
+        FROM energy_daily d
+        CROSS JOIN LATERAL (
+            SELECT percentile_cont(0.5) WITHIN GROUP (ORDER BY p.drop_total::float8) AS med, COUNT(*) AS n
+            FROM energy_daily p
+            WHERE p.account_no = d.account_no AND p.day >= d.day - %(window_days)s AND p.day < d.day
+        ) h
+        CROSS JOIN LATERAL (
+            SELECT percentile_cont(0.5) WITHIN GROUP (ORDER BY abs(p.drop_total::float8 - h.med)) AS mad
+            FROM energy_daily p
+            WHERE p.account_no = d.account_no AND p.day >= d.day - %(window_days)s AND p.day < d.day
+        ) m
+        WHERE (%(account_no)s::text IS NULL OR d.account_no = %(account_no)s)
+          AND d.day >= %(day)s::date AND h.n >= %(min_days)s
+          AND NOT EXISTS (
+              SELECT 1 FROM energy_events s
+              WHERE s.account_no = d.account_no AND s.kind = 'stale'
+                AND s.ev_time >= d.day AND s.ev_time - make_interval(secs => s.score * 3600) < d.day + 1)
+    ) a
+    WHERE score > %(z)s OR (complete AND score < -%(z)s);
+"""
+
+def event_params(account_no, since, day):
+    # account_no None: tüm sayaçlar; okuma olayları since'tan, günlük olaylar day'den (dahil)
+    # itibaren yeniden hesaplanır
+    return {
+        'account_no': account_no,
+        'since': since,
+        'day': day,
+        'threshold': RECHARGE_THRESHOLD,
+        'stale_hours': STALE_HOURS,
+        'window_days': ANOMALY_WINDOW_DAYS,
+        'min_days': ANOMALY_MIN_DAYS,
+        'z': ANOMALY_Z,
+        'min_mad_ratio': ANOMALY_MIN_MAD_RATIO,
+        'min_mad': ANOMALY_MIN_MAD,
+    }
+
+def refresh_events(cur, account_no, since):
+    # Yeni okuma(lar) ve refresh_daily sonrası, sadece etkilenen günlerin olaylarını yeniden hesaplar.
+    # Bir önceki gün de dahildir: yeni günün ilk okumasıyla o gün tamamlanır ve düşük sapma
+    # ancak o zaman değerlendirilebilir.
+    cur.execute(EVENTS_REFRESH_SQL, event_params(account_no, since, since.date() - timedelta(days=1)))
+
+# Göç için parametreleri yerleştirilmiş hali: tüm sayaçlar, tüm geçmiş
+EVENTS_BACKFILL_SQL = EVENTS_REFRESH_SQL % {
+    key: adapt(value).getquoted().decode() for key, value in event_params(None, '-infinity', '-infinity').items()
+}
+
+# --- PANEL SORGULARI ---
+# Dairenin sayacı için anomali günleri (grafikte işaretlenir, durum bölümünde uyarı)
+ANOMALY_SQL = """
+    SELECT ev_time::date AS day, -amount AS drop_total, score, detail
+    FROM energy_events
+    WHERE account_no = %(account_no)s AND kind = 'anomaly'
+    ORDER BY ev_time ASC
+"""
@@ -0,0 +1,140 @@
+import csv
+import os
+import sys
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP
+
+from psycopg2.extras import execute_values
+
+# --- HARCAMA BÖLME SERVİSİ ---
+# Kullanıcı id'leri tek sorguda çözülür, harcama + tüm borç satırları tek işlemde
+# (transaction) çok satırlı INSERT ile yazılır. Sorgu sayısı katılımcı sayısından bağımsızdır.
+# Harcamalar bir daireye (tenants.py) aittir; kullanıcılar sadece o dairede aranır.
+CENT = Decimal("0.01")
+
+def split_shares(price, participants, weights=None):
+    # Ağırlıklara göre paylar: önce kuruşa aşağı yuvarlanır, kalan kuruşlar küsuratı en büyük
+    # (eşitlikte sondaki) pozitif ağırlıklı kişilere birer birer verilir. Paylar negatif olmaz,
+    # ağırlığı 0 olan hiçbir şey ödemez ve toplam her zaman fiyata eşittir.
+    participants = list(dict.fromkeys(participants))
+    if not participants:
+        raise ValueError("En az bir katılımcı gerekli.")
+    weights = weights or {}
+    w = [Decimal(str(weights.get(name, 1))) for name in participants]
+    if any(x < 0 for x in w) or sum(w) <= 0:
+        raise ValueError("Ağırlıklar pozitif olmalı.")
+    total = Decimal(str(price)).quantize(CENT, rounding=ROUND_HALF_UP)
+    exact = [total * x / sum(w) for x in w]
+    shares = [s.quantize(CENT, rounding=ROUND_DOWN) for s in exact]
+    cents = int((total - sum(shares)) / CENT)
+    order = sorted((i for i, x in enumerate(w) if x > 0), key=lambda i: (exact[i] - shares[i], i), reverse=True)
+    for i in order[:cents]:
+        shares[i] += CENT
+    return dict(zip(participants, shares))
+
+def resolve_user_ids(cur, tenant_id, usernames):
+    cur.execute("SELECT username, id FROM users WHERE tenant_id = %s AND username = ANY(%s)",
+                (tenant_id, list(set(usernames))))
+    ids = dict(cur.fetchall())
+    missing = set(usernames) - set(ids)
+    if missing:
+        raise ValueError(f"Bilinmeyen kullanıcı(lar): {', '.join(sorted(missing))}")
+    return ids
+
+def _payment_rows(expense_id, buyer, shares, ids):
+    return [(expense_id, ids[name], ids[buyer], float(amount), 'pending_payment')
+            for name, amount in shares.items() if name != buyer and amount > 0]
+
+def record_expense(conn, tenant_id, item, price, buyer, participants, weights=None, date_time=None):
+    # Dönüş: yeni harcamanın id'si. Hata olursa hiçbir satır yazılmaz.
+    shares = split_shares(price, participants, weights)
+    try:
+        with conn.cursor() as cur:
+            ids = resolve_user_ids(cur, tenant_id, list(shares) + [buyer])
+            cur.execute(
+                "INSERT INTO expenses (tenant_id, item_name, price, buyer, date_time) VALUES (%s, %s, %s, %s, COALESCE(%s, NOW())) RETURNING id",
+                (tenant_id, item, price, buyer, date_time))
+            expense_id = cur.fetchone()[0]
+            execute_values(cur, "INSERT INTO payments (expense_id, payer_id, receiver_id, amount, status) VALUES %s",
+                           _payment_rows(expense_id, buyer, shares, ids))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return expense_id
+
+def record_expenses_bulk(conn, tenant_id, expenses):
+    # expenses: [{'item_name', 'price', 'buyer', 'date_time', 'participants', 'weights'}, ...]
+    # Ne kadar harcama olursa olsun 3 sorgu: kullanıcılar, harcamalar, ödemeler.
+    if not expenses:
+        return []
+    splits = [split_shares(e['price'], e['participants'], e.get('weights')) for e in expenses]
+    names = {e['buyer'] for e in expenses} | {name for shares in splits for name in shares}
+    try:
+        with conn.cursor() as cur:
+            ids = resolve_user_ids(cur, tenant_id, list(names))
+            expense_ids = [row[0] for row in execute_values(
+                cur, "INSERT INTO expenses (tenant_id, item_name, price, buyer, date_time) VALUES %s RETURNING id",
+                [(tenant_id, e['item_name'], e['price'], e['buyer'], e['date_time']) for e in expenses],
+                template="(%s, %s, %s, %s, COALESCE(%s::timestamp, NOW()))", page_size=len(expenses), fetch=True)]
+            rows = []
+            for expense_id, e, shares in zip(expense_ids, expenses, splits):
+                rows += _payment_rows(expense_id, e['buyer'], shares, ids)
+            execute_values(cur, "INSERT INTO payments (expense_id, payer_id, receiver_id, amount, status) VALUES %s",
+                           rows, page_size=max(1, len(rows)))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return expense_ids
+
+# --- CSV İLE GERİYE DÖNÜK YÜKLEME ---
+# Sütunlar: item_name, price, buyer, date_time, participants (";" ile ayrılmış, boşsa herkes),
+# weights (isteğe bağlı, participants ile aynı sırada ";" ile ayrılmış)
+def read_expenses_csv(path, default_participants):
+    expenses = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for line_no, row in enumerate(csv.DictReader(f), start=2):
+            participants = [x.strip() for x in (row.get('participants') or '').split(';') if x.strip()]
+            participants = participants or list(default_participants)
+            weights = None
+            if (row.get('weights') or '').strip():
+                values = [float(x) for x in row['weights'].split(';')]
+                if len(values) != len(participants):
+                    raise ValueError(f"{line_no}. satır: weights sayısı participants ile aynı olmalı.")
+                weights = dict(zip(participants, values))
+            expenses.append({
+                'item_name': row['item_name'].strip(),
+                'price': float(row['price']),
+                'buyer': row['buyer'].strip(),
+                'date_time': (row.get('date_time') or '').strip() or None,
+                'participants': participants,
+                'weights': weights,
+            })
+    return expenses
+
+def main():
+    # Kullanım: python expenses.py harcamalar.csv [daire-slug]  (daire verilmezse ilk daire)
+    import psycopg2
+
+    from tenants import find_tenant, residents
+
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url or len(sys.argv) < 2:
+        print("Kullanım: DATABASE_URL=... python expenses.py harcamalar.csv [daire-slug]")
+        return
+    conn = psycopg2.connect(database_url)
+    try:
+        with conn.cursor() as cur:
+            tenant = find_tenant(cur, sys.argv[2] if len(sys.argv) > 2 else None)
+            if tenant is None:
+                print("HATA: Daire bulunamadı!")
+                return
+            everyone = residents(cur, tenant['id'])
+        expenses = read_expenses_csv(sys.argv[1], everyone)
+        ids = record_expenses_bulk(conn, tenant['id'], expenses)
+        print(f"✅ {tenant['name']}: {len(ids)} harcama içe aktarıldı.")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
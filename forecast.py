@@ -0,0 +1,181 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from events import RECHARGE_THRESHOLD
+
+# --- BAKİYE EŞİKLERİ ---
+# Panel ve uyarılar aynı eşikleri kullanır: RESERVE_BALANCE altı kullanılamaz kabul edilir,
+# FULL_BALANCE ve üstü %100'dür. (Eskiden panel 300/3700, app.py 500/4000 kullanıyordu.)
+RESERVE_BALANCE = float(os.environ.get("RESERVE_BALANCE", "500"))
+FULL_BALANCE = float(os.environ.get("FULL_BALANCE", "4000"))
+
+# --- TAHMİN AYARLARI ---
+HISTORY_DAYS = 56        # son 8 hafta
+EWMA_SPAN = 7            # gün
+SEASON_PRIOR = 2.0       # haftanın günü katsayıları bu kadar "sanal gün" ile 1'e çekilir
+HORIZON_DAYS = 366
+BAND_Z = 1.28            # ~%80 güven aralığı
+DAY = 86400.0
+
+FORECAST_COLUMNS = ['account_no', 'curr_bal', 'last_time', 'percent', 'daily_rate',
+                    'days_left', 'days_low', 'days_high', 'depletion_date']
+
+def balance_percent(balance):
+    # RESERVE_BALANCE altı %0-5, RESERVE_BALANCE..FULL_BALANCE arası %5-100 (dizi de alır)
+    balance = np.asarray(balance, dtype=float)
+    low = balance / RESERVE_BALANCE * 5.0
+    high = 5.0 + (balance - RESERVE_BALANCE) / (FULL_BALANCE - RESERVE_BALANCE) * 95.0
+    percent = np.where(balance <= RESERVE_BALANCE, low, np.minimum(high, 100.0))
+    return float(percent) if percent.ndim == 0 else percent
+
+# --- GÜNLÜK TÜKETİM MATRİSİ ---
+def daily_rates(meter, seconds, balance, start_day, history_days=HISTORY_DAYS):
+    # Girdi: sayaç ve zamana göre sıralı okumalar (meter: 0..n-1, seconds: epoch sn) ve her
+    # sayacın pencere başlangıç günü. Ardışık iki okuma arası bir aralıktır; +RECHARGE_THRESHOLD'dan
+    # büyük artış içeren aralıklar (yükleme) tüketimi bilinmediği için segment sınırı sayılıp
+    # atlanır. Her aralığın düşüşü ve süresi bitiş gününe yazılır; günlük hız = düşüş / süre
+    # (okuması olmayan gün NaN).
+    n_meters = len(start_day)
+    same = meter[1:] == meter[:-1]
+    dt = np.diff(seconds) / DAY
+    db = np.diff(balance)
+    day = np.floor(seconds[1:] / DAY).astype(np.int64) - start_day[meter[1:]]
+    keep = same & (dt > 0) & (db <= RECHARGE_THRESHOLD) & (day >= 0) & (day < history_days)
+
+    flat = meter[1:][keep].astype(np.int64) * history_days + day[keep]
+    size = n_meters * history_days
+    used = np.bincount(flat, weights=np.maximum(-db[keep], 0.0), minlength=size)
+    span = np.bincount(flat, weights=dt[keep], minlength=size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rates = np.where(span > 0, used / span, np.nan)
+    return rates.reshape(n_meters, history_days)
+
+def weekdays_from(first_day, n_days):
+    # Gün numarasından (1970-01-01'den beri) haftanın günü, 0 = pazartesi; 1970-01-01 perşembe
+    return (first_day[:, None] + np.arange(n_days)[None, :] + 3) % 7
+
+def weekday_factors(rates, weekdays, prior=SEASON_PRIOR):
+    # Her sayaç için haftanın günü katsayısı (ortalaması 1); az veride 1'e yakın kalır
+    with np.errstate(invalid='ignore', divide='ignore'):
+        seen = ~np.isnan(rates)
+        overall = np.nansum(rates, axis=1) / np.maximum(seen.sum(axis=1), 1)
+        factors = np.ones((rates.shape[0], 7))
+        for w in range(7):
+            mask = seen & (weekdays == w)
+            count = mask.sum(axis=1)
+            mean = np.where(mask, rates, 0.0).sum(axis=1) / np.maximum(count, 1)
+            ratio = np.where(overall > 0, mean / overall, 1.0)
+            factors[:, w] = (count * ratio + prior) / (count + prior)
+        factors /= factors.mean(axis=1, keepdims=True)
+    return np.nan_to_num(factors, nan=1.0)
+
+def ewma(values, span=EWMA_SPAN):
+    # NaN atlayan üstel ortalama ve varyans; gün ekseninde döngü, sayaç ekseninde vektörel
+    alpha = 2.0 / (span + 1.0)
+    level = np.full(values.shape[0], np.nan)
+    var = np.zeros(values.shape[0])
+    for x in values.T:
+        seen = ~np.isnan(x)
+        first = seen & np.isnan(level)
+        level[first] = x[first]
+        upd = seen & ~first
+        delta = x[upd] - level[upd]
+        level[upd] += alpha * delta
+        var[upd] = (1.0 - alpha) * (var[upd] + alpha * delta * delta)
+    return level, var
+
+# --- TAHMİN ---
+def forecast_arrays(meter, seconds, balance, n_meters):
+    # Tüm sayaçlar için tek geçişte: (günlük hız, kalan gün, alt/üst sınır, son bakiye).
+    # Her sayacın penceresi kendi son okumasının gününde biter.
+    last = np.r_[meter[1:] != meter[:-1], True]
+    end_day = np.zeros(n_meters, dtype=np.int64)
+    end_day[meter[last]] = np.floor(seconds[last] / DAY).astype(np.int64)
+    curr_bal = np.full(n_meters, np.nan)
+    curr_bal[meter[last]] = balance[last]
+    usable = np.maximum(curr_bal - RESERVE_BALANCE, 0.0)
+
+    start_day = end_day - HISTORY_DAYS + 1
+    rates = daily_rates(meter, seconds, balance, start_day)
+    weekdays = weekdays_from(start_day, HISTORY_DAYS)
+    factors = weekday_factors(rates, weekdays)
+    level, var = ewma(rates / np.take_along_axis(factors, weekdays, axis=1))
+    sd = np.sqrt(var)
+
+    # Mevsimsel nokta tahmini: gelecek günlerin beklenen tüketiminin kümülatif toplamı
+    rows = np.arange(n_meters)
+    daily = level[:, None] * np.take_along_axis(factors, weekdays_from(end_day + 1, HORIZON_DAYS), axis=1)
+    cum = np.cumsum(daily, axis=1)
+    reached = cum >= usable[:, None]
+    hit = reached.any(axis=1) & (level > 0)
+    k = reached.argmax(axis=1)
+    prev = np.where(k > 0, cum[rows, k - 1], 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        days_left = np.where(hit, k + (usable - prev) / daily[rows, k], np.nan)
+
+        # Güven aralığı: k günde tüketim ~ level*k ± z*sd*sqrt(k); sqrt(k) için ikinci derece çözüm
+        disc = np.sqrt((BAND_Z * sd) ** 2 + 4.0 * level * usable)
+        k_mid = usable / level
+        days_low = days_left * ((-BAND_Z * sd + disc) / (2.0 * level)) ** 2 / k_mid
+        days_high = days_left * ((BAND_Z * sd + disc) / (2.0 * level)) ** 2 / k_mid
+    empty = usable <= 0
+    days_left[empty], days_low[empty], days_high[empty] = 0.0, 0.0, 0.0
+    return level, days_left, days_low, days_high, curr_bal
+
+def forecast_frame(df):
+    # df: date_time, account_no, balance sütunlu okumalar (sıralı olması gerekmez)
+    if df.empty:
+        return pd.DataFrame(columns=FORECAST_COLUMNS)
+    df = df.dropna(subset=['balance'])
+    codes, accounts = pd.factorize(df['account_no'], sort=True)
+    times = pd.to_datetime(df['date_time']).to_numpy('datetime64[ns]')
+    seconds = times.astype(np.int64) / 1e9
+    order = np.lexsort((seconds, codes))
+    meter, seconds, times = codes[order], seconds[order], times[order]
+    balance = df['balance'].to_numpy(dtype=float)[order]
+
+    level, days_left, days_low, days_high, curr_bal = forecast_arrays(meter, seconds, balance, len(accounts))
+    last = np.r_[meter[1:] != meter[:-1], True]
+    last_time = pd.DatetimeIndex(times[last])
+    return pd.DataFrame({
+        'account_no': np.asarray(accounts),
+        'curr_bal': curr_bal,
+        'last_time': last_time,
+        'percent': balance_percent(curr_bal),
+        'daily_rate': level,
+        'days_left': days_left,
+        'days_low': days_low,
+        'days_high': days_high,
+        'depletion_date': last_time + pd.to_timedelta(np.round(days_left * DAY), unit='s'),
+    })
+
+class ForecastCache:
+    # Sayaç başına son tahmin; sadece son okuma zamanı değişen sayaçlar yeniden hesaplanır
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rows = {}  # account_no -> tahmin satırı (dict)
+
+    def get(self, df):
+        if df.empty:
+            return pd.DataFrame(columns=FORECAST_COLUMNS)
+        with self._lock:
+            last_times = df.groupby('account_no', sort=False)['date_time'].max()
+            stale = [acc for acc, t in last_times.items()
+                     if acc not in self.rows or self.rows[acc]['last_time'] != t]
+            if stale:
+                # Sadece tahmin penceresindeki okumalar (bir gün pay ile)
+                cutoff = last_times[stale].min() - pd.Timedelta(days=HISTORY_DAYS + 1)
+                fresh = forecast_frame(df[df['account_no'].isin(stale) & (df['date_time'] >= cutoff)])
+                for row in fresh.to_dict('records'):
+                    self.rows[row['account_no']] = row
+            return pd.DataFrame([self.rows[acc] for acc in last_times.index if acc in self.rows], columns=FORECAST_COLUMNS)
+
+    def invalidate(self, account_no=None):
+        with self._lock:
+            if account_no is None:
+                self.rows.clear()
+            else:
+                self.rows.pop(account_no, None)
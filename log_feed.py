@@ -0,0 +1,99 @@
+import html
+
+import pandas as pd
+
+# --- SİSTEM LOGLARI ---
+# Dairenin harcamaları ve sayacının enerji olayları (yükleme, günlük tüketim, anomali, okuma kesintisi) tek bir
+# UNION ALL sorgusunda, zamana göre sıralı ve sayfalı (keyset) gelir. Her sayfa için sadece
+# page_size satır okunur. İmleç (ev_date, ev_key) her kolda da uygulanır; aynı anda
+# page_size'tan fazla satır olsa da sayfalar kaymaz (toplu yükleme; CSV'deki tarihsiz harcamalar
+# yükleme anını, NOW(), alır ve aynı zamanı paylaşır). expenses.date_time ve energy_events.ev_time
+# NOT NULL'dır (schema.py), bu yüzden imleç karşılaştırmalarında NULL sıralaması gerekmez:
+# - harcamalar: expenses(tenant_id, date_time) indeksiyle,
+# - enerji olayları: okumalar yazılırken hesaplanan energy_events tablosundan (bkz. events.py),
+#   (account_no, ev_time) indeksiyle; okumalar yeniden taranmaz.
+PAGE_SIZE = 50
+
+FEED_SQL = """
+    WITH cur AS MATERIALIZED (
+        SELECT COALESCE(%(before_date)s::timestamp, 'infinity'::timestamp) AS before_date,
+               COALESCE(%(before_key)s, '~') AS before_key
+    ), expense_events AS (
+        SELECT e.date_time AS ev_date, 'e:' || lpad(e.id::text, 12, '0') AS ev_key, 'expense' AS kind,
+               'Harcama: ' || e.item_name || ' (' || e.buyer || ')' AS title, -e.price::numeric AS amount
+        FROM expenses e, cur
+        WHERE e.tenant_id = %(tenant_id)s AND e.date_time <= cur.before_date
+          AND (e.date_time, 'e:' || lpad(e.id::text, 12, '0')) < (cur.before_date, cur.before_key)
+        ORDER BY e.date_time DESC, e.id DESC
+        LIMIT %(limit)s
+    ), meter_events AS (
+        -- Aynı andaki olaylar (gün sonu tüketim + anomali) ev_key sırasıyla gelsin
+        SELECT ev.ev_time AS ev_date, ev.kind || ':' || ev.ev_time::text AS ev_key, ev.kind,
+               CASE ev.kind
+                   WHEN 'recharge' THEN 'KIBTEK Yükleme'
+                   WHEN 'consumption' THEN 'Elektrik Günlük Tüketi'
+                   WHEN 'anomaly' THEN 'Olağandışı Tüketim (' || ev.detail || ')'
+                   ELSE 'Okuma Kesintisi (' || ev.detail || ')'
+               END AS title,
+               ev.amount
+        FROM energy_events ev, cur
+        WHERE ev.account_no = %(account_no)s AND ev.ev_time <= cur.before_date
+          AND (ev.ev_time, ev.kind || ':' || ev.ev_time::text) < (cur.before_date, cur.before_key)
+        ORDER BY ev.ev_time DESC, ev.kind DESC
+        LIMIT %(limit)s
+    )
+    SELECT ev.* FROM (
+        SELECT * FROM expense_events
+        UNION ALL SELECT * FROM meter_events
+    ) ev, cur
+    WHERE (ev.ev_date, ev.ev_key) < (cur.before_date, cur.before_key)
+    ORDER BY ev.ev_date DESC, ev.ev_key DESC
+    LIMIT %(limit)s
+"""
+
+STYLES = {
+    'expense': ('🛒', '#ff4b4b'),
+    'recharge': ('⚡', '#2ecc71'),
+    'consumption': ('🔌', '#ff9800'),
+    'anomaly': ('⚠️', '#e74c3c'),
+    'stale': ('⏸️', '#888888'),
+}
+
+def feed_params(tenant, before=None, page_size=PAGE_SIZE):
+    # tenant: daire (tenants.py); before: bir önceki sayfanın son satırı (ev_date, ev_key), ilk sayfa için None
+    before_date, before_key = before if before else (None, None)
+    return {
+        'tenant_id': tenant['id'],
+        'account_no': tenant['account_no'],
+        'before_date': before_date,
+        'before_key': before_key,
+        'limit': page_size,
+    }
+
+def next_cursor(page):
+    if page.empty:
+        return None
+    last = page.iloc[-1]
+    return pd.Timestamp(last['ev_date']).to_pydatetime(), last['ev_key']
+
+def render_events_html(events, months):
+    # Tüm olaylar tek bir HTML bloğu olarak üretilir (olay başına ayrı st.markdown yok)
+    rows = []
+    for ev_date, kind, title, amount in events[['ev_date', 'kind', 'title', 'amount']].itertuples(index=False):
+        icon, color = STYLES[kind]
+        ev_date = pd.Timestamp(ev_date)
+        amount = float(amount)
+        amt_str = f"+{amount:.2f} ₺" if amount > 0 else f"{amount:.2f} ₺"
+        date_str = f"{ev_date.day} {months[ev_date.month]} {ev_date.strftime('%H:%M')}"
+        rows.append(f"""
+            <div style="display:flex; justify-content:space-between; align-items:center; padding:10px; border-bottom:1px solid #2a2e33;">
+                <div>
+                    <span style="font-size:1.2rem; margin-right:10px;">{icon}</span>
+                    <span style="font-weight:bold; color:#ddd;">{html.escape(title)}</span><br>
+                    <small style="color:#888; margin-left:35px;">{date_str}</small>
+                </div>
+                <div style="font-weight:bold; color:{color}; font-size:1.1rem;">
+                    {amt_str}
+                </div>
+            </div>""")
+    return '<div style="background:#161b22; border-radius:12px; padding:10px;">' + "".join(rows) + '</div>'
@@ -0,0 +1,141 @@
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+import psycopg2
+
+# --- ÇALIŞMA METRİKLERİ ---
+# Bir scraper çalışmasının aşama süreleri (driver kurulumu, sayfa yükleme, seçici beklemeleri,
+# DB kaydı...), tekrar denemeleri, hata türleri ve tepe bellek kullanımı.
+# METRICS_FILE verilirse JSON satırları dosyaya eklenir, yoksa stdout'a "METRICS " önekiyle yazılır.
+METRICS_FILE = os.environ.get("METRICS_FILE")
+METRICS_DB = os.environ.get("METRICS_DB", "0") == "1"
+
+class ScrapeRun:
+    def __init__(self, name="app"):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.started_at = datetime.now()
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self.phases = defaultdict(float)  # aşama -> toplam ms
+        self.phase_counts = defaultdict(int)
+        self.retries = defaultdict(int)
+        self.failures = defaultdict(int)  # hata türü -> adet
+        self.fields = {}
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.failure(e, name)
+            raise
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000.0
+            with self._lock:
+                self.phases[name] += elapsed
+                self.phase_counts[name] += 1
+
+    def retry(self, name):
+        with self._lock:
+            self.retries[name] += 1
+
+    def failure(self, error, where=None):
+        label = error if isinstance(error, str) else type(error).__name__
+        if where:
+            label = f"{where}:{label}"
+        with self._lock:
+            self.failures[label] += 1
+
+    def set(self, **fields):
+        with self._lock:
+            self.fields.update(fields)
+
+    def summary(self, status=None):
+        with self._lock:
+            return {
+                'run_id': self.run_id,
+                'name': self.name,
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'status': status or self.fields.get('status', 'unknown'),
+                'total_ms': round((time.perf_counter() - self._t0) * 1000.0, 1),
+                'phases_ms': {k: round(v, 1) for k, v in self.phases.items()},
+                'phase_counts': dict(self.phase_counts),
+                'retries': dict(self.retries),
+                'failures': dict(self.failures),
+                'peak_rss_mb': peak_rss_mb(),
+                **{k: v for k, v in self.fields.items() if k != 'status'},
+            }
+
+def peak_rss_mb():
+    # Linux'ta ru_maxrss KB; Chrome alt süreçleri RUSAGE_CHILDREN'da (en büyüğü) görünür
+    self_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    child_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return {'self': round(self_kb / 1024.0, 1), 'children': round(child_kb / 1024.0, 1)}
+
+# --- AKTİF ÇALIŞMA ---
+# app.py içindeki fonksiyonlar metrik nesnesi taşımadan metrics.phase(...) çağırır;
+# aktif bir çalışma yoksa hiçbir şey ölçülmez.
+_current = None
+
+def start_run(name="app"):
+    global _current
+    _current = ScrapeRun(name)
+    return _current
+
+def current():
+    return _current
+
+def phase(name):
+    return _current.phase(name) if _current is not None else nullcontext()
+
+def retry(name):
+    if _current is not None:
+        _current.retry(name)
+
+def failure(error, where=None):
+    if _current is not None:
+        _current.failure(error, where)
+
+def emit(run, status=None):
+    record = run.summary(status)
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    if METRICS_FILE:
+        with open(METRICS_FILE, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    else:
+        print(f"METRICS {line}", file=sys.stdout)
+    return record
+
+def save_run(conn, record):
+    # scrape_runs tablosu (schema.py göç 3)
+    with conn.cursor() as cur:
+        cur.execute(
+            "INSERT INTO scrape_runs (run_id, name, started_at, status, total_ms, peak_rss_mb, metrics) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            (record['run_id'], record['name'], record['started_at'], record['status'], record['total_ms'],
+             record['peak_rss_mb']['self'] + record['peak_rss_mb']['children'], json.dumps(record, ensure_ascii=False, default=str)))
+    conn.commit()
+
+def save_if_enabled(database_url, record, connect_timeout=10):
+    # METRICS_DB=1 ise çalışma kaydı kendi bağlantısıyla yazılır; hata çalışmayı bozmaz, sadece yazılır
+    if not (METRICS_DB and database_url):
+        return False
+    try:
+        conn = psycopg2.connect(database_url, connect_timeout=connect_timeout)
+        try:
+            save_run(conn, record)
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"Metrikler kaydedilemedi: {e}")
+        return False
+    return True
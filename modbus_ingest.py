@@ -0,0 +1,282 @@
+import os
+import queue
+import struct
+import threading
+import time
+from datetime import datetime
+
+import psycopg2
+
+import metrics
+import spool
+
+# --- AYARLAR ---
+# Sayaçlar: "birim_id:hesap_no" çiftleri, ör. MODBUS_METERS="1:00470913,2:00470914"
+MODBUS_HOST = os.environ.get("MODBUS_HOST", "127.0.0.1")
+MODBUS_PORT = int(os.environ.get("MODBUS_PORT", "502"))
+MODBUS_SERIAL = os.environ.get("MODBUS_SERIAL")  # ör. /dev/ttyUSB0 verilirse RTU kullanılır
+MODBUS_BAUDRATE = int(os.environ.get("MODBUS_BAUDRATE", "9600"))
+MODBUS_METERS = os.environ.get("MODBUS_METERS", "1:00470913")
+BALANCE_REGISTER = int(os.environ.get("BALANCE_REGISTER", "0"))
+REGISTER_FORMAT = os.environ.get("REGISTER_FORMAT", "float32")  # float32 | int32 | uint16
+REGISTER_SCALE = float(os.environ.get("REGISTER_SCALE", "1"))
+POLL_INTERVAL = float(os.environ.get("POLL_INTERVAL", "15"))  # saniye
+BATCH_SIZE = int(os.environ.get("BATCH_SIZE", "500"))
+FLUSH_INTERVAL = float(os.environ.get("FLUSH_INTERVAL", "5"))
+BUFFER_SIZE = int(os.environ.get("BUFFER_SIZE", "10000"))
+DB_CONNECT_TIMEOUT = int(os.environ.get("DB_CONNECT_TIMEOUT", "10"))  # saniye; app.py ile aynı
+
+REGISTER_COUNTS = {"float32": 2, "int32": 2, "uint16": 1}
+
+def parse_meters(spec):
+    meters = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        unit, account = part.split(":", 1)
+        meters.append((int(unit), account.strip()))
+    return meters
+
+def decode_balance(registers, fmt=REGISTER_FORMAT, scale=REGISTER_SCALE):
+    # Sayaçlar 16 bitlik yazmaçları büyük uçlu (big-endian) sırayla verir
+    raw = struct.pack(f">{len(registers)}H", *registers)
+    if fmt == "float32":
+        value = struct.unpack(">f", raw[:4])[0]
+    elif fmt == "int32":
+        value = struct.unpack(">i", raw[:4])[0]
+    elif fmt == "uint16":
+        value = struct.unpack(">H", raw[:2])[0]
+    else:
+        raise ValueError(f"Bilinmeyen yazmaç biçimi: {fmt}")
+    return value * scale
+
+# --- MODBUS İSTEMCİSİ ---
+def create_client():
+    from pymodbus.client import ModbusSerialClient, ModbusTcpClient
+
+    if MODBUS_SERIAL:
+        return ModbusSerialClient(port=MODBUS_SERIAL, baudrate=MODBUS_BAUDRATE, timeout=2)
+    return ModbusTcpClient(MODBUS_HOST, port=MODBUS_PORT, timeout=2)
+
+def read_registers(client, address, count, unit):
+    # pymodbus 3.9+ 'device_id', öncesi 'slave' parametresini kullanır
+    try:
+        response = client.read_holding_registers(address, count=count, device_id=unit)
+    except TypeError:
+        response = client.read_holding_registers(address, count=count, slave=unit)
+    if response.isError():
+        raise IOError(f"Modbus hatası (birim {unit}): {response}")
+    return response.registers
+
+# --- TAMPON VE TOPLU YAZMA ---
+class ReadingBuffer:
+    # Sınırlı kuyruk: veritabanı yavaşlarsa dolar ve okuyucu bekler (backpressure);
+    # put_timeout içinde yer açılmazsa okuma yerel kuyruğa (spool.py) yazılır, yazıcı onu
+    # veritabanı açılınca aktarır. Yerel kuyruğa da yazılamazsa okuma düşürülür ve sayılır.
+    def __init__(self, maxsize=BUFFER_SIZE, put_timeout=None):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.put_timeout = put_timeout if put_timeout is not None else POLL_INTERVAL
+        self.spilled = 0
+        self.dropped = 0
+
+    def put(self, reading):
+        try:
+            self._queue.put(reading, timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            pass
+        readings = None
+        try:
+            readings = spool.ReadingSpool()
+            readings.append([reading])
+            self.spilled += 1
+        except Exception as e:
+            self.dropped += 1
+            print(f"Tampon dolu ve okuma yerel kuyruğa yazılamadı, düşürüldü: {e}")
+        finally:
+            if readings is not None:
+                readings.close()
+        return False
+
+    def drain(self, max_items, wait):
+        # Parti dolana (max_items) ya da 'wait' saniye geçene kadar okuma toplar;
+        # süre dolduktan sonra kuyrukta hazır olanlar da partiye eklenir
+        items = []
+        deadline = time.monotonic() + wait
+        while len(items) < max_items:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:  # wake(): bekleyen drain'i hemen bitir
+                break
+            items.append(item)
+        return items
+
+    def wake(self):
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def qsize(self):
+        return self._queue.qsize()
+
+class Flusher(threading.Thread):
+    def __init__(self, buffer, database_url, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        super().__init__(daemon=True)
+        self.buffer = buffer
+        self.database_url = database_url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stop_event = threading.Event()
+        self.flushed = 0
+        self.spooled = 0
+        self.drained_spills = 0
+        self.conn = None
+
+    def _connection(self):
+        if self.conn is None or self.conn.closed:
+            self.conn = psycopg2.connect(self.database_url, connect_timeout=DB_CONNECT_TIMEOUT)
+        return self.conn
+
+    def _reset_connection(self):
+        # Hata sonrası işlem geri alınır; bağlantı bozulduysa kapatılır, sonraki deneme yenisini açar
+        if self.conn is None or self.conn.closed:
+            return
+        try:
+            self.conn.rollback()
+        except Exception:
+            self.conn.close()
+
+    def flush(self, rows):
+        # Yazılamazsa aynı parti bekleyip tekrar denenir; bu sırada tampon dolar ve okuyucu yavaşlar.
+        # Kapanışta hâlâ yazılamıyorsa parti yerel kuyruğa (spool.py) bırakılır. Beklenmeyen
+        # hatada (veritabanı dışı) parti tekrar denenmez, yerel kuyruğa bırakılır ve yazıcı devam eder.
+        delay = 1.0
+        while True:
+            try:
+                with metrics.phase("db_copy"):
+                    spool.write_readings(self._connection(), rows)
+                self.flushed += len(rows)
+                return
+            except psycopg2.Error as e:
+                print(f"Toplu yazma hatası ({len(rows)} okuma bekliyor): {e}")
+                self._reset_connection()
+                if self.stop_event.is_set():
+                    self.spool_rows(rows)
+                    return
+                metrics.retry("db_copy")
+                time.sleep(delay)
+                delay = min(delay * 2, 30.0)
+            except Exception as e:
+                print(f"Toplu yazmada beklenmeyen hata ({len(rows)} okuma yerel kuyruğa): {e!r}")
+                self._reset_connection()
+                self.spool_rows(rows)
+                return
+
+    def spool_rows(self, rows):
+        readings = spool.ReadingSpool()
+        try:
+            readings.append(rows)
+            self.spooled += len(rows)
+            print(f"{len(rows)} okuma yerel kuyruğa yazıldı: {readings.path}")
+        finally:
+            readings.close()
+
+    def drain_spool(self):
+        # Önceki çalışmadan kalan okumalar; veritabanı yoksa sonraki denemeye kalır. Dönüş: aktarıldı mı
+        readings = spool.ReadingSpool()
+        try:
+            if readings.pending():
+                flushed, _ = readings.flush(self._connection())
+                print(f"Yerel kuyruktan {flushed} okuma aktarıldı.")
+            return True
+        except psycopg2.Error as e:
+            print(f"Yerel kuyruk aktarılamadı: {e}")
+            self._reset_connection()
+        except Exception as e:
+            print(f"Yerel kuyruk aktarılırken beklenmeyen hata: {e!r}")
+            self._reset_connection()
+        finally:
+            readings.close()
+        return False
+
+    def run(self):
+        self.drain_spool()
+        while not self.stop_event.is_set() or self.buffer.qsize():
+            wait = 0 if self.stop_event.is_set() else self.flush_interval
+            rows = self.buffer.drain(self.batch_size, wait)
+            try:
+                if rows:
+                    self.flush(rows)
+                # Tampon taşınca yerel kuyruğa yazılanlar, tampon boşalınca aktarılır
+                spilled = self.buffer.spilled
+                if spilled > self.drained_spills and not self.buffer.qsize() and self.drain_spool():
+                    self.drained_spills = spilled
+            except Exception as e:
+                # Yazıcı ölürse tampon dolar ve tüm okumalar yerel kuyruğa düşer; hata yazılıp devam edilir
+                print(f"Yazıcıda beklenmeyen hata: {e!r}")
+        if self.conn is not None:
+            self.conn.close()
+
+    def stop(self):
+        self.stop_event.set()
+        self.buffer.wake()
+
+# --- OKUYUCU ---
+def poll_once(client, meters, buffer):
+    count = 0
+    words = REGISTER_COUNTS[REGISTER_FORMAT]
+    for unit, account_no in meters:
+        try:
+            with metrics.phase("modbus_read"):
+                registers = read_registers(client, BALANCE_REGISTER, words, unit)
+        except Exception as e:
+            print(f"Sayaç {account_no} (birim {unit}) okunamadı: {e}")
+            continue
+        buffer.put((datetime.now(), account_no, round(decode_balance(registers), 2)))
+        count += 1
+    return count
+
+def run(database_url, meters, duration=None, poll_interval=POLL_INTERVAL, client=None, buffer=None):
+    # duration verilmezse Ctrl-C'ye kadar çalışır. Dönüş: (okunan, yazılan, düşürülen)
+    buffer = buffer or ReadingBuffer()
+    flusher = Flusher(buffer, database_url)
+    flusher.start()
+    client = client or create_client()
+    client.connect()
+
+    polled = 0
+    started = time.monotonic()
+    try:
+        while duration is None or time.monotonic() - started < duration:
+            cycle_start = time.monotonic()
+            polled += poll_once(client, meters, buffer)
+            time.sleep(max(0.0, poll_interval - (time.monotonic() - cycle_start)))
+    except KeyboardInterrupt:
+        print("Durduruluyor, tampondaki okumalar yazılıyor...")
+    finally:
+        client.close()
+        flusher.stop()
+        flusher.join()
+    return polled, flusher.flushed, buffer.dropped
+
+def main():
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print("HATA: DATABASE_URL bulunamadı!")
+        return
+    meters = parse_meters(MODBUS_METERS)
+    target = MODBUS_SERIAL or f"{MODBUS_HOST}:{MODBUS_PORT}"
+    print(f"Modbus okuma başlıyor: {target}, {len(meters)} sayaç, {POLL_INTERVAL} sn aralık")
+
+    run_metrics = metrics.start_run("modbus_ingest")
+    polled, flushed, dropped = run(database_url, meters)
+    run_metrics.set(polled=polled, flushed=flushed, dropped=dropped)
+    metrics.emit(run_metrics, "ok" if polled == flushed else "partial")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+import math
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+
+import psycopg2
+
+import app
+import metrics
+import outbox
+import spool
+import tenants
+
+# --- AYARLAR ---
+# Hesap listesi: HESAP_LISTESI="00470913,00470914" ya da satır başına bir hesap içeren dosya;
+# ikisi de yoksa tenants tablosundaki sayaçlar
+HESAP_LISTESI = os.environ.get("HESAP_LISTESI", "")
+HESAP_DOSYASI = os.environ.get("HESAP_DOSYASI", "accounts.txt")
+POOL_SIZE = int(os.environ.get("POOL_SIZE", "3"))
+ACCOUNT_TIMEOUT = int(os.environ.get("ACCOUNT_TIMEOUT", "45"))
+MAX_RETRIES = int(os.environ.get("MAX_RETRIES", "2"))
+
+def tenant_accounts():
+    # Liste/dosya yoksa panelde kayıtlı tüm dairelerin sayaçları (tenants.py)
+    if not app.DATABASE_URL:
+        return []
+    try:
+        conn = psycopg2.connect(app.DATABASE_URL, connect_timeout=app.DB_CONNECT_TIMEOUT)
+    except psycopg2.Error as e:
+        print(f"Daire listesi okunamadı: {e}")
+        return []
+    try:
+        with conn.cursor() as cur:
+            return tenants.meter_accounts(cur)
+    except psycopg2.Error as e:
+        print(f"Daire listesi okunamadı (python schema.py çalıştırıldı mı?): {e}")
+        return []
+    finally:
+        conn.close()
+
+def load_accounts(path=None):
+    if HESAP_LISTESI.strip():
+        raw = HESAP_LISTESI.replace("\n", ",").split(",")
+    else:
+        path = path or HESAP_DOSYASI
+        if not os.path.exists(path):
+            return tenant_accounts() or [app.HESAP_NO]
+        with open(path, encoding="utf-8") as f:
+            raw = f.read().splitlines()
+    accounts = []
+    for line in raw:
+        line = line.split("#")[0].strip()
+        if line and line not in accounts:
+            accounts.append(line)
+    return accounts
+
+class PoolClosed(RuntimeError):
+    pass
+
+class DriverPool:
+    # Sınırlı sayıda Chrome oturumunu tekrar tekrar kullanır; her hesap için yeni tarayıcı açılmaz.
+    # Sayfa yükleme ve script süreleri timeout ile sınırlıdır: takılan bir oturum iş parçacığını
+    # süresiz bekletmez. close() sonrası yeni oturum açılmaz, geri verilen oturumlar kapatılır
+    # (fetch_all'ın beklemediği iş parçacıkları sahipsiz Chrome bırakmasın).
+    def __init__(self, size, timeout=ACCOUNT_TIMEOUT):
+        self.size = max(1, size)
+        self.timeout = timeout
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._all = []
+        self._closed = False
+
+    def acquire(self, timeout=None):
+        if self._closed:
+            raise PoolClosed("Tarayıcı havuzu kapatıldı")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                driver = app.create_driver()
+                driver.set_page_load_timeout(self.timeout)
+                driver.set_script_timeout(self.timeout)
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+            with self._lock:
+                closed = self._closed
+                if not closed:
+                    self._all.append(driver)
+            if closed:
+                # Oturum açılırken havuz kapatıldı
+                self._quit(driver)
+                raise PoolClosed("Tarayıcı havuzu kapatıldı")
+            return driver
+        return self._idle.get(timeout=timeout)
+
+    def release(self, driver, broken=False):
+        if not broken and not self._closed:
+            self._idle.put(driver)
+            return
+        # Bozulan oturumu kapat, yerine ihtiyaç olursa yenisi açılır
+        with self._lock:
+            self._created -= 1
+            if driver in self._all:
+                self._all.remove(driver)
+        self._quit(driver)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            drivers, self._all = self._all, []
+            self._created = 0
+        for driver in drivers:
+            self._quit(driver)
+
+    def _quit(self, driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+def _fetch_selenium(pool, hesap_no, timeout):
+    driver = pool.acquire(timeout=timeout)
+    try:
+        balance = app.read_balance_with_driver(driver, hesap_no, timeout=timeout)
+    except Exception:
+        pool.release(driver, broken=True)
+        raise
+    pool.release(driver)
+    return balance
+
+def fetch_account(hesap_no, pool, engine=None, timeout=ACCOUNT_TIMEOUT, retries=MAX_RETRIES):
+    # Dönüş: (hesap_no, bakiye, motor, deneme_sayısı, hata)
+    engine = (engine or app.FETCH_ENGINE).lower()
+    order = ["http", "selenium"] if engine == "auto" else [engine]
+    last_error = None
+    for attempt in range(1, retries + 2):
+        for name in order:
+            try:
+                if name == "http":
+                    balance = app.get_balance_http(hesap_no, timeout=timeout)
+                else:
+                    balance = _fetch_selenium(pool, hesap_no, timeout)
+            except PoolClosed as e:
+                # fetch_all süresi doldu; kalan denemeler yapılmaz
+                return hesap_no, None, None, attempt, f"{type(e).__name__}: {e}"
+            except Exception as e:
+                last_error = f"{type(e).__name__}: {e}"
+                continue
+            if balance is not None:
+                return hesap_no, balance, name, attempt, None
+            last_error = f"{name}: bakiye okunamadı"
+        if attempt <= retries:
+            metrics.retry("account")
+            time.sleep(min(2 ** attempt, 10))
+    return hesap_no, None, None, retries + 1, last_error
+
+def fetch_all(accounts, engine=None, pool_size=POOL_SIZE, timeout=ACCOUNT_TIMEOUT, retries=MAX_RETRIES):
+    pool = DriverPool(pool_size, timeout)
+    executor = ThreadPoolExecutor(max_workers=pool.size)
+    try:
+        futures = {acc: executor.submit(fetch_account, acc, pool, engine, timeout, retries) for acc in accounts}
+        # Tüm çalışma için tek üst sınır: hesap başına tüm denemeler + bekleme süreleri,
+        # paralel oturum sayısına bölünmüş sıra kadar. Biten hesaplar beklenmez.
+        per_account = (timeout + 10) * (retries + 1)
+        wait(futures.values(), timeout=per_account * math.ceil(len(accounts) / pool.size))
+        results = []
+        for acc, future in futures.items():
+            if future.done() and not future.cancelled():
+                results.append(future.result())
+            else:
+                results.append((acc, None, None, retries + 1, "zaman aşımı"))
+    finally:
+        # Takılan iş parçacıkları beklenmez, sıradaki hesaplar iptal edilir; oturumların
+        # kapatılması takılı isteklerin de hata ile dönmesini sağlar
+        executor.shutdown(wait=False, cancel_futures=True)
+        pool.close()
+    return results
+
+def save_readings(results):
+    # Okumalar önce yerel kuyruğa yazılır; kuyrukta bekleyen eski okumalar da aktarılır.
+    # Veritabanı hatasında okumalar kuyrukta kalır ve hata yukarı iletilir.
+    now = datetime.now().replace(microsecond=0)
+    rows = [(now, acc, balance) for acc, balance, _, _, _ in results if balance is not None]
+    readings = spool.ReadingSpool()
+    try:
+        readings.append(rows)
+        conn = psycopg2.connect(app.DATABASE_URL, connect_timeout=app.DB_CONNECT_TIMEOUT)
+        try:
+            flushed, _ = readings.flush(conn)
+        finally:
+            conn.close()
+    finally:
+        readings.close()
+    return flushed
+
+def main():
+    run = metrics.start_run("multi_account")
+    status = "failed"
+    worker = outbox.start_worker(app.DATABASE_URL)
+    try:
+        status = run_accounts(run)
+    finally:
+        record = metrics.emit(run, status)
+        outbox.finish_worker(worker)
+        metrics.save_if_enabled(app.DATABASE_URL, record, app.DB_CONNECT_TIMEOUT)
+    return status
+
+def run_accounts(run):
+    print("Çoklu Hesap Modu Başlıyor...")
+
+    if not app.DATABASE_URL:
+        print("HATA: DATABASE_URL bulunamadı!")
+        return "config_error"
+
+    accounts = load_accounts(sys.argv[1] if len(sys.argv) > 1 else None)
+    print(f"{len(accounts)} hesap, {POOL_SIZE} paralel oturum ile okunacak.")
+
+    start = time.perf_counter()
+    results = fetch_all(accounts)
+    elapsed = time.perf_counter() - start
+
+    for acc, balance, engine, attempts, error in results:
+        if balance is not None:
+            print(f"✅ {acc}: {balance} TL ({engine}, {attempts}. deneme)")
+        else:
+            print(f"❌ {acc}: {error}")
+
+    ok_count = sum(1 for r in results if r[1] is not None)
+    run.set(accounts=len(accounts), succeeded=ok_count)
+    for _, _, _, _, error in results:
+        if error:
+            run.failure(error.split(":")[0])
+
+    try:
+        with metrics.phase("db_insert"):
+            saved = save_readings(results)
+        print(f"\n{saved} okuma tek seferde kaydedildi.")
+    except Exception as e:
+        print(f"Veritabanı kayıt hatası (okumalar yerel kuyrukta, sonraki çalışmada aktarılacak): {e}")
+        return "db_failed"
+
+    balances = {acc: balance for acc, balance, _, _, _ in results if balance is not None}
+    if balances:
+        try:
+            conn = psycopg2.connect(app.DATABASE_URL)
+            try:
+                app.check_alerts(conn, balances)
+            finally:
+                conn.close()
+        except psycopg2.Error as e:
+            print(f"Uyarı kontrolü yapılamadı: {e}")
+
+    peak = metrics.peak_rss_mb()
+    per_minute = len(accounts) / (elapsed / 60.0) if elapsed > 0 else 0.0
+    print(f"Süre: {elapsed:.1f} sn | Hız: {per_minute:.1f} hesap/dk")
+    print(f"Tepe bellek: {peak['self']:.0f} MB (python) + {peak['children']:.0f} MB (en büyük alt süreç)")
+    return "ok" if ok_count == len(accounts) else "partial"
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import os
+import smtplib
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import psycopg2
+from psycopg2.extras import execute_batch
+
+import metrics
+
+# --- AYARLAR ---
+# Uyarılar alert_outbox tablosuna yazılır (schema.py göç 4), arka plandaki OutboxWorker
+# tek bir SMTP oturumu üzerinden partiler halinde gönderir.
+# Yerel test: python -m bench.smtp_sink 8025 ve SMTP_HOST=127.0.0.1 SMTP_PORT=8025 SMTP_STARTTLS=0
+SMTP_HOST = os.environ.get("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", "587"))
+SMTP_STARTTLS = os.environ.get("SMTP_STARTTLS", "1") == "1"
+SMTP_TIMEOUT = float(os.environ.get("SMTP_TIMEOUT", "20"))
+SMTP_IDLE = float(os.environ.get("SMTP_IDLE", "60"))  # bu kadar boşta kalan oturum yeniden açılır
+SENDER_EMAIL = os.environ.get("SENDER_EMAIL")
+SENDER_PASSWORD = os.environ.get("SENDER_PASSWORD")
+RECEIVER_EMAIL = os.environ.get("RECEIVER_EMAIL")
+
+OUTBOX_BATCH = int(os.environ.get("OUTBOX_BATCH", "50"))
+OUTBOX_POLL = float(os.environ.get("OUTBOX_POLL", "5"))
+OUTBOX_DRAIN = float(os.environ.get("OUTBOX_DRAIN", "30"))  # kapanışta en fazla bu kadar beklenir
+RETRY_BASE = float(os.environ.get("RETRY_BASE", "30"))  # sn; her denemede ikiye katlanır
+RETRY_MAX = float(os.environ.get("RETRY_MAX", "3600"))
+MAX_ATTEMPTS = int(os.environ.get("MAX_ATTEMPTS", "8"))
+# Sadece o maili etkileyen hatalar; oturum açık kalır (sendmail kendisi RSET gönderir)
+MESSAGE_ERRORS = (smtplib.SMTPDataError, smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused)
+LEASE = 300  # sn; alınan ama işaretlenmeyen (çöken işçi) uyarılar bu süre sonra tekrar alınır
+
+# --- KUYRUĞA EKLEME ---
+def enqueue(cur, account_no, kind, active, subject=None, body=None):
+    # Aynı sayaç ve eşik için uyarı, eşik her aşıldığında (active False'tan True'ya geçiş) bir kez
+    # kuyruğa girer; koşul sürdükçe sonraki çalışmalar yeni uyarı üretmez. Koşul kalkınca
+    # (ör. yükleme yapıldı) alert_state sıfırlanır ve bir sonraki aşım yeni uyarıdır.
+    # Dönüş: yeni uyarı eklendiyse True. Commit çağırana aittir.
+    if not active:
+        cur.execute(
+            "UPDATE alert_state SET active_since = NULL WHERE account_no = %s AND kind = %s AND active_since IS NOT NULL",
+            (account_no, kind))
+        return False
+    cur.execute("""
+        INSERT INTO alert_state (account_no, kind, active_since) VALUES (%s, %s, now())
+        ON CONFLICT (account_no, kind)
+        DO UPDATE SET active_since = COALESCE(alert_state.active_since, EXCLUDED.active_since)
+        RETURNING active_since
+    """, (account_no, kind))
+    episode = cur.fetchone()[0]
+    cur.execute("""
+        INSERT INTO alert_outbox (account_no, kind, episode, subject, body) VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (account_no, kind, episode) DO NOTHING
+        RETURNING id
+    """, (account_no, kind, episode, subject, body))
+    return cur.fetchone() is not None
+
+# --- KUYRUKTAN ALMA VE İŞARETLEME ---
+def claim(conn, limit):
+    # Zamanı gelen uyarıları kilitleyip kiralar; aynı anda çalışan başka işçi aynı satırları almaz
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE alert_outbox SET next_attempt = now() + make_interval(secs => %s)
+            WHERE id IN (
+                SELECT id FROM alert_outbox
+                WHERE status = 'pending' AND next_attempt <= now()
+                ORDER BY id LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, subject, body, attempts
+        """, (LEASE, limit))
+        rows = sorted(cur.fetchall())
+    conn.commit()
+    return rows
+
+def mark_sent(conn, ids):
+    with conn.cursor() as cur:
+        cur.execute("UPDATE alert_outbox SET status = 'sent', sent_at = now(), attempts = attempts + 1 WHERE id = ANY(%s)",
+                    (list(ids),))
+    conn.commit()
+
+def postpone(conn, ids, delay, error):
+    # Denenmeden geri bırakılan uyarılar (SMTP'ye bağlanılamadı): deneme sayısı artmaz
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE alert_outbox SET next_attempt = now() + make_interval(secs => %s), last_error = %s
+            WHERE id = ANY(%s)
+        """, (delay, error[:500], list(ids)))
+    conn.commit()
+
+def retry_delay(attempts):
+    return min(RETRY_BASE * 2 ** attempts, RETRY_MAX)
+
+def mark_failed(conn, failures):
+    # failures: [(id, önceki deneme sayısı, hata)]; MAX_ATTEMPTS'e ulaşan uyarı 'failed' olur
+    with conn.cursor() as cur:
+        execute_batch(cur, """
+            UPDATE alert_outbox
+            SET attempts = attempts + 1, last_error = %s,
+                next_attempt = now() + make_interval(secs => %s),
+                status = CASE WHEN attempts + 1 >= %s THEN 'failed' ELSE 'pending' END
+            WHERE id = %s
+        """, [(error[:500], retry_delay(attempts), MAX_ATTEMPTS, id_) for id_, attempts, error in failures])
+    conn.commit()
+
+# --- SMTP ---
+def mail_configured():
+    return bool(SENDER_EMAIL and RECEIVER_EMAIL)
+
+def open_smtp():
+    server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+    if SMTP_STARTTLS:
+        server.starttls()
+    if SENDER_PASSWORD:
+        server.login(SENDER_EMAIL, SENDER_PASSWORD)
+    return server
+
+def build_message(subject, body):
+    msg = MIMEMultipart()
+    msg['From'] = SENDER_EMAIL
+    msg['To'] = RECEIVER_EMAIL
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain', 'utf-8'))
+    return msg.as_string()
+
+# --- ARKA PLAN İŞÇİSİ ---
+_wake = threading.Event()
+
+def wake():
+    # Yeni uyarı eklendi: bekleyen işçi OUTBOX_POLL'u beklemeden çalışır
+    _wake.set()
+
+class OutboxWorker(threading.Thread):
+    def __init__(self, database_url, batch_size=OUTBOX_BATCH, poll_interval=OUTBOX_POLL):
+        super().__init__(daemon=True)
+        self.database_url = database_url
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.stop_event = threading.Event()
+        self.deadline = None
+        self.conn = None
+        self.smtp = None
+        self.smtp_used = 0.0
+        self.sent = 0
+        self.failed = 0
+        self.sessions = 0
+
+    def _connection(self):
+        if self.conn is None or self.conn.closed:
+            self.conn = psycopg2.connect(self.database_url)
+        return self.conn
+
+    def _smtp(self):
+        # Oturum partiler arasında yeniden kullanılır; uzun süre boşta kaldıysa sunucu
+        # kapatmış olabileceği için yenisi açılır
+        if self.smtp is not None and time.monotonic() - self.smtp_used > SMTP_IDLE:
+            self._close_smtp()
+        if self.smtp is None:
+            with metrics.phase("smtp_connect"):
+                self.smtp = open_smtp()
+            self.sessions += 1
+        self.smtp_used = time.monotonic()
+        return self.smtp
+
+    def _close_smtp(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.smtp = None
+
+    def deliver_batch(self):
+        # Dönüş: bu partide işlenen uyarı sayısı (gönderilen + başarısız; ertelenenler hariç)
+        conn = self._connection()
+        rows = claim(conn, self.batch_size)
+        if not rows:
+            return 0
+        sent, failures, postponed = [], [], []
+        for i, (id_, subject, body, attempts) in enumerate(rows):
+            try:
+                server = self._smtp()
+            except (smtplib.SMTPException, OSError) as e:
+                # Sunucuya ulaşılamıyor: kalan uyarılar için tek tek bağlantı denenmez (her biri
+                # SMTP_TIMEOUT bekletirdi), bu uyarıyla aynı süre sonraya ertelenir
+                print(f"SMTP sunucusuna bağlanılamadı, {len(rows) - i} uyarı ertelendi: {e}")
+                metrics.retry("smtp_connect")
+                failures.append((id_, attempts, str(e)))
+                postponed = [row[0] for row in rows[i + 1:]]
+                error = str(e)
+                break
+            try:
+                with metrics.phase("smtp_send"):
+                    server.sendmail(SENDER_EMAIL, [RECEIVER_EMAIL], build_message(subject, body))
+                sent.append(id_)
+            except (smtplib.SMTPException, OSError) as e:
+                print(f"Uyarı {id_} gönderilemedi ({attempts + 1}. deneme): {e}")
+                metrics.retry("smtp_send")
+                if not isinstance(e, MESSAGE_ERRORS):  # oturum bozuldu, yenisi açılır
+                    self._close_smtp()
+                failures.append((id_, attempts, str(e)))
+        if sent:
+            mark_sent(conn, sent)
+        if failures:
+            mark_failed(conn, failures)
+        if postponed:
+            postpone(conn, postponed, retry_delay(failures[-1][1]), error)
+        self.sent += len(sent)
+        self.failed += len(failures)
+        return len(sent) + len(failures)
+
+    def run(self):
+        while True:
+            try:
+                handled = self.deliver_batch()
+            except psycopg2.Error as e:
+                print(f"Uyarı kuyruğu okunamadı: {e}")
+                if self.conn is not None and not self.conn.closed:
+                    self.conn.close()
+                handled = 0
+            if self.stop_event.is_set() and (not handled or time.monotonic() > self.deadline):
+                break
+            if not handled:
+                _wake.wait(self.poll_interval)
+                _wake.clear()
+        self._close_smtp()
+        if self.conn is not None:
+            self.conn.close()
+
+    def stop(self, drain=OUTBOX_DRAIN):
+        # Zamanı gelmiş uyarılar en fazla 'drain' saniye daha gönderilir; geri kalanlar
+        # (ör. yeniden deneme bekleyenler) tabloda kalır, sonraki çalışma gönderir
+        self.deadline = time.monotonic() + drain
+        self.stop_event.set()
+        wake()
+
+def start_worker(database_url):
+    if not database_url:
+        return None
+    if not mail_configured():
+        print("Mail ayarları eksik olduğu için uyarılar kuyrukta bekleyecek.")
+        return None
+    worker = OutboxWorker(database_url)
+    worker.start()
+    return worker
+
+def finish_worker(worker):
+    if worker is None:
+        return
+    worker.stop()
+    worker.join(OUTBOX_DRAIN + SMTP_TIMEOUT)
+    if worker.sent or worker.failed:
+        print(f"📧 Uyarı kuyruğu: {worker.sent} gönderildi, {worker.failed} başarısız.")
+
+def main():
+    # Sürekli çalışan işçi (ör. ayrı bir servis olarak): Ctrl-C'ye kadar kuyruğu boşaltır
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print("HATA: DATABASE_URL bulunamadı!")
+        return
+    worker = start_worker(database_url)
+    if worker is None:
+        return
+    print(f"Uyarı işçisi başladı: {SMTP_HOST}:{SMTP_PORT}, parti {worker.batch_size}")
+    try:
+        while worker.is_alive():
+            worker.join(1.0)
+    except KeyboardInterrupt:
+        print("Durduruluyor...")
+        finish_worker(worker)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner_utils.script_run_context import get_script_run_ctx
+
+# --- BÖLÜM PROFİLİ ---
+# DASHBOARD_PROFILE=1 (tüm oturumlar) ya da admin olarak giriş yapılmışken adreste ?profile=1
+# (sadece o oturum) ile panelin her bölümü için süre, sorgu sayısı,
+# çekilen satır (db.py sorgu kayıtlarından), tarayıcıya giden öğe sayısı ve boyutu ölçülür.
+# Kayıtlar session_state['_section_profile'] listesine eklenir ve kenar çubuğunda gösterilir;
+# PROFILE_FILE verilirse tüm oturumların kayıtları JSON satırları olarak dosyaya da eklenir
+# (bkz. bench/load_test.py).
+PROFILE_ENV = os.environ.get("DASHBOARD_PROFILE", "0") == "1"
+PROFILE_FILE = os.environ.get("PROFILE_FILE")
+MAX_RECORDS = 200
+_file_lock = threading.Lock()
+
+def enabled():
+    # ?profile=1 herkese açık adreste çalışır; ziyaretçi ölçüm yükü ve sorgu ayrıntısı açamasın diye admin şartı
+    if PROFILE_ENV:
+        return True
+    user = st.session_state.get('user')
+    return st.query_params.get("profile") == "1" and user is not None and user.get('role') == 'admin'
+
+@contextmanager
+def profiled(name):
+    # Bağlam yöneticisi ya da dekoratör olarak kullanılır; iç içe bölümlerde dıştaki de sayar
+    if not enabled():
+        yield
+        return
+    timings = st.session_state.setdefault('_query_timings', [])
+    first_query = len(timings)
+    ctx = get_script_run_ctx()
+    sent = {'elements': 0, 'bytes': 0}
+    previous = ctx.enqueue if ctx is not None else None
+
+    def counting_enqueue(msg):
+        if msg.WhichOneof('type') == 'delta':
+            sent['elements'] += 1
+            sent['bytes'] += msg.ByteSize()
+        previous(msg)
+
+    if ctx is not None:
+        ctx.enqueue = counting_enqueue
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000.0
+        if ctx is not None:
+            ctx.enqueue = previous
+        queries = timings[first_query:]
+        record = {
+            'bölüm': name,
+            'ms': elapsed,
+            'sorgu': len(queries),
+            'sorgu_ms': sum(q['ms'] for q in queries),
+            'satır': sum(q['satır'] for q in queries),
+            'öğe': sent['elements'],
+            'kb': sent['bytes'] / 1024.0,
+        }
+        records = st.session_state.setdefault('_section_profile', [])
+        records.append(record)
+        del records[:-MAX_RECORDS]
+        if PROFILE_FILE:
+            line = json.dumps({'session': ctx.session_id if ctx is not None else None, **record}, ensure_ascii=False)
+            with _file_lock, open(PROFILE_FILE, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+def reset_section_profile():
+    st.session_state['_section_profile'] = []
+
+def render_section_profile():
+    records = st.session_state.get('_section_profile', [])
+    if not records:
+        st.caption("Bu çalıştırmada ölçülen bölüm yok.")
+        return
+    df = pd.DataFrame(records)
+    st.caption(f"{len(df)} bölüm çalıştı, toplam {df['ms'].sum():.1f} ms")
+    st.dataframe(df.style.format({'ms': '{:.1f}', 'sorgu_ms': '{:.1f}', 'kb': '{:.1f}'}),
+                 use_container_width=True, hide_index=True)
@@ -0,0 +1,99 @@
+import pandas as pd
+
+from energy import summarize
+
+# --- GÜNLÜK ÖZET (energy_daily) ---
+# Bir günün tüketimi: o güne düşen okumaların bir önceki okumaya göre negatif farklarının toplamı.
+# LAG için başlangıç gününden önceki son okuma da pencereye alınır, böylece gün sınırındaki fark kaybolmaz.
+DAILY_REFRESH_SQL = """
+    DELETE FROM energy_daily WHERE account_no = %(account_no)s AND day >= %(day)s::date;
+
+    INSERT INTO energy_daily (account_no, day, drop_total, rise_total, first_balance, last_balance, last_time, reading_count)
+    SELECT account_no, date_time::date,
+           COALESCE(SUM(-diff) FILTER (WHERE diff < 0), 0),
+           COALESCE(SUM(diff) FILTER (WHERE diff > 0), 0),
+           (ARRAY_AGG(balance ORDER BY date_time))[1],
+           (ARRAY_AGG(balance ORDER BY date_time DESC))[1],
+           MAX(date_time), COUNT(*)
+    FROM (
+        SELECT account_no, date_time, balance::numeric AS balance,
+               balance::numeric - LAG(balance::numeric) OVER (ORDER BY date_time) AS diff
+        FROM readings
+        WHERE account_no = %(account_no)s
+          AND date_time >= COALESCE(
+                (SELECT MAX(date_time) FROM readings
+                 WHERE account_no = %(account_no)s AND date_time < %(day)s::date),
+                %(day)s::date)
+    ) t
+    WHERE date_time >= %(day)s::date
+    GROUP BY account_no, date_time::date;
+"""
+
+DAILY_BACKFILL_SQL = """
+    INSERT INTO energy_daily (account_no, day, drop_total, rise_total, first_balance, last_balance, last_time, reading_count)
+    SELECT account_no, date_time::date,
+           COALESCE(SUM(-diff) FILTER (WHERE diff < 0), 0),
+           COALESCE(SUM(diff) FILTER (WHERE diff > 0), 0),
+           (ARRAY_AGG(balance ORDER BY date_time))[1],
+           (ARRAY_AGG(balance ORDER BY date_time DESC))[1],
+           MAX(date_time), COUNT(*)
+    FROM (
+        SELECT account_no, date_time, balance::numeric AS balance,
+               balance::numeric - LAG(balance::numeric) OVER (PARTITION BY account_no ORDER BY date_time) AS diff
+        FROM readings
+    ) t
+    GROUP BY account_no, date_time::date
+"""
+
+DAILY_SQL = """
+    SELECT day, drop_total FROM energy_daily
+    WHERE account_no = %(account_no)s AND drop_total > 0
+    ORDER BY day ASC
+"""
+
+# --- 1. BÖLÜM METRİKLERİ ---
+# Dairenin sayacı için sadece son 7 günün okumaları (+ bir önceki okuma) taranır; tüm geçmiş
+# istemciye gelmez.
+SUMMARY_SQL = """
+    WITH last AS (
+        SELECT account_no, date_time AS last_upd, balance::numeric AS curr_bal
+        FROM readings WHERE account_no = %(account_no)s ORDER BY date_time DESC LIMIT 1
+    ), bounds AS MATERIALIZED (
+        -- Pencere başlangıcı bir kez hesaplanır (satır başına alt sorgu çalışmasın)
+        SELECT last.account_no, COALESCE(
+                (SELECT MAX(p.date_time) FROM readings p
+                 WHERE p.account_no = last.account_no AND p.date_time < last.last_upd - INTERVAL '7 days'),
+                last.last_upd - INTERVAL '7 days') AS win_start
+        FROM last
+    ), win AS (
+        SELECT r.date_time,
+               r.balance::numeric - LAG(r.balance::numeric) OVER (ORDER BY r.date_time) AS diff
+        FROM readings r, bounds
+        WHERE r.account_no = bounds.account_no AND r.date_time >= bounds.win_start
+    ), recent AS (
+        SELECT win.* FROM win, last WHERE win.date_time >= last.last_upd - INTERVAL '7 days'
+    )
+    SELECT last.account_no, last.last_upd, last.curr_bal,
+           (SELECT p.balance::numeric FROM readings p
+            WHERE p.account_no = last.account_no AND p.date_time <= last.last_upd - INTERVAL '24 hours'
+            ORDER BY p.date_time DESC LIMIT 1) AS past_balance,
+           (SELECT COUNT(*) FROM recent) AS recent_count,
+           (SELECT COALESCE(SUM(-diff), 0) FROM recent WHERE diff < 0) AS recent_drop,
+           (SELECT COALESCE(EXTRACT(EPOCH FROM MAX(date_time) - MIN(date_time)), 0) / 86400.0 FROM recent) AS span_days
+    FROM last
+"""
+
+def refresh_daily(cur, account_no, since):
+    # Yeni okuma(lar) eklendikten sonra sadece etkilenen günleri yeniden hesaplar
+    cur.execute(DAILY_REFRESH_SQL, {'account_no': account_no, 'day': since})
+
+def summary_from_row(row):
+    past = row['past_balance']
+    return summarize(
+        float(row['curr_bal']),
+        pd.Timestamp(row['last_upd']),
+        float(past) if past is not None and not pd.isna(past) else None,
+        int(row['recent_count']),
+        float(row['recent_drop']),
+        float(row['span_days']),
+    )
@@ -0,0 +1,249 @@
+import os
+import sys
+
+import psycopg2
+
+from events import EVENTS_BACKFILL_SQL
+from rollup import DAILY_BACKFILL_SQL
+
+# --- ŞEMA GÖÇLERİ ---
+# (sürüm, açıklama, SQL). Uygulanan sürümler schema_migrations tablosunda tutulur,
+# her göç kendi işleminde (transaction) bir kez çalışır. Yeni göçler listenin sonuna eklenir.
+# 0. göç sonradan eklendi: mevcut veritabanlarında tablolar zaten var (IF NOT EXISTS),
+# boş bir veritabanında ise diğer göçlerden önce çalışır.
+MIGRATIONS = [
+    (0, "temel tablolar", """
+        CREATE TABLE IF NOT EXISTS users (
+            id        SERIAL PRIMARY KEY,
+            username  TEXT NOT NULL,
+            password  TEXT NOT NULL,
+            role      TEXT NOT NULL DEFAULT 'user'
+        );
+        CREATE TABLE IF NOT EXISTS readings (
+            id          SERIAL PRIMARY KEY,
+            date_time   TIMESTAMP NOT NULL,
+            account_no  TEXT      NOT NULL,
+            balance     NUMERIC   NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS expenses (
+            id         SERIAL PRIMARY KEY,
+            item_name  TEXT      NOT NULL,
+            price      NUMERIC   NOT NULL,
+            buyer      TEXT      NOT NULL,
+            date_time  TIMESTAMP NOT NULL DEFAULT NOW()
+        );
+        CREATE TABLE IF NOT EXISTS payments (
+            id           SERIAL PRIMARY KEY,
+            expense_id   INTEGER NOT NULL REFERENCES expenses(id) ON DELETE CASCADE,
+            payer_id     INTEGER NOT NULL REFERENCES users(id),
+            receiver_id  INTEGER NOT NULL REFERENCES users(id),
+            amount       NUMERIC NOT NULL,
+            status       TEXT    NOT NULL DEFAULT 'pending_payment'
+        );
+    """),
+    (1, "energy_daily günlük özet tablosu", """
+        CREATE TABLE IF NOT EXISTS energy_daily (
+            account_no     TEXT        NOT NULL,
+            day            DATE        NOT NULL,
+            drop_total     NUMERIC     NOT NULL DEFAULT 0,
+            rise_total     NUMERIC     NOT NULL DEFAULT 0,
+            first_balance  NUMERIC,
+            last_balance   NUMERIC,
+            last_time      TIMESTAMP,
+            reading_count  INTEGER     NOT NULL DEFAULT 0,
+            PRIMARY KEY (account_no, day)
+        );
+        DELETE FROM energy_daily;
+    """ + DAILY_BACKFILL_SQL),
+    (2, "sık kullanılan sorgular için indeksler", """
+        -- Panel: son okuma, artımlı yükleme (date_time > ...), sayaç bazlı pencereler
+        CREATE INDEX IF NOT EXISTS readings_date_time_idx ON readings (date_time);
+        CREATE INDEX IF NOT EXISTS readings_account_time_idx ON readings (account_no, date_time);
+
+        -- Bekleyen borçlar ve "Tahsil Ettim": sadece pending_payment satırları indekslenir
+        CREATE INDEX IF NOT EXISTS payments_pending_pair_idx ON payments (payer_id, receiver_id)
+            WHERE status = 'pending_payment';
+        CREATE INDEX IF NOT EXISTS payments_pending_receiver_idx ON payments (receiver_id, payer_id)
+            WHERE status = 'pending_payment';
+        CREATE INDEX IF NOT EXISTS payments_expense_idx ON payments (expense_id);
+
+        -- Giriş kontrolü ve isimden id çözümü
+        CREATE UNIQUE INDEX IF NOT EXISTS users_username_key ON users (username);
+
+        -- Sistem logları (tarihe göre sıralı harcamalar)
+        CREATE INDEX IF NOT EXISTS expenses_date_time_idx ON expenses (date_time);
+
+        ANALYZE readings;
+        ANALYZE payments;
+        ANALYZE users;
+        ANALYZE expenses;
+    """),
+    (3, "scrape_runs çalışma metrikleri", """
+        CREATE TABLE IF NOT EXISTS scrape_runs (
+            id           SERIAL PRIMARY KEY,
+            run_id       TEXT      NOT NULL,
+            name         TEXT      NOT NULL,
+            started_at   TIMESTAMP NOT NULL,
+            status       TEXT      NOT NULL,
+            total_ms     NUMERIC   NOT NULL,
+            peak_rss_mb  NUMERIC,
+            metrics      JSONB     NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS scrape_runs_started_idx ON scrape_runs (started_at);
+    """),
+    (4, "alert_outbox uyarı kuyruğu", """
+        -- Sayaç + eşik başına aktif aşımın başlangıcı; koşul kalkınca NULL olur
+        CREATE TABLE IF NOT EXISTS alert_state (
+            account_no    TEXT      NOT NULL,
+            kind          TEXT      NOT NULL,
+            active_since  TIMESTAMP,
+            PRIMARY KEY (account_no, kind)
+        );
+        CREATE TABLE IF NOT EXISTS alert_outbox (
+            id            SERIAL PRIMARY KEY,
+            account_no    TEXT      NOT NULL,
+            kind          TEXT      NOT NULL,
+            episode       TIMESTAMP NOT NULL,
+            subject       TEXT      NOT NULL,
+            body          TEXT      NOT NULL,
+            status        TEXT      NOT NULL DEFAULT 'pending',
+            attempts      INTEGER   NOT NULL DEFAULT 0,
+            next_attempt  TIMESTAMP NOT NULL DEFAULT NOW(),
+            last_error    TEXT,
+            created_at    TIMESTAMP NOT NULL DEFAULT NOW(),
+            sent_at       TIMESTAMP
+        );
+        -- Aynı aşım için ikinci uyarı eklenemez
+        CREATE UNIQUE INDEX IF NOT EXISTS alert_outbox_episode_key ON alert_outbox (account_no, kind, episode);
+        CREATE INDEX IF NOT EXISTS alert_outbox_due_idx ON alert_outbox (next_attempt) WHERE status = 'pending';
+    """),
+    (5, "readings (account_no, date_time) benzersiz", """
+        -- Tekrarlanan çalışmaların eklediği aynı okumalar silinir (ilk kayıt kalır)
+        DELETE FROM readings a USING readings b
+        WHERE a.account_no = b.account_no AND a.date_time = b.date_time AND a.id > b.id;
+        CREATE UNIQUE INDEX IF NOT EXISTS readings_account_time_key ON readings (account_no, date_time);
+        -- Benzersiz indeks aynı sütunları kapsadığı için eski indeks gereksiz
+        DROP INDEX IF EXISTS readings_account_time_idx;
+        DELETE FROM energy_daily;
+    """ + DAILY_BACKFILL_SQL),
+    (6, "energy_events olay tablosu", """
+        -- Yükleme, günlük tüketim, anomali ve okuma kesintisi olayları (bkz. events.py)
+        CREATE TABLE IF NOT EXISTS energy_events (
+            id          SERIAL PRIMARY KEY,
+            account_no  TEXT      NOT NULL,
+            ev_time     TIMESTAMP NOT NULL,
+            kind        TEXT      NOT NULL,
+            amount      NUMERIC   NOT NULL DEFAULT 0,
+            score       DOUBLE PRECISION,
+            detail      TEXT
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS energy_events_key ON energy_events (account_no, kind, ev_time);
+        -- Log akışı: sayacın olayları zamana göre sondan başa
+        CREATE INDEX IF NOT EXISTS energy_events_account_time_idx ON energy_events (account_no, ev_time);
+    """ + EVENTS_BACKFILL_SQL),
+    (7, "daireler (tenants) ve sayaca göre bölümlenmiş readings", """
+        CREATE TABLE IF NOT EXISTS tenants (
+            id          SERIAL PRIMARY KEY,
+            slug        TEXT NOT NULL UNIQUE,
+            name        TEXT NOT NULL,
+            account_no  TEXT NOT NULL UNIQUE
+        );
+        -- Mevcut kurulum tek daire: paneldeki sayaç (son okumanın sayacı) "Daire 6" olur,
+        -- çoklu hesap modunun diğer sayaçları kendi daireleri olarak eklenir
+        INSERT INTO tenants (slug, name, account_no)
+        SELECT 'daire-6', 'Daire 6', COALESCE((SELECT account_no FROM readings ORDER BY date_time DESC LIMIT 1), '00470913');
+        INSERT INTO tenants (slug, name, account_no)
+        SELECT 'sayac-' || account_no, 'Sayaç ' || account_no, account_no
+        FROM (SELECT DISTINCT account_no FROM readings) r
+        ORDER BY account_no
+        ON CONFLICT DO NOTHING;
+
+        -- Kullanıcılar ve harcamalar daireye aittir; kullanıcı adı daire içinde benzersiz
+        ALTER TABLE users ADD COLUMN tenant_id INTEGER REFERENCES tenants(id);
+        UPDATE users SET tenant_id = (SELECT id FROM tenants WHERE slug = 'daire-6');
+        ALTER TABLE users ALTER COLUMN tenant_id SET NOT NULL;
+        -- Eski kurulumlarda users_username_key indeks değil UNIQUE kısıttır
+        ALTER TABLE users DROP CONSTRAINT IF EXISTS users_username_key;
+        DROP INDEX IF EXISTS users_username_key;
+        CREATE UNIQUE INDEX users_tenant_username_key ON users (tenant_id, username);
+
+        ALTER TABLE expenses ADD COLUMN tenant_id INTEGER REFERENCES tenants(id);
+        UPDATE expenses SET tenant_id = (SELECT id FROM tenants WHERE slug = 'daire-6');
+        ALTER TABLE expenses ALTER COLUMN tenant_id SET NOT NULL;
+        DROP INDEX IF EXISTS expenses_date_time_idx;
+        CREATE INDEX expenses_tenant_time_idx ON expenses (tenant_id, date_time);
+
+        -- readings sayaca (account_no) göre HASH ile 16 bölüme ayrılır: daire sorguları tek
+        -- bölümün (account_no, date_time) indeksine iner, bölüm ve indeks boyutları daire
+        -- sayısıyla değil bölüm başına sayaç sayısıyla büyür. Sorgular hep sayaçla sınırlı
+        -- olduğundan sadece date_time üzerindeki indeks kaldırılır.
+        ALTER TABLE readings RENAME TO readings_old;
+        CREATE TABLE readings (
+            id          BIGSERIAL,
+            date_time   TIMESTAMP NOT NULL,
+            account_no  TEXT      NOT NULL,
+            balance     NUMERIC   NOT NULL,
+            PRIMARY KEY (account_no, date_time)
+        ) PARTITION BY HASH (account_no);
+        DO $$
+        BEGIN
+            FOR i IN 0..15 LOOP
+                EXECUTE format('CREATE TABLE readings_p%s PARTITION OF readings FOR VALUES WITH (MODULUS 16, REMAINDER %s)', i, i);
+            END LOOP;
+        END $$;
+        INSERT INTO readings (id, date_time, account_no, balance)
+        SELECT id, date_time, account_no, balance FROM readings_old;
+        SELECT setval(pg_get_serial_sequence('readings', 'id'), COALESCE((SELECT MAX(id) FROM readings), 0) + 1, false);
+        DROP TABLE readings_old;
+        ANALYZE readings;
+    """),
+]
+
+def applied_versions(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version     INTEGER PRIMARY KEY,
+            name        TEXT NOT NULL,
+            applied_at  TIMESTAMP NOT NULL DEFAULT NOW()
+        )
+    """)
+    cur.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cur.fetchall()}
+
+def migrate(conn, target=None):
+    with conn.cursor() as cur:
+        done = applied_versions(cur)
+    conn.commit()
+
+    applied = []
+    for version, name, sql in sorted(MIGRATIONS):
+        if version in done or (target is not None and version > target):
+            continue
+        try:
+            with conn.cursor() as cur:
+                cur.execute(sql)
+                cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"✅ Göç {version} uygulandı: {name}")
+        applied.append(version)
+    return applied
+
+def main():
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print("HATA: DATABASE_URL bulunamadı!")
+        return
+    target = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    conn = psycopg2.connect(database_url)
+    try:
+        applied = migrate(conn, target)
+        if not applied:
+            print("Şema güncel, uygulanacak göç yok.")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
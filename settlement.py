@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+# --- MAHSUPLAŞMA MOTORU ---
+# Bekleyen ödemeler (payer, receiver, amount) tek seferde kişi x kişi matrise çevrilir.
+# owed.loc[a, b]: a'nın b'ye toplam borcu; net = owed - owed.T (pozitifse a, b'ye net borçlu).
+# Streamlit'ten bağımsızdır, saf pandas/numpy.
+
+def owed_matrix(payments, people=()):
+    # people: sıralama için bilinen kişiler; ödemelerde geçen diğer isimler sona eklenir
+    people = list(dict.fromkeys(people))
+    if not payments.empty:
+        seen = set(people)
+        people += sorted((set(payments['payer']) | set(payments['receiver'])) - seen)
+    owed = np.zeros((len(people), len(people)))
+    if not payments.empty and people:
+        idx = {name: i for i, name in enumerate(people)}
+        rows = payments['payer'].map(idx)
+        cols = payments['receiver'].map(idx)
+        known = rows.notna() & cols.notna()
+        amounts = pd.to_numeric(payments['amount'], errors='coerce').fillna(0.0)[known]
+        np.add.at(owed, (rows[known].astype(int).values, cols[known].astype(int).values), amounts.values)
+    return pd.DataFrame(owed, index=people, columns=people)
+
+def net_matrix(owed):
+    return owed - owed.T
+
+def net_debts(owed):
+    # Her kişi çifti için tek satır: payer, receiver'a net 'amount' borçlu
+    net = net_matrix(owed)
+    stacked = net.stack()
+    stacked = stacked[stacked > 0]
+    stacked.index = stacked.index.set_names(['payer', 'receiver'])
+    return stacked.rename('amount').reset_index()
+
+def offset_lines(payments, owed):
+    # Karşı yönde de bekleyen borç olan ödemeler (otomatik mahsuplaşanlar)
+    if payments.empty:
+        return payments
+    opposite = owed.stack().reindex(pd.MultiIndex.from_arrays([payments['receiver'], payments['payer']])).fillna(0.0)
+    return payments[opposite.values > 0]
+
+def user_positions(owed, user):
+    # Dönüş: (borçlar, alacaklar) — {karşı taraf: net tutar}, sadece pozitif olanlar
+    if user not in owed.index:
+        return {}, {}
+    net_row = net_matrix(owed).loc[user].drop(user)
+    debts = net_row[net_row > 0]
+    credits = -net_row[net_row < 0]
+    return debts.to_dict(), credits.to_dict()
+
+def min_cash_flow(owed, tolerance=0.005):
+    # Tüm evi en az transferle kapatmak için: herkesin net pozisyonunu hesapla,
+    # en büyük borçluyu en büyük alacaklıya eşle (en fazla n-1 transfer).
+    position = owed.sum(axis=0) - owed.sum(axis=1)  # pozitif: alacaklı
+    creditors = position[position > tolerance].sort_values(ascending=False)
+    debtors = (-position[position < -tolerance]).sort_values(ascending=False)
+
+    cred_names, cred_left = list(creditors.index), list(creditors.values)
+    debt_names, debt_left = list(debtors.index), list(debtors.values)
+    transfers = []
+    i = j = 0
+    while i < len(debt_names) and j < len(cred_names):
+        amount = min(debt_left[i], cred_left[j])
+        if amount > tolerance:
+            transfers.append((debt_names[i], cred_names[j], amount))
+        debt_left[i] -= amount
+        cred_left[j] -= amount
+        if debt_left[i] <= tolerance:
+            i += 1
+        if cred_left[j] <= tolerance:
+            j += 1
+    return pd.DataFrame(transfers, columns=['payer', 'receiver', 'amount'])
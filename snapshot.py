@@ -0,0 +1,112 @@
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# --- OKUMA ANLIK GÖRÜNTÜSÜ ---
+# ReadingsCache içeriği (ayrıştırılmış okumalar, günlük düşüşler, grafik katmanları) yerel diske
+# sıkıştırılmamış Arrow IPC (Feather v2) dosyaları olarak yazılır. Süreç yeniden başladığında
+# dosyalar bellek eşlemeli (mmap) okunur ve veritabanından sadece watermark'tan sonraki
+# satırlar çekilir; to_numeric/to_datetime ayrıştırması tekrar yapılmaz.
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".snapshot"))
+SNAPSHOT_INTERVAL = float(os.environ.get("SNAPSHOT_INTERVAL", "300"))  # saniye
+SNAPSHOT_VERSION = 1
+
+_FILES = ('readings', 'daily', 'tier_hourly', 'tier_daily')
+
+def _write_table(df, path):
+    tmp = path + ".tmp"
+    feather.write_feather(df, tmp, compression='uncompressed')
+    os.replace(tmp, path)
+
+def _read_table(path):
+    with pa.memory_map(path) as source:
+        return feather.read_table(source, memory_map=True).to_pandas()
+
+def save_snapshot(frame, daily, tiers, watermark, directory=SNAPSHOT_DIR):
+    # Her dosya önce .tmp olarak yazılıp yerine taşınır; meta.json en son yazılır
+    os.makedirs(directory, exist_ok=True)
+    _write_table(frame.reset_index(drop=True), os.path.join(directory, "readings.arrow"))
+    _write_table(daily.rename('diff').rename_axis('date_only').reset_index(), os.path.join(directory, "daily.arrow"))
+    for name in ('hourly', 'daily'):
+        if name in tiers:
+            _write_table(tiers[name], os.path.join(directory, f"tier_{name}.arrow"))
+    meta = {'version': SNAPSHOT_VERSION, 'watermark': watermark.isoformat(), 'rows': len(frame), 'saved_at': time.time()}
+    tmp = os.path.join(directory, "meta.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(directory, "meta.json"))
+    return meta
+
+def load_snapshot(directory=SNAPSHOT_DIR):
+    # Dönüş: (frame, daily, tiers, meta) ya da anlık görüntü yoksa/bozuksa None
+    try:
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get('version') != SNAPSHOT_VERSION:
+            return None
+        tables = {name: _read_table(os.path.join(directory, f"{name}.arrow")) for name in _FILES}
+    except (OSError, ValueError, pa.ArrowException) as e:
+        if not isinstance(e, FileNotFoundError):
+            print(f"Anlık görüntü okunamadı, tam yükleme yapılacak: {e}")
+        return None
+    frame = tables['readings']
+    if len(frame) != meta['rows']:
+        return None
+    daily = tables['daily'].set_index('date_only')['diff'].rename(None)
+    tiers = {'raw': frame, 'hourly': tables['tier_hourly'], 'daily': tables['tier_daily']}
+    meta['watermark'] = pd.Timestamp(meta['watermark'])
+    return frame, daily, tiers, meta
+
+class SnapshotStore:
+    # Başlangıçta anlık görüntüyü yükler; yenilemelerden sonra en fazla 'interval' saniyede bir
+    # arka planda yenisini yazar. Frame'ler değiştirilmeden paylaşıldığı için referansları
+    # başka thread'de yazmak güvenlidir.
+    def __init__(self, directory=SNAPSHOT_DIR, interval=SNAPSHOT_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self.last_saved = 0.0
+        self.saved = None  # (watermark, satır sayısı); önbellek baştan kurulursa watermark aynı kalabilir
+        self._thread = None
+        self._lock = threading.Lock()  # aynı sayacın birden çok oturumu aynı anda yazmaya başlamasın
+
+    def load(self, validate=None):
+        # validate(watermark, rows) -> bool: veritabanı anlık görüntüyle hâlâ uyumlu mu
+        snap = load_snapshot(self.directory)
+        if snap is None:
+            return None
+        frame, daily, tiers, meta = snap
+        if validate is not None and not validate(meta['watermark'], meta['rows']):
+            print("Anlık görüntü veritabanıyla uyuşmuyor, tam yükleme yapılacak.")
+            return None
+        self.saved = (meta['watermark'], meta['rows'])
+        return frame, daily, tiers, meta['watermark']
+
+    def maybe_save(self, cache):
+        frame, daily, tiers, watermark = cache.state()
+        with self._lock:
+            if watermark is None or (watermark, len(frame)) == self.saved:
+                return False
+            if time.monotonic() - self.last_saved < self.interval and self.saved is not None:
+                return False
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self.last_saved = time.monotonic()
+            self.saved = (watermark, len(frame))
+            self._thread = threading.Thread(target=self._save, args=(frame, daily, tiers, watermark), daemon=True)
+            self._thread.start()
+            return True
+
+    def _save(self, frame, daily, tiers, watermark):
+        try:
+            save_snapshot(frame, daily, tiers, watermark, self.directory)
+        except Exception as e:
+            print(f"Anlık görüntü yazılamadı: {e}")
+
+    def join(self):
+        if self._thread is not None:
+            self._thread.join()
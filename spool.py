@@ -0,0 +1,100 @@
+import io
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from events import refresh_events
+from rollup import refresh_daily
+
+# --- AYARLAR ---
+# Okumalar önce yerel SQLite (WAL) kuyruğuna yazılır, sonra Postgres'e toplu aktarılır.
+# Veritabanı yoksa/yavaşsa okuma kaybolmaz; sonraki çalışmada kuyruktaki her şey gönderilir.
+# readings (account_no, date_time) benzersiz olduğundan (schema.py göç 5) aynı okuma
+# iki kez aktarılsa da tek satır olur.
+SPOOL_PATH = os.environ.get("SPOOL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".spool", "readings.db"))
+SPOOL_BATCH = int(os.environ.get("SPOOL_BATCH", "20000"))
+
+# --- POSTGRES'E TOPLU YAZMA ---
+def write_readings(conn, rows):
+    # rows: [(date_time, account_no, balance), ...]. Geçici tabloya COPY, oradan çakışanlar
+    # atlanarak readings'e aktarılır; günlük özet ve olaylar (events.py) aynı işlemde tazelenir.
+    # Dönüş: eklenen satır sayısı
+    buf = io.StringIO()
+    since = {}
+    for date_time, account_no, balance in rows:
+        if isinstance(date_time, str):
+            date_time = datetime.fromisoformat(date_time)
+        buf.write(f"{date_time:%Y-%m-%d %H:%M:%S.%f}\t{account_no}\t{balance}\n")
+        if account_no not in since or date_time < since[account_no]:
+            since[account_no] = date_time
+    buf.seek(0)
+    with conn.cursor() as cur:
+        cur.execute("CREATE TEMP TABLE IF NOT EXISTS readings_stage (date_time TIMESTAMP, account_no TEXT, balance NUMERIC) ON COMMIT DELETE ROWS")
+        cur.copy_expert("COPY readings_stage (date_time, account_no, balance) FROM STDIN", buf)
+        cur.execute("""
+            INSERT INTO readings (date_time, account_no, balance)
+            SELECT date_time, account_no, balance FROM readings_stage
+            ON CONFLICT (account_no, date_time) DO NOTHING
+        """)
+        inserted = cur.rowcount
+        # Günlük özet ve olaylar, her sayacın bu partideki en eski gününden itibaren tazelenir
+        for account_no, first in since.items():
+            refresh_daily(cur, account_no, first)
+            refresh_events(cur, account_no, first)
+    conn.commit()
+    return inserted
+
+# --- YEREL KUYRUK ---
+class ReadingSpool:
+    # Sadece sona ekleme ve baştan silme; süreçler arası kilitleme SQLite'a aittir
+    def __init__(self, path=None):
+        path = path or SPOOL_PATH  # çalışma anında okunur; ölçümler geçici bir kuyruğa yönlendirebilir
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=FULL")  # append() döndüğünde okuma diskte
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS readings (
+                id          INTEGER PRIMARY KEY AUTOINCREMENT,
+                date_time   TEXT NOT NULL,
+                account_no  TEXT NOT NULL,
+                balance     REAL NOT NULL
+            )
+        """)
+        self.db.commit()
+
+    def append(self, rows):
+        rows = [(f"{date_time:%Y-%m-%d %H:%M:%S.%f}", account_no, float(balance)) for date_time, account_no, balance in rows]
+        with self._lock, self.db:
+            self.db.executemany("INSERT INTO readings (date_time, account_no, balance) VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    def pending(self):
+        with self._lock:
+            return self.db.execute("SELECT count(*) FROM readings").fetchone()[0]
+
+    def flush(self, conn, batch_size=SPOOL_BATCH):
+        # Kuyruğu eskiden yeniye partiler halinde aktarır. Parti Postgres'te commit edildikten
+        # sonra yerelden silinir; arada çökme olursa parti tekrar gönderilir ve çakışma olarak
+        # atlanır. Hata olursa kalan okumalar kuyrukta bekler. Dönüş: (aktarılan, yeni eklenen)
+        flushed = inserted = 0
+        while True:
+            with self._lock:
+                batch = self.db.execute(
+                    "SELECT id, date_time, account_no, balance FROM readings ORDER BY id LIMIT ?", (batch_size,)).fetchall()
+            if not batch:
+                return flushed, inserted
+            try:
+                inserted += write_readings(conn, [row[1:] for row in batch])
+            except Exception:
+                conn.rollback()
+                raise
+            with self._lock, self.db:
+                self.db.execute("DELETE FROM readings WHERE id <= ?", (batch[-1][0],))
+            flushed += len(batch)
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,91 @@
+import os
+import sys
+
+import psycopg2
+
+# --- DAİRELER (tenants) ---
+# Tek kurulum birden çok daireye hizmet verir. Her dairenin bir sayacı (account_no), kendi
+# kullanıcıları ve harcamaları vardır. Panel daireyi adresteki ?daire=<slug> ile seçer
+# (verilmezse ilk daire); panel ve scraper sorguları daire ya da sayacıyla sınırlıdır.
+TENANT_SQL = """
+    SELECT id, slug, name, account_no FROM tenants
+    WHERE slug = %(slug)s OR (%(slug)s::text IS NULL AND id = (SELECT MIN(id) FROM tenants))
+"""
+
+RESIDENTS_SQL = "SELECT username FROM users WHERE tenant_id = %s ORDER BY id"
+
+def find_tenant(cur, slug=None):
+    # Dönüş: {'id', 'slug', 'name', 'account_no'} ya da None
+    cur.execute(TENANT_SQL, {'slug': slug})
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return dict(zip(['id', 'slug', 'name', 'account_no'], row))
+
+def residents(cur, tenant_id):
+    cur.execute(RESIDENTS_SQL, (tenant_id,))
+    return [row[0] for row in cur.fetchall()]
+
+def meter_accounts(cur):
+    # Tüm dairelerin sayaçları (multi_account.py hesap listesi verilmezse bunları okur)
+    cur.execute("SELECT account_no FROM tenants ORDER BY id")
+    return [row[0] for row in cur.fetchall()]
+
+def meter_names(cur, accounts):
+    # Dönüş: {account_no: daire adı}; uyarı maillerinde sayacın hangi daireye ait olduğu yazılır
+    cur.execute("SELECT account_no, name FROM tenants WHERE account_no = ANY(%s)", (list(accounts),))
+    return dict(cur.fetchall())
+
+def add_tenant(conn, slug, name, account_no):
+    with conn.cursor() as cur:
+        cur.execute("INSERT INTO tenants (slug, name, account_no) VALUES (%s, %s, %s) RETURNING id", (slug, name, account_no))
+        tenant_id = cur.fetchone()[0]
+    conn.commit()
+    return tenant_id
+
+def add_user(conn, tenant_id, username, password, role='user'):
+    with conn.cursor() as cur:
+        cur.execute("INSERT INTO users (tenant_id, username, password, role) VALUES (%s, %s, %s, %s) RETURNING id",
+                    (tenant_id, username, password, role))
+        user_id = cur.fetchone()[0]
+    conn.commit()
+    return user_id
+
+def main():
+    # Kullanım:
+    #   python tenants.py                                  -> daireleri listeler
+    #   python tenants.py ekle daire-7 "Daire 7" 00470914  -> yeni daire
+    #   python tenants.py kullanici daire-7 Ali sifre [admin]
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print("HATA: DATABASE_URL bulunamadı!")
+        return
+    args = sys.argv[1:]
+    conn = psycopg2.connect(database_url)
+    try:
+        if not args:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT t.slug, t.name, t.account_no, COUNT(u.id) FROM tenants t
+                    LEFT JOIN users u ON u.tenant_id = t.id GROUP BY t.id ORDER BY t.id
+                """)
+                for slug, name, account_no, users in cur.fetchall():
+                    print(f"{slug:<20} {name:<20} sayaç {account_no}  {users} kullanıcı")
+        elif args[0] == "ekle" and len(args) == 4:
+            add_tenant(conn, *args[1:])
+            print(f"✅ Daire eklendi: {args[2]} (panel adresi: ?daire={args[1]})")
+        elif args[0] == "kullanici" and len(args) in (4, 5):
+            with conn.cursor() as cur:
+                tenant = find_tenant(cur, args[1])
+            if tenant is None:
+                print(f"HATA: '{args[1]}' dairesi bulunamadı!")
+                return
+            add_user(conn, tenant['id'], args[2], args[3], args[4] if len(args) == 5 else 'user')
+            print(f"✅ {tenant['name']} dairesine kullanıcı eklendi: {args[2]}")
+        else:
+            print("Kullanım: python tenants.py [ekle <slug> <isim> <hesap_no> | kullanici <slug> <isim> <şifre> [admin]]")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+from app import alert_message
+
+def test_message_names_tenant():
+    _, body = alert_message(300, 7.5, "00470914", daire="Daire 7")
+    assert "KIBTEK Daire 7 sayacınızdaki bakiye kritik seviyeye" in body
+    assert "Hesap No: 00470914" in body
+
+def test_message_without_tenant():
+    subject, body = alert_message(300, 7.5, "00470914", kind="days_left")
+    assert subject == "⚠️ KIBTEK Düşük Bakiye Uyarısı (%7.5)"
+    assert "KIBTEK sayacınızdaki bakiye" in body
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from downsample import MAX_POINTS, balance_chart, build_tiers, lttb, pick_tier, update_tiers
+
+def readings(n, freq="min", seed=3):
+    # Yavaş düşüş + ara sıra yükleme (ReadingsCache.frame biçiminde)
+    rng = np.random.default_rng(seed)
+    balance = 4000 - np.cumsum(rng.uniform(0.0, 0.05, n)) + np.cumsum(np.where(rng.random(n) < 0.001, 1000.0, 0.0))
+    return pd.DataFrame({'date_time': pd.date_range("2026-01-01", periods=n, freq=freq), 'balance': balance})
+
+def test_lttb_keeps_ends_and_order():
+    x = np.arange(10_000, dtype=float)
+    y = np.sin(x / 100.0)
+    idx = lttb(x, y, 500)
+    assert len(idx) == 500
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+    assert (np.diff(idx) > 0).all()
+
+def test_lttb_keeps_spike():
+    y = np.zeros(5000)
+    y[1234] = 100.0
+    assert 1234 in lttb(np.arange(5000, dtype=float), y, 100)
+
+@pytest.mark.parametrize("n_out", [2, 5000, 6000])
+def test_lttb_small_input_unchanged(n_out):
+    assert (lttb(np.arange(5000), np.zeros(5000), n_out) == np.arange(5000)).all()
+
+def test_tiers_keep_bucket_extremes():
+    frame = readings(3 * 24 * 60)
+    tiers = build_tiers(frame)
+    assert tiers['raw'] is frame
+    for name, freq in (('hourly', 'h'), ('daily', 'D')):
+        tier = tiers[name]
+        buckets = frame.groupby(frame['date_time'].dt.floor(freq))['balance']
+        got = tier.groupby(tier['date_time'].dt.floor(freq))['balance']
+        pd.testing.assert_series_equal(got.min(), buckets.min())
+        pd.testing.assert_series_equal(got.max(), buckets.max())
+        assert tier['date_time'].is_monotonic_increasing
+
+def test_update_tiers_matches_build():
+    frame = readings(5 * 24 * 60)
+    head = frame.iloc[:4 * 24 * 60 + 17]
+    updated = update_tiers(build_tiers(head), frame, frame['date_time'].iloc[len(head)])
+    full = build_tiers(frame)
+    for name in ('hourly', 'daily'):
+        pd.testing.assert_frame_equal(updated[name], full[name])
+
+def test_pick_tier_finest_under_limit():
+    tiers = build_tiers(readings(3 * 24 * 60))
+    assert pick_tier(tiers, limit=10_000)[0] == 'raw'
+    assert pick_tier(tiers, limit=1_000)[0] == 'hourly'
+    assert pick_tier(tiers, limit=10)[0] == 'daily'  # hiçbiri uymazsa daily
+    start = tiers['raw']['date_time'].iloc[-1] - pd.Timedelta(hours=2)
+    name, tier = pick_tier(tiers, start, limit=1_000)
+    assert name == 'raw' and len(tier) == 121
+
+@pytest.mark.parametrize("range_key", ['24 saat', '7 gün', '30 gün', '1 yıl', 'Tümü'])
+def test_balance_chart_point_budget(range_key):
+    frame = readings(200_000)
+    series = balance_chart(build_tiers(frame), range_key)
+    assert 0 < len(series) <= MAX_POINTS
+    assert series.index[-1] == frame['date_time'].iloc[-1]
+    assert series.index.is_monotonic_increasing
+
+def test_balance_chart_empty():
+    assert balance_chart({}).empty
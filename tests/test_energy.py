@@ -0,0 +1,57 @@
+import pandas as pd
+
+from energy import ReadingsCache, full_load
+
+# Veritabanı yerine bellekteki bir okuma tablosu (db._fetch_readings_since / _count_readings_until gibi)
+class FakeReadings:
+    def __init__(self, rows):
+        self.rows = pd.DataFrame(rows, columns=['date_time', 'account_no', 'balance'])
+        self.rows['date_time'] = pd.to_datetime(self.rows['date_time'])
+        self.fetches = []
+
+    def add(self, date_time, balance):
+        self.rows.loc[len(self.rows)] = [pd.Timestamp(date_time), "00470913", balance]
+
+    def fetch_since(self, watermark):
+        self.fetches.append(watermark)
+        rows = self.rows if watermark is None else self.rows[self.rows['date_time'] > watermark]
+        return rows.sort_values('date_time').reset_index(drop=True)
+
+    def count_until(self, watermark):
+        return int((self.rows['date_time'] <= watermark).sum())
+
+def hourly(n, start="2026-03-01 00:00"):
+    return [(t, "00470913", 2000.0 - i) for i, t in enumerate(pd.date_range(start, periods=n, freq="h"))]
+
+def refresh(cache, db):
+    return cache.refresh(db.fetch_since, db.count_until)
+
+def test_appends_only_new_rows():
+    db = FakeReadings(hourly(48))
+    cache = ReadingsCache()
+    refresh(cache, db)
+    db.add("2026-03-03 00:00", 1951.0)
+    frame, daily = refresh(cache, db)
+    assert db.fetches == [None, pd.Timestamp("2026-03-02 23:00")]
+    assert len(frame) == 49
+
+def test_backfill_below_watermark_rebuilds():
+    # Yerel kuyruktan geç aktarılan, watermark'tan eski bir okuma
+    db = FakeReadings(hourly(48))
+    cache = ReadingsCache()
+    refresh(cache, db)
+    db.add("2026-03-01 00:30", 1999.5)
+    frame, daily = refresh(cache, db)
+    assert db.fetches[-1] is None
+    expected_frame, expected_daily = full_load(db.rows)
+    assert len(frame) == 49
+    assert frame['date_time'].tolist() == expected_frame['date_time'].tolist()
+    pd.testing.assert_series_equal(daily, expected_daily, check_names=False)
+
+def test_deleted_rows_rebuild():
+    db = FakeReadings(hourly(48))
+    cache = ReadingsCache()
+    refresh(cache, db)
+    db.rows = db.rows.iloc[5:].reset_index(drop=True)
+    frame, _ = refresh(cache, db)
+    assert len(frame) == 43 and frame['date_time'].iloc[0] == pd.Timestamp("2026-03-01 05:00")
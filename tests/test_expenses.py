@@ -0,0 +1,47 @@
+from decimal import Decimal
+
+import pytest
+
+from expenses import split_shares
+
+def test_equal_split_rounds_to_last():
+    shares = split_shares(100, ["Metin", "Zafer", "Doğan"])
+    assert shares == {'Metin': Decimal("33.33"), 'Zafer': Decimal("33.33"), 'Doğan': Decimal("33.34")}
+
+def test_shares_sum_to_price():
+    for price in (0.01, 9.99, 100, 1234.57):
+        for n in range(1, 8):
+            shares = split_shares(price, [f"kisi{i}" for i in range(n)], {'kisi0': 2.5})
+            assert sum(shares.values()) == Decimal(str(price))
+
+def test_weights():
+    shares = split_shares(90, ["Metin", "Zafer"], {'Metin': 2})
+    assert shares == {'Metin': Decimal("60.00"), 'Zafer': Decimal("30.00")}
+
+def test_zero_weight_pays_nothing():
+    shares = split_shares(50, ["Metin", "Zafer"], {'Zafer': 0})
+    assert shares == {'Metin': Decimal("50.00"), 'Zafer': Decimal("0.00")}
+
+def test_remainder_skips_zero_weight():
+    shares = split_shares(0.01, ["A", "B", "C"], {'C': 0})
+    assert shares == {'A': Decimal("0.00"), 'B': Decimal("0.01"), 'C': Decimal("0.00")}
+
+def test_uneven_weights_never_negative():
+    for price in (0.01, 0.05, 0.07, 1, 99.99):
+        weights = {f"kisi{i}": w for i, w in enumerate([0, 1, 1.5, 0, 3, 0.25, 1, 1, 1, 1])}
+        shares = split_shares(price, list(weights), weights)
+        assert sum(shares.values()) == Decimal(str(price))
+        assert all(s >= 0 for s in shares.values())
+        assert all(shares[name] == 0 for name, w in weights.items() if w == 0)
+
+def test_duplicate_participants_counted_once():
+    assert split_shares(10, ["Metin", "Zafer", "Metin"]) == {'Metin': Decimal("5.00"), 'Zafer': Decimal("5.00")}
+
+@pytest.mark.parametrize("participants, weights", [
+    ([], None),
+    (["Metin"], {'Metin': -1}),
+    (["Metin", "Zafer"], {'Metin': 0, 'Zafer': 0}),
+])
+def test_invalid(participants, weights):
+    with pytest.raises(ValueError):
+        split_shares(10, participants, weights)
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecast import FULL_BALANCE, RESERVE_BALANCE, ForecastCache, balance_percent, forecast_frame
+
+def steady(end_balance, per_day, days=56, account="00470913", end="2026-03-01 12:00"):
+    # Saatlik okumalar, günde per_day düşüş; son okuma end_balance
+    times = pd.date_range(end=end, periods=days * 24, freq="h")
+    balance = end_balance + per_day * (len(times) - 1 - np.arange(len(times))) / 24.0
+    return pd.DataFrame({'date_time': times, 'account_no': account, 'balance': balance})
+
+def test_steady_rate():
+    row = forecast_frame(steady(2000, 30)).iloc[0]
+    assert row['daily_rate'] == pytest.approx(30)
+    assert row['days_left'] == pytest.approx(50)  # (2000 - 500) / 30
+    assert row['days_low'] == pytest.approx(50, abs=0.5)
+    assert row['days_high'] == pytest.approx(50, abs=0.5)
+    assert row['depletion_date'] == pd.Timestamp("2026-03-01 12:00") + pd.Timedelta(days=50)
+
+def test_recharge_is_not_consumption():
+    # Pencerenin ortasında +3000 yükleme: yükleme aralığı atlanır, hız değişmez
+    df = steady(2000, 30)
+    df.loc[df.index[len(df) // 2]:, 'balance'] += 3000
+    row = forecast_frame(df).iloc[0]
+    assert row['daily_rate'] == pytest.approx(30)
+    assert row['days_left'] == pytest.approx((5000 - RESERVE_BALANCE) / 30)
+
+def test_below_reserve_is_empty():
+    row = forecast_frame(steady(RESERVE_BALANCE - 100, 30)).iloc[0]
+    assert row['days_left'] == 0 and row['days_low'] == 0 and row['days_high'] == 0
+
+def test_many_meters_independent():
+    df = pd.concat([steady(2000, 30, account="A"), steady(3500, 60, account="B"), steady(1000, 0, account="C")])
+    rows = forecast_frame(df.sample(frac=1, random_state=1)).set_index('account_no')
+    assert rows.loc['A', 'days_left'] == pytest.approx(50)
+    assert rows.loc['B', 'days_left'] == pytest.approx(50)
+    assert np.isnan(rows.loc['C', 'days_left'])  # tüketim yok: bitmez
+
+def test_cache_recomputes_only_new_readings():
+    cache = ForecastCache()
+    df = steady(2000, 30)
+    first = cache.get(df)
+    assert first.iloc[0]['days_left'] == pytest.approx(50)
+    assert cache.get(df).iloc[0]['last_time'] == first.iloc[0]['last_time']
+    newer = pd.concat([df, pd.DataFrame({'date_time': [df['date_time'].iloc[-1] + pd.Timedelta(hours=1)],
+                                         'account_no': ["00470913"], 'balance': [2000 - 30 / 24.0]})],
+                      ignore_index=True)
+    assert cache.get(newer).iloc[0]['curr_bal'] == pytest.approx(2000 - 30 / 24.0)
+
+@pytest.mark.parametrize("balance, percent", [
+    (0, 0.0),
+    (RESERVE_BALANCE / 2, 2.5),
+    (RESERVE_BALANCE, 5.0),
+    ((RESERVE_BALANCE + FULL_BALANCE) / 2, 52.5),
+    (FULL_BALANCE, 100.0),
+    (FULL_BALANCE * 2, 100.0),
+])
+def test_balance_percent(balance, percent):
+    assert balance_percent(balance) == pytest.approx(percent)
+
+def test_balance_percent_array():
+    got = balance_percent(np.array([0, RESERVE_BALANCE, FULL_BALANCE]))
+    assert np.allclose(got, [0.0, 5.0, 100.0])
+
+def test_alert_threshold():
+    # app.check_alerts %10 ve altında uyarır; panel %15 altını kırmızı gösterir
+    limit = RESERVE_BALANCE + (10.0 - 5.0) / 95.0 * (FULL_BALANCE - RESERVE_BALANCE)
+    assert balance_percent(limit) == pytest.approx(10.0)
+    assert balance_percent(limit - 1) < 10.0 < balance_percent(limit + 1)
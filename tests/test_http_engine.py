@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+import app
+from bench.fixture_server import base_url, serve_in_background
+
+# Tarayıcısız motor yerel fixture sunucusuna karşı (bkz. bench/fixture_server.py)
+@pytest.fixture(scope="module")
+def server():
+    server = serve_in_background()
+    yield server
+    server.shutdown()
+
+def test_reads_balance(server):
+    balance = app.get_balance_http("00470913", api_url=base_url(server) + "/api/prepaid/balance")
+    assert balance == 1284
+    path, body = server.requests_seen[-1]
+    assert path == "/api/prepaid/balance"
+    assert json.loads(body) == {"accountNo": "00470913", "type": "prepaid"}
+
+def test_missing_balance_field(server):
+    assert app.get_balance_http("00000000", api_url=base_url(server) + "/api/prepaid/no-balance") is None
+
+def test_http_error(server):
+    assert app.get_balance_http("00470913", api_url=base_url(server) + "/api/yok") is None
+
+def test_not_json(server):
+    assert app.get_balance_http("00470913", api_url=base_url(server) + "/") is None
+
+def test_auto_falls_back_to_selenium(server, monkeypatch):
+    monkeypatch.setattr(app, "KIBTEK_API_URL", base_url(server) + "/api/prepaid/no-balance")
+    monkeypatch.setitem(app.FETCH_ENGINES, "selenium", lambda hesap_no: 777)
+    assert app.get_balance("00470913", engine="auto") == (777, "selenium")
+
+def test_auto_prefers_http(server, monkeypatch):
+    monkeypatch.setattr(app, "KIBTEK_API_URL", base_url(server) + "/api/prepaid/balance")
+    monkeypatch.setitem(app.FETCH_ENGINES, "selenium", lambda hesap_no: pytest.fail("selenium denenmemeli"))
+    assert app.get_balance("00470913", engine="auto") == (1284, "http")
+
+@pytest.mark.parametrize("payload, expected", [
+    ({"data": [{"info": {}}, {"Bakiye": "1234.50 TL"}]}, 1234),
+    ({"result": {"creditBalance": "85.9"}}, 85),
+    ({"data": {"balance": {"amount": 5}}}, None),
+    ([], None),
+])
+def test_find_balance(payload, expected):
+    assert app._find_balance(payload) == expected
@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import pytest
+
+import modbus_ingest
+import spool
+
+# Yazıcı ve tampon veritabanısız; yerel kuyruk geçici dizinde
+@pytest.fixture
+def spool_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "readings.db")
+    monkeypatch.setattr(spool, "SPOOL_PATH", path)
+    return path
+
+def pending(path):
+    readings = spool.ReadingSpool(path)
+    try:
+        return readings.pending()
+    finally:
+        readings.close()
+
+def reading(i):
+    return (datetime(2026, 3, 1, 12, i), "00470913", 2000.0 - i)
+
+def test_full_buffer_spills_to_spool(spool_path):
+    buffer = modbus_ingest.ReadingBuffer(maxsize=2, put_timeout=0)
+    assert [buffer.put(reading(i)) for i in range(5)] == [True, True, False, False, False]
+    assert buffer.spilled == 3 and buffer.dropped == 0
+    assert pending(spool_path) == 3
+    assert buffer.drain(10, 0) == [reading(0), reading(1)]
+
+def test_unexpected_error_spools_batch(spool_path, monkeypatch):
+    def broken(conn, rows):
+        raise ValueError("bozuk okuma")
+    monkeypatch.setattr(spool, "write_readings", broken)
+    flusher = modbus_ingest.Flusher(modbus_ingest.ReadingBuffer(), "postgresql://yok")
+    monkeypatch.setattr(flusher, "_connection", lambda: None)
+    flusher.flush([reading(0), reading(1)])
+    assert flusher.flushed == 0 and flusher.spooled == 2
+    assert pending(spool_path) == 2
+
+def test_flusher_survives_and_drains_spills(spool_path, monkeypatch):
+    written = []
+    def write(conn, rows):
+        if not written:
+            written.append(None)
+            raise RuntimeError("beklenmeyen")
+        written.extend(balance for _, _, balance in rows)
+        return len(rows)
+    monkeypatch.setattr(spool, "write_readings", write)
+    buffer = modbus_ingest.ReadingBuffer(maxsize=1, put_timeout=0)
+    buffer.put(reading(0))  # ilk parti beklenmeyen hatayla yerel kuyruğa düşer
+    buffer.put(reading(1))  # tampon dolu: yerel kuyruğa
+    flusher = modbus_ingest.Flusher(buffer, "postgresql://yok", flush_interval=0.01)
+    monkeypatch.setattr(flusher, "_connection", lambda: None)
+    flusher.start()
+    try:
+        for _ in range(500):
+            if len(written) >= 3:
+                break
+            flusher.stop_event.wait(0.01)
+    finally:
+        flusher.stop()
+        flusher.join(5)
+    assert not flusher.is_alive()
+    assert sorted(written[1:]) == [1999.0, 2000.0]
+    assert pending(spool_path) == 0
+
+def test_connect_timeout(monkeypatch):
+    seen = {}
+    monkeypatch.setattr(modbus_ingest.psycopg2, "connect", lambda url, **kwargs: seen.update(kwargs) or None)
+    modbus_ingest.Flusher(modbus_ingest.ReadingBuffer(), "postgresql://yok")._connection()
+    assert seen == {"connect_timeout": modbus_ingest.DB_CONNECT_TIMEOUT}
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from bench.bench_settlement import RESIDENTS, legacy, synthetic_payments, vectorized
+from settlement import min_cash_flow, net_matrix, owed_matrix
+
+# settlement.py'nin eski iterrows döngüleriyle aynı sonucu verdiği ve değişmezleri
+# (para korunur, en az transfer <= n-1) rastgele senaryolarda kontrol edilir.
+def scenario(seed):
+    rng = np.random.default_rng(seed)
+    k = int(rng.integers(2, len(RESIDENTS) + 1))
+    residents = list(rng.choice(RESIDENTS, k, replace=False))
+    return synthetic_payments(int(rng.integers(0, 40)), residents, seed), residents
+
+@pytest.mark.parametrize("seed", range(50))
+def test_same_as_legacy(seed):
+    payments, residents = scenario(seed)
+    debts_old, offsets_old, positions_old = legacy(payments, residents)
+    debts_new, offsets_new, positions_new, _ = vectorized(payments, residents)
+
+    assert debts_old.keys() == debts_new.keys()
+    assert all(np.isclose(debts_old[k], debts_new[k]) for k in debts_old)
+    assert offsets_old == offsets_new
+    for (me, name), net in positions_old.items():
+        debts, credits = positions_new[me]
+        assert np.isclose(debts.get(name, 0.0) - credits.get(name, 0.0), net)
+
+@pytest.mark.parametrize("seed", range(50))
+def test_net_matrix_balances(seed):
+    # Net matris ters simetrik, herkesin net pozisyonu toplamı sıfır
+    payments, residents = scenario(seed)
+    net = net_matrix(owed_matrix(payments, residents)).values
+    assert np.allclose(net, -net.T)
+    assert np.isclose(net.sum(), 0.0)
+
+@pytest.mark.parametrize("seed", range(50))
+def test_min_cash_flow_settles_positions(seed):
+    # En az transfer: herkesin net pozisyonunu aynen kapatır, en fazla n-1 transfer
+    payments, residents = scenario(seed)
+    owed = owed_matrix(payments, residents)
+    transfers = min_cash_flow(owed)
+    assert len(transfers) <= max(0, len(owed) - 1)
+    settled = owed_matrix(transfers, owed.index)
+    expected = owed.sum(axis=0) - owed.sum(axis=1)
+    got = settled.sum(axis=0) - settled.sum(axis=1)
+    assert np.allclose(expected.reindex(got.index).values, got.values, atol=0.01)